@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Authentication overhead per request.
+
+Compares, per request:
+- jwt:      verifying a web session token with a full HS256 decode (the
+            previous path) vs. the verified-token cache
+- api key:  the shared key compared with != (previous) vs.
+            hmac.compare_digest, and a per-agent key looked up with a
+            database query vs. the in-memory hash index
+- request:  GET /auth/verify end to end through the ASGI app, token cache
+            off vs. on
+
+Usage:
+    python benchmarks/bench_auth.py [--iterations 20000] [--agents 1000]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+async def run(args):
+    import httpx
+    from sqlalchemy import insert, select
+
+    from ideas.auth import agent_key_index, generate_agent_key, hash_key, verify_api_key
+    from ideas.config import settings
+    from ideas.database import async_session_maker, init_db
+    from ideas.main import app
+    from ideas.models import AgentKey
+    from ideas.routers import web_auth
+
+    await init_db()
+    settings.api_key_enabled = True
+
+    def per_call_us(call, iterations=args.iterations) -> float:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            call()
+        return (time.perf_counter() - start) / iterations * 1e6
+
+    async def per_await_us(call, iterations=args.iterations) -> float:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            await call()
+        return (time.perf_counter() - start) / iterations * 1e6
+
+    def row(name: str, before: float, after: float):
+        print(f"{name:<28} {before:>10.2f} {after:>10.2f} {before / after:>8.1f}x")
+
+    print(f"{'per request':<28} {'before us':>10} {'after us':>10} {'speedup':>8}")
+
+    token, _ = web_auth.create_token("admin")
+    uncached = web_auth.TokenCache(0)
+    cached = web_auth.TokenCache(settings.jwt_cache_size)
+    web_auth.token_cache = uncached
+    before = per_call_us(lambda: web_auth.verify_token(token))
+    web_auth.token_cache = cached
+    after = per_call_us(lambda: web_auth.verify_token(token))
+    row("jwt verify", before, after)
+
+    keys = [generate_agent_key() for _ in range(args.agents)]
+    async with async_session_maker() as session:
+        await session.execute(insert(AgentKey), [
+            {"agent_id": f"agent-{n}", "key_hash": hash_key(key), "key_prefix": key[:8]}
+            for n, key in enumerate(keys)
+        ])
+        await session.commit()
+    await agent_key_index.load(async_session_maker)
+    agent_key = keys[len(keys) // 2]
+
+    async def plain_compare(x_api_key):
+        # The previous verify_api_key
+        if x_api_key != settings.api_key:
+            raise AssertionError("Invalid API key")
+        return True
+
+    presented = settings.api_key
+    before = await per_await_us(lambda: plain_compare(presented))
+    after = await per_await_us(lambda: verify_api_key(presented))
+    row("shared key (!= vs digest)", before, after)
+
+    async def query_lookup():
+        async with async_session_maker() as session:
+            return (await session.execute(
+                select(AgentKey.agent_id).where(AgentKey.key_hash == hash_key(agent_key))
+            )).scalar_one()
+
+    before = await per_await_us(query_lookup, iterations=min(args.iterations, 2000))
+    after = await per_await_us(lambda: verify_api_key(agent_key))
+    row("agent key (query vs index)", before, after)
+
+    transport = httpx.ASGITransport(app=app)
+    headers = {"Authorization": f"Bearer {token}"}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def verify_request():
+            response = await client.get("/auth/verify", headers=headers)
+            assert response.status_code == 200
+
+        requests = min(args.iterations, 5000)
+        await per_await_us(verify_request, iterations=200)  # warm up
+        web_auth.token_cache = uncached
+        before = await per_await_us(verify_request, iterations=requests)
+        web_auth.token_cache = cached
+        after = await per_await_us(verify_request, iterations=requests)
+        row("GET /auth/verify", before, after)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--agents", type=int, default=1000, help="per-agent keys in the index")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Settings are read at import time, so point the app at a scratch
+        # database before importing it
+        os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{tmp}/bench.db"
+        sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+        asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Agent queue latency by priority class under a mixed load.
+
+Runs the app in-process (httpx ASGITransport) against a throwaway SQLite
+database. A backlog of bulk ideas is marked for execution at once, then a
+steady stream of mixed-priority ideas keeps arriving while a pool of agents
+works the queue with claim-next -> start -> complete. Queue latency is the
+time from an idea's execute call returning to an agent claiming it.
+
+Usage:
+    python benchmarks/bench_queue.py [--backlog 300] [--arrivals 200]
+                                     [--rate 100] [--agents 4] [--work-ms 5]
+                                     [--fifo]
+
+--fifo queues every idea at the same priority, which reproduces the old
+updated_at-only ordering for comparison.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+CLASSES = [
+    # (name, priority, share of arrivals)
+    ("urgent", 0, 0.05),
+    ("normal", 2, 0.25),
+    ("bulk", 4, 0.70),
+]
+
+
+async def run(args) -> dict[str, list[float]]:
+    import httpx
+    from ideas.database import init_db
+    from ideas.main import app
+
+    await init_db()
+    queued_at: dict[int, tuple[str, float]] = {}
+    latencies: dict[str, list[float]] = defaultdict(list)
+    done = asyncio.Event()
+    expected = args.backlog + args.arrivals
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def enqueue(name: str, priority: int):
+            if args.fifo:
+                priority = 2
+            response = await client.post("/api/ideas", json={"content": f"{name} idea"})
+            idea_id = response.json()["id"]
+            await client.post(f"/api/ideas/{idea_id}/execute", json={"priority": priority})
+            queued_at[idea_id] = (name, time.perf_counter())
+
+        async def producer():
+            weights = [share for _, _, share in CLASSES]
+            for _ in range(args.arrivals):
+                name, priority, _ = random.choices(CLASSES, weights)[0]
+                await enqueue(name, priority)
+                await asyncio.sleep(1 / args.rate)
+
+        async def agent(agent_id: str):
+            body = {"agent_id": agent_id}
+            while not done.is_set():
+                response = await client.post("/api/agent/claim-next", json=body)
+                if response.status_code == 204:
+                    await asyncio.sleep(0.005)
+                    continue
+                idea_id = response.json()["id"]
+                claimed = time.perf_counter()
+                name, queued = queued_at.pop(idea_id)
+                latencies[name].append(claimed - queued)
+                await client.post(f"/api/agent/start/{idea_id}", json=body)
+                await asyncio.sleep(args.work_ms / 1000)
+                await client.post(f"/api/agent/complete/{idea_id}", json=body)
+                if sum(len(values) for values in latencies.values()) >= expected:
+                    done.set()
+
+        # Hundreds of bulk drafts marked for execution at once
+        for _ in range(args.backlog):
+            await enqueue("bulk", 4)
+        await asyncio.gather(
+            producer(),
+            *(agent(f"bench-agent-{n}") for n in range(args.agents)),
+        )
+    return latencies
+
+
+def report(latencies: dict[str, list[float]]):
+    print(f"{'class':<8} {'ideas':>6} {'p50 ms':>10} {'p95 ms':>10} {'max ms':>10}")
+    for name, _, _ in CLASSES:
+        values = sorted(value * 1000 for value in latencies.get(name, []))
+        if not values:
+            continue
+        p95 = values[max(int(len(values) * 0.95) - 1, 0)]
+        print(
+            f"{name:<8} {len(values):>6} {statistics.median(values):>10.1f}"
+            f" {p95:>10.1f} {values[-1]:>10.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--backlog", type=int, default=300, help="bulk ideas queued up front")
+    parser.add_argument("--arrivals", type=int, default=200, help="mixed ideas arriving during the run")
+    parser.add_argument("--rate", type=float, default=100.0, help="arrivals per second")
+    parser.add_argument("--agents", type=int, default=4)
+    parser.add_argument("--work-ms", type=float, default=5.0, help="simulated work per idea")
+    parser.add_argument("--fifo", action="store_true", help="queue everything at one priority")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Settings are read at import time, so point the app at a scratch
+        # database before importing it
+        os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{tmp}/bench.db"
+        os.environ.setdefault("LEASE_REAPER_ENABLED", "false")
+        sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+        mode = "single priority (FIFO)" if args.fifo else "priority"
+        print(f"Queue latency, {mode}: {args.backlog} bulk backlog + {args.arrivals} arrivals, "
+              f"{args.agents} agents")
+        report(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Response serialization: schema path vs. row-tuple fast path.
+
+Compares, at 1k, 10k and 100k rows:
+- list:   all ideas (GET /api/ideas without a limit)
+- thread: one idea with that many messages (GET /api/ideas/{id})
+
+"schema" is the previous path: ORM objects validated through
+IdeaResponse / IdeaWithMessages with from_attributes, dumped in JSON mode
+and encoded with the stdlib json module, as FastAPI's JSONResponse does.
+"fast" selects row tuples and encodes with orjson (and msgpack, when
+installed). Times include the query. The two JSON bodies are checked to
+be identical.
+
+Usage:
+    python benchmarks/bench_serialization.py [--sizes 1000 10000 100000] [--repeat 3]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+async def run(args):
+    from pydantic import TypeAdapter
+    from sqlalchemy import insert, select
+    from sqlalchemy.orm import selectinload
+
+    from ideas import serialization
+    from ideas.database import async_session_maker, init_db
+    from ideas.models import Idea, IdeaStatus, IdeaTag, Message, MessageType, utc_now
+    from ideas.schemas import IdeaResponse, IdeaWithMessages
+
+    await init_db()
+    list_adapter = TypeAdapter(list[IdeaResponse])
+    thread_adapter = TypeAdapter(IdeaWithMessages)
+
+    def stdlib_json(payload) -> bytes:
+        return json.dumps(payload, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+    async def schema_list(session):
+        ideas = (await session.execute(select(Idea))).scalars().all()
+        validated = list_adapter.validate_python(ideas, from_attributes=True)
+        return stdlib_json(list_adapter.dump_python(validated, mode="json"))
+
+    async def fast_list(session, accept=None):
+        ideas = await serialization.fetch_ideas(session, serialization.select_ideas())
+        return serialization.encode(ideas, accept)[0]
+
+    async def schema_thread(session, idea_id):
+        idea = (await session.execute(
+            select(Idea).options(selectinload(Idea.messages)).where(Idea.id == idea_id)
+        )).scalar_one()
+        validated = thread_adapter.validate_python(idea, from_attributes=True)
+        return stdlib_json(thread_adapter.dump_python(validated, mode="json"))
+
+    async def fast_thread(session, idea_id, accept=None):
+        [idea] = await serialization.fetch_ideas(
+            session, serialization.select_ideas().where(Idea.id == idea_id)
+        )
+        idea["messages"] = await serialization.fetch_messages(
+            session,
+            serialization.select_messages()
+            .where(Message.idea_id == idea_id)
+            .order_by(Message.created_at, Message.id)
+        )
+        return serialization.encode(idea, accept)[0]
+
+    async def best_of(path, *path_args) -> tuple[float, bytes]:
+        timings = []
+        for _ in range(args.repeat):
+            # Fresh session each run, so the identity map can't help the ORM path
+            async with async_session_maker() as session:
+                start = time.perf_counter()
+                body = await path(session, *path_args)
+                timings.append(time.perf_counter() - start)
+        return min(timings) * 1000, body
+
+    async with async_session_maker() as session:
+        thread_id = (await session.execute(
+            insert(Idea).values(content="Thread under test", status=IdeaStatus.EXECUTING).returning(Idea.id)
+        )).scalar_one()
+        await session.commit()
+
+    msgpack = serialization.msgpack is not None
+    print(f"{'rows':>8} {'response':<8} {'schema ms':>10} {'fast ms':>10} {'speedup':>8}"
+          + (f" {'msgpack ms':>11}" if msgpack else "") + f" {'json bytes':>11}")
+    ideas, messages = 1, 0
+    for size in sorted(args.sizes):
+        now = utc_now()
+        async with async_session_maker() as session:
+            idea_rows = [
+                {
+                    "content": f"Benchmark idea {n} " + "lorem ipsum " * 8,
+                    "status": IdeaStatus.PENDING,
+                    "agent_id": None,
+                    "created_at": now,
+                    "updated_at": now,
+                    "message_count": 3,
+                    "last_message_at": now,
+                    "last_message_type": MessageType.SYSTEM_EVENT,
+                }
+                for n in range(ideas, size)
+            ]
+            if idea_rows:
+                await session.execute(insert(Idea), idea_rows)
+                await session.execute(insert(IdeaTag), [
+                    {"idea_id": idea_id, "tag": "python"} for idea_id in range(ideas + 1, size + 1, 10)
+                ])
+            await session.execute(insert(Message), [
+                {
+                    "idea_id": thread_id,
+                    "type": MessageType.AGENT_FEEDBACK,
+                    "content": f"Progress update {n} " + "lorem ipsum " * 8,
+                    "created_at": now,
+                }
+                for n in range(messages, size)
+            ])
+            await session.commit()
+        ideas = messages = size
+
+        for name, schema_path, fast_path, path_args in (
+            ("list", schema_list, fast_list, ()),
+            ("thread", schema_thread, fast_thread, (thread_id,)),
+        ):
+            schema_ms, schema_body = await best_of(schema_path, *path_args)
+            fast_ms, fast_body = await best_of(fast_path, *path_args)
+            assert fast_body == schema_body, f"{name} bodies differ at {size} rows"
+            line = f"{size:>8} {name:<8} {schema_ms:>10.1f} {fast_ms:>10.1f} {schema_ms / fast_ms:>7.1f}x"
+            if msgpack:
+                msgpack_ms, _ = await best_of(fast_path, *path_args, serialization.MSGPACK_MEDIA_TYPE)
+                line += f" {msgpack_ms:>11.1f}"
+            print(line + f" {len(fast_body):>11}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement; best is reported")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Settings are read at import time, so point the app at a scratch
+        # database before importing it
+        os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{tmp}/bench.db"
+        sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+        asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,17 @@
+"""
+Load generator for the full agent lifecycle.
+
+N simulated agents run poll -> claim -> start -> feedback x k -> complete
+while M simulated web users create and execute ideas, browse the list,
+open ideas and reply. Every request is timed per endpoint; the run reports
+throughput and p50/p95/p99 latency and writes the results as JSON, so two
+commits can be compared with --baseline.
+
+The app is driven either in-process through httpx.ASGITransport (as
+tests/conftest.py does) or over HTTP against a local uvicorn process, each
+with a throwaway SQLite database. Run from the repository root:
+
+    python -m benchmarks.loadtest --target inprocess --agents 8 --users 4
+    python -m benchmarks.loadtest --target uvicorn --output results.json
+    python -m benchmarks.loadtest --baseline results.json
+"""
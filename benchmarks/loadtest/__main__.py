@@ -0,0 +1,95 @@
+"""Command line entry point: python -m benchmarks.loadtest --help"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from dataclasses import asdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+from . import __doc__ as package_doc
+from .scenario import Workload, run_workload
+from .stats import print_summary
+from .targets import TARGETS
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def run(target: str, workload: Workload) -> dict:
+    async with TARGETS[target](connections=workload.agents + workload.users) as client:
+        recorder = await run_workload(client, workload)
+    return recorder.summary()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=package_doc.strip().split("\n\n")[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--target", choices=sorted(TARGETS), default="inprocess")
+    parser.add_argument("--agents", type=int, default=8, help="concurrent agents")
+    parser.add_argument("--users", type=int, default=4, help="concurrent web users")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of load")
+    parser.add_argument("--feedback", type=int, default=3, help="feedback messages per lifecycle")
+    parser.add_argument("--work-ms", type=float, default=0.0, help="simulated agent work between steps")
+    parser.add_argument("--think-ms", type=float, default=50.0, help="web user pause between actions")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", type=Path, help="write results as JSON to this file")
+    parser.add_argument("--baseline", type=Path, help="JSON results of an earlier run to compare with")
+    args = parser.parse_args()
+
+    workload = Workload(
+        agents=args.agents,
+        users=args.users,
+        duration=args.duration,
+        feedback=args.feedback,
+        work_ms=args.work_ms,
+        think_ms=args.think_ms,
+        seed=args.seed,
+    )
+    baseline = json.loads(args.baseline.read_text()) if args.baseline else None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Settings are read at import time, so point the app (or the uvicorn
+        # child process) at a scratch database before anything imports it
+        os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{tmp}/loadtest.db"
+        print(
+            f"Load test ({args.target}): {workload.agents} agents, {workload.users} users,"
+            f" {workload.duration:.0f}s, {workload.feedback} feedback per lifecycle\n"
+        )
+        summary = asyncio.run(run(args.target, workload))
+
+    print_summary(summary, baseline)
+    if args.output:
+        results = {
+            "meta": {
+                "commit": git_commit(),
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "target": args.target,
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "workload": asdict(workload),
+            },
+            "summary": summary,
+        }
+        args.output.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""Simulated agents and web users."""
+
+import asyncio
+import random
+from dataclasses import dataclass
+
+import httpx
+
+from .stats import Recorder
+
+
+@dataclass
+class Workload:
+    agents: int = 8
+    users: int = 4
+    duration: float = 20.0
+    feedback: int = 3  # feedback messages per lifecycle
+    work_ms: float = 0.0  # simulated agent work between steps
+    think_ms: float = 50.0  # web user pause between actions
+    seed: int = 1
+
+
+async def request(
+    client: httpx.AsyncClient,
+    recorder: Recorder,
+    endpoint: str,
+    method: str,
+    url: str,
+    expected: tuple[int, ...] = (),
+    **kwargs,
+) -> httpx.Response:
+    """Send one timed request; ``endpoint`` is the route template it is filed under."""
+    with recorder.measure(endpoint):
+        response = await client.request(method, url, **kwargs)
+    recorder.record_status(endpoint, response.status_code, expected)
+    return response
+
+
+async def agent(client: httpx.AsyncClient, recorder: Recorder, workload: Workload, name: str, stop: asyncio.Event):
+    body = {"agent_id": name}
+    pause = workload.work_ms / 1000
+    rng = random.Random(f"{workload.seed}-{name}")
+    while not stop.is_set():
+        response = await request(client, recorder, "GET /api/agent/poll", "GET", "/api/agent/poll")
+        pending = [idea["id"] for idea in response.json() if idea["status"] == "pending"]
+        if not pending:
+            await asyncio.sleep(0.01)
+            continue
+
+        # Agents race for the head of the queue; a lost race is a conflict
+        idea_id = rng.choice(pending[:4])
+        response = await request(
+            client, recorder, "POST /api/agent/claim/{id}", "POST",
+            f"/api/agent/claim/{idea_id}", expected=(400, 409), json=body,
+        )
+        if response.status_code != 200:
+            continue
+
+        await request(client, recorder, "POST /api/agent/start/{id}", "POST", f"/api/agent/start/{idea_id}", json=body)
+        for step in range(workload.feedback):
+            await asyncio.sleep(pause)
+            await request(
+                client, recorder, "POST /api/agent/feedback/{id}", "POST",
+                f"/api/agent/feedback/{idea_id}", json={**body, "content": f"Step {step + 1} done"},
+            )
+        await asyncio.sleep(pause)
+        await request(
+            client, recorder, "POST /api/agent/complete/{id}", "POST",
+            f"/api/agent/complete/{idea_id}", json={**body, "summary": "Benchmark lifecycle finished"},
+        )
+        recorder.counters["lifecycles"] += 1
+
+
+async def web_user(client: httpx.AsyncClient, recorder: Recorder, workload: Workload, name: str, stop: asyncio.Event):
+    rng = random.Random(f"{workload.seed}-{name}")
+    think = workload.think_ms / 1000
+    mine: list[int] = []
+    while not stop.is_set():
+        action = rng.random()
+        if action < 0.4 or not mine:
+            response = await request(
+                client, recorder, "POST /api/ideas", "POST", "/api/ideas",
+                json={"content": f"Idea from {name}: " + "details " * rng.randint(5, 40)},
+            )
+            idea_id = response.json()["id"]
+            mine.append(idea_id)
+            await request(client, recorder, "POST /api/ideas/{id}/execute", "POST", f"/api/ideas/{idea_id}/execute")
+        elif action < 0.65:
+            await request(client, recorder, "GET /api/ideas", "GET", "/api/ideas", params={"limit": 50})
+        elif action < 0.85:
+            idea_id = rng.choice(mine[-20:])
+            await request(client, recorder, "GET /api/ideas/{id}", "GET", f"/api/ideas/{idea_id}")
+        else:
+            idea_id = rng.choice(mine[-20:])
+            await request(
+                client, recorder, "POST /api/ideas/{id}/messages", "POST",
+                f"/api/ideas/{idea_id}/messages", json={"content": "One more thing to consider"},
+            )
+        await asyncio.sleep(think)
+
+
+async def run_workload(client: httpx.AsyncClient, workload: Workload) -> Recorder:
+    """Run agents and web users against ``client`` for ``workload.duration`` seconds."""
+    recorder = Recorder()
+    stop = asyncio.Event()
+    tasks = [
+        *(asyncio.create_task(agent(client, recorder, workload, f"agent-{n}", stop)) for n in range(workload.agents)),
+        *(asyncio.create_task(web_user(client, recorder, workload, f"user-{n}", stop)) for n in range(workload.users)),
+    ]
+    try:
+        await asyncio.sleep(workload.duration)
+    finally:
+        stop.set()
+        # Let in-flight lifecycles finish their current request
+        await asyncio.gather(*tasks)
+        recorder.stop()
+    return recorder
@@ -0,0 +1,100 @@
+"""Per-endpoint latency recording and summaries."""
+
+import math
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(fraction * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+class Recorder:
+    """Collects latencies and outcomes keyed by endpoint name."""
+
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+        self.conflicts: dict[str, int] = defaultdict(int)
+        self.counters: dict[str, int] = defaultdict(int)
+        self.started = time.perf_counter()
+        self.finished = None
+
+    @contextmanager
+    def measure(self, endpoint: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.latencies[endpoint].append(time.perf_counter() - start)
+
+    def record_status(self, endpoint: str, status_code: int, expected: tuple[int, ...] = ()):
+        """Count non-2xx answers; ``expected`` codes are races, not failures."""
+        if status_code in expected:
+            self.conflicts[endpoint] += 1
+        elif status_code >= 300:
+            self.errors[endpoint] += 1
+
+    def stop(self):
+        self.finished = time.perf_counter()
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    def summary(self) -> dict:
+        elapsed = self.elapsed
+        endpoints = {}
+        for endpoint in sorted(self.latencies):
+            values = sorted(self.latencies[endpoint])
+            endpoints[endpoint] = {
+                "count": len(values),
+                "errors": self.errors[endpoint],
+                "conflicts": self.conflicts[endpoint],
+                "rps": len(values) / elapsed,
+                "p50_ms": percentile(values, 0.50) * 1000,
+                "p95_ms": percentile(values, 0.95) * 1000,
+                "p99_ms": percentile(values, 0.99) * 1000,
+                "max_ms": values[-1] * 1000,
+            }
+        total = sum(endpoint["count"] for endpoint in endpoints.values())
+        return {
+            "elapsed_s": elapsed,
+            "requests": total,
+            "rps": total / elapsed,
+            "errors": sum(self.errors.values()),
+            **dict(self.counters),
+            "endpoints": endpoints,
+        }
+
+
+def print_summary(summary: dict, baseline: dict | None = None):
+    """Print a table of the summary, with p95 change against a baseline run."""
+    header = f"{'endpoint':<34} {'count':>7} {'err':>5} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+    if baseline:
+        header += f" {'p95 vs base':>12}"
+    print(header)
+    base_endpoints = baseline["summary"]["endpoints"] if baseline else {}
+    for endpoint, stats in summary["endpoints"].items():
+        line = (
+            f"{endpoint:<34} {stats['count']:>7} {stats['errors']:>5} {stats['rps']:>8.1f}"
+            f" {stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f}"
+        )
+        base = base_endpoints.get(endpoint)
+        if base and base["p95_ms"]:
+            line += f" {(stats['p95_ms'] / base['p95_ms'] - 1) * 100:>+11.0f}%"
+        print(line)
+    print(
+        f"\n{summary['requests']} requests in {summary['elapsed_s']:.1f}s"
+        f" ({summary['rps']:.0f} req/s), {summary['errors']} errors,"
+        f" {summary.get('lifecycles', 0)} agent lifecycles completed"
+    )
+    if baseline:
+        base_summary = baseline["summary"]
+        change = (summary["rps"] / base_summary["rps"] - 1) * 100 if base_summary["rps"] else 0.0
+        print(f"Throughput vs baseline ({baseline['meta'].get('commit', '?')}): {change:+.0f}%")
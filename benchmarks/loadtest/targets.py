@@ -0,0 +1,81 @@
+"""Ways to reach the app: in-process ASGI or a local uvicorn server.
+
+Both read settings from the environment at import/start-up, so the caller
+sets DATABASE_URL to a scratch database first.
+"""
+
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator
+
+import httpx
+
+SRC_DIR = Path(__file__).resolve().parents[2] / "src"
+
+
+@asynccontextmanager
+async def inprocess_client(connections: int) -> AsyncIterator[httpx.AsyncClient]:
+    """Drive the app through httpx.ASGITransport, as the tests do."""
+    if str(SRC_DIR) not in sys.path:
+        sys.path.insert(0, str(SRC_DIR))
+    from ideas.main import app, lifespan
+
+    # ASGITransport doesn't send lifespan events; run the lifespan here so
+    # the schema exists and background tasks (group commit, lease reaper)
+    # run as in production
+    async with lifespan(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as client:
+            yield client
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@asynccontextmanager
+async def uvicorn_client(connections: int, startup_timeout: float = 30.0) -> AsyncIterator[httpx.AsyncClient]:
+    """Start uvicorn on a free port and talk to it over HTTP keep-alive connections."""
+    port = free_port()
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [str(SRC_DIR), os.environ.get("PYTHONPATH")]))}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "ideas.main:app",
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning", "--no-access-log"],
+        env=env,
+    )
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + startup_timeout
+            while True:
+                if server.poll() is not None:
+                    raise RuntimeError(f"uvicorn exited with status {server.returncode}")
+                try:
+                    if (await client.get("/health")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if loop.time() > deadline:
+                    raise RuntimeError("uvicorn did not become healthy in time")
+                await asyncio.sleep(0.1)
+            yield client
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+TARGETS = {
+    "inprocess": inprocess_client,
+    "uvicorn": uvicorn_client,
+}
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Per-call latency of MCP tool HTTP calls: fresh client per call vs pooled client.
+
+Starts an in-process stand-in of the Ideas API (FastAPI served by uvicorn on
+a background thread, answering the agent routes with canned payloads) and
+drives the same poll/claim/start/feedback loop two ways:
+
+- before: a new ``httpx.Client`` per call, as the tools used to do
+- after:  the server's shared ``httpx.AsyncClient`` through the real tools
+
+Usage:
+    python benchmarks/bench_client.py [--calls 500]
+
+The stand-in is plain HTTP on localhost, so the numbers only include TCP
+connection setup; against the real HTTPS deployment the fresh-client path
+also pays a TLS handshake per call.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+
+IDEA = {
+    "id": 1,
+    "content": "Benchmark idea",
+    "status": "executing",
+    "agent_id": "bench-agent",
+    "created_at": "2026-01-07T09:00:00",
+    "updated_at": "2026-01-07T09:00:00",
+}
+CHANGE = {"id": 1, "old_status": "executing", "new_status": "executing", "message": "ok"}
+
+
+def build_stand_in() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/agent/poll")
+    async def poll():
+        return [IDEA]
+
+    @app.post("/api/agent/claim/{idea_id}")
+    @app.post("/api/agent/start/{idea_id}")
+    @app.post("/api/agent/feedback/{idea_id}")
+    async def change(idea_id: int):
+        return CHANGE
+
+    return app
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def serve(port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(build_stand_in(), port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+# One agent step: poll, claim, start, feedback
+STEPS = [
+    ("GET", "/api/agent/poll", None),
+    ("POST", "/api/agent/claim/1", {"agent_id": "bench-agent"}),
+    ("POST", "/api/agent/start/1", {"agent_id": "bench-agent"}),
+    ("POST", "/api/agent/feedback/1", {"agent_id": "bench-agent", "content": "progress"}),
+]
+
+
+def bench_fresh_client(base_url: str, calls: int) -> list[float]:
+    timings = []
+    for n in range(calls):
+        method, path, body = STEPS[n % len(STEPS)]
+        started = time.perf_counter()
+        with httpx.Client(base_url=base_url, timeout=30.0) as client:
+            client.request(method, path, json=body).raise_for_status()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+async def bench_pooled_tools(calls: int) -> list[float]:
+    from ideas_mcp import server
+
+    # Importing the MCP SDK turns on request logging; keep it out of the timings
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    tools = [
+        lambda: server.agent_poll(),
+        lambda: server.agent_claim(1),
+        lambda: server.agent_start(1),
+        lambda: server.agent_feedback(1, "progress"),
+    ]
+    timings = []
+    try:
+        for n in range(calls):
+            started = time.perf_counter()
+            await tools[n % len(tools)]()
+            timings.append(time.perf_counter() - started)
+    finally:
+        await server.close_client()
+    return timings
+
+
+def report(label: str, timings: list[float]):
+    timings_ms = sorted(t * 1000 for t in timings)
+    p50 = timings_ms[len(timings_ms) // 2]
+    p95 = timings_ms[int(len(timings_ms) * 0.95) - 1]
+    print(
+        f"{label:<28} mean {statistics.mean(timings_ms):7.3f} ms"
+        f"   p50 {p50:7.3f} ms   p95 {p95:7.3f} ms"
+        f"   {len(timings) / (sum(timings) or 1):8.0f} calls/s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--calls", type=int, default=500)
+    args = parser.parse_args()
+
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    os.environ["IDEAS_API_BASE_URL"] = base_url
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+    server = serve(port)
+    try:
+        # Warm up the stand-in before measuring
+        bench_fresh_client(base_url, 20)
+        report("before: client per call", bench_fresh_client(base_url, args.calls))
+        report("after: pooled AsyncClient", asyncio.run(bench_pooled_tools(args.calls)))
+    finally:
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
@@ -5,20 +5,82 @@ Ideas MCP Server - Model Context Protocol server for Ideas Execution Loop System
 This MCP server provides tools for AI agents to manage ideas through the Ideas API.
 """
 
+import json
+import os
 import httpx
+from contextlib import asynccontextmanager
 from typing import Optional
 from mcp.server.fastmcp import FastMCP
 
 # API Configuration
-API_BASE_URL = "https://ideas.u.jayliu.co.nz"
-AGENT_ID = "claude-mcp-agent"
+API_BASE_URL = os.environ.get("IDEAS_API_BASE_URL", "https://ideas.u.jayliu.co.nz")
+AGENT_ID = os.environ.get("IDEAS_AGENT_ID", "claude-mcp-agent")
+API_KEY = os.environ.get("IDEAS_API_KEY")
+
+# Connection pool settings
+HTTP2 = os.environ.get("IDEAS_HTTP2", "1") not in ("0", "false", "no")
+MAX_CONNECTIONS = int(os.environ.get("IDEAS_MAX_CONNECTIONS", "10"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get("IDEAS_MAX_KEEPALIVE_CONNECTIONS", "5"))
+KEEPALIVE_EXPIRY = float(os.environ.get("IDEAS_KEEPALIVE_EXPIRY", "60"))
+TIMEOUT = float(os.environ.get("IDEAS_TIMEOUT", "30"))
+IDEA_CACHE_SIZE = int(os.environ.get("IDEAS_IDEA_CACHE_SIZE", "256"))
+# Comma-separated capability tags; unset means the agent sees every idea
+AGENT_CAPABILITIES = os.environ.get("IDEAS_AGENT_CAPABILITIES")
+
+_client: Optional[httpx.AsyncClient] = None
+
+# idea_id -> (ETag, body) of the last full idea_get response
+_idea_cache: dict[int, tuple[str, str]] = {}
+
+# idea_id -> id of the newest message already returned to the agent
+_last_seen_message: dict[int, int] = {}
+
+
+# HTTP client for API calls: one long-lived pool so every tool call reuses
+# an open keep-alive (and, over TLS, HTTP/2) connection
+def get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        headers = {"X-API-Key": API_KEY} if API_KEY else None
+        _client = httpx.AsyncClient(
+            base_url=API_BASE_URL,
+            timeout=TIMEOUT,
+            headers=headers,
+            http2=HTTP2 and _h2_available(),
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=KEEPALIVE_EXPIRY,
+            ),
+        )
+    return _client
 
-# Create MCP server
-mcp = FastMCP("ideas")
 
-# HTTP client for API calls
-def get_client():
-    return httpx.Client(base_url=API_BASE_URL, timeout=30.0)
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def _h2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+@asynccontextmanager
+async def lifespan(server: FastMCP):
+    try:
+        yield
+    finally:
+        await close_client()
+
+
+# Create MCP server
+mcp = FastMCP("ideas", lifespan=lifespan)
 
 
 # ============================================================================
@@ -26,46 +88,97 @@ def get_client():
 # ============================================================================
 
 @mcp.tool()
-def idea_create(content: str) -> str:
+async def idea_create(
+    content: str,
+    priority: Optional[int] = None,
+    tags: Optional[list[str]] = None
+) -> str:
     """
     Create a new idea.
     
     Args:
         content: The idea content/description
+        priority: Optional queue priority 0-4, lower is more urgent (default 2)
+        tags: Optional capability tags an agent needs to work on it (e.g. ["python"])
     
     Returns:
         JSON response with created idea details including id and status
     """
-    with get_client() as client:
-        response = client.post("/api/ideas", json={"content": content})
-        response.raise_for_status()
-        return response.text
+    client = get_client()
+    payload = {"content": content}
+    if priority is not None:
+        payload["priority"] = priority
+    if tags:
+        payload["tags"] = tags
+    response = await client.post("/api/ideas", json=payload)
+    response.raise_for_status()
+    return response.text
 
 
 @mcp.tool()
-def idea_list(status_filter: Optional[str] = None) -> str:
+async def idea_list(
+    status_filter: Optional[str] = None,
+    limit: int = 20,
+    cursor: Optional[str] = None
+) -> str:
     """
-    List all ideas, optionally filtered by status.
+    List ideas one page at a time (newest first), optionally filtered by status.
     
     Args:
         status_filter: Optional status to filter by. 
                       Valid values: draft, pending, claimed, executing, 
                       waiting_user, waiting_agent, completed, failed, cancelled
+        limit: Page size (1-500, default 20)
+        cursor: Cursor from a previous call's next_cursor to fetch the next page
     
     Returns:
-        JSON array of ideas
+        JSON object with an "ideas" array and "next_cursor" (null on the last page)
     """
-    with get_client() as client:
-        params = {}
-        if status_filter:
-            params["status_filter"] = status_filter
-        response = client.get("/api/ideas", params=params)
-        response.raise_for_status()
-        return response.text
+    client = get_client()
+    params = {"limit": limit}
+    if status_filter:
+        params["status_filter"] = status_filter
+    if cursor:
+        params["cursor"] = cursor
+    response = await client.get("/api/ideas", params=params)
+    response.raise_for_status()
+    return json.dumps({
+        "ideas": response.json(),
+        "next_cursor": response.headers.get("X-Next-Cursor"),
+    })
 
 
 @mcp.tool()
-def idea_get(idea_id: int) -> str:
+async def idea_search(query: str, limit: int = 20, offset: int = 0) -> str:
+    """
+    Full-text search over idea content and message threads, best match first.
+    
+    Args:
+        query: Words to search for; every word must appear (words shorter
+               than three characters are ignored)
+        limit: Page size (1-100, default 20)
+        offset: Offset from a previous call's next_offset to fetch the next page
+    
+    Returns:
+        JSON object with a "results" array (each with the idea, a highlighted
+        snippet and the matching message_id, null when the idea itself matched)
+        and "next_offset" (null on the last page)
+    """
+    client = get_client()
+    response = await client.get(
+        "/api/ideas/search",
+        params={"q": query, "limit": limit, "offset": offset}
+    )
+    response.raise_for_status()
+    next_offset = response.headers.get("X-Next-Offset")
+    return json.dumps({
+        "results": response.json(),
+        "next_offset": int(next_offset) if next_offset else None,
+    })
+
+
+@mcp.tool()
+async def idea_get(idea_id: int) -> str:
     """
     Get a single idea with its complete message history.
     
@@ -75,14 +188,71 @@ def idea_get(idea_id: int) -> str:
     Returns:
         JSON object with idea details and messages array
     """
-    with get_client() as client:
-        response = client.get(f"/api/ideas/{idea_id}")
-        response.raise_for_status()
-        return response.text
+    client = get_client()
+    cached = _idea_cache.get(idea_id)
+    headers = {"If-None-Match": cached[0]} if cached else None
+    response = await client.get(f"/api/ideas/{idea_id}", headers=headers)
+    if response.status_code == 304 and cached:
+        return cached[1]
+    response.raise_for_status()
+    messages = response.json().get("messages") or []
+    if messages:
+        remember_seen(idea_id, max(message["id"] for message in messages))
+
+    etag = response.headers.get("ETag")
+    if etag:
+        _idea_cache.pop(idea_id, None)
+        if len(_idea_cache) >= IDEA_CACHE_SIZE:
+            # Evict the least recently refreshed entry
+            del _idea_cache[next(iter(_idea_cache))]
+        _idea_cache[idea_id] = (etag, response.text)
+    return response.text
+
+
+def remember_seen(idea_id: int, message_id: int):
+    _last_seen_message[idea_id] = max(message_id, _last_seen_message.get(idea_id, 0))
+
+
+@mcp.tool()
+async def idea_new_messages(
+    idea_id: int,
+    types: Optional[list[str]] = None,
+    limit: int = 100
+) -> str:
+    """
+    Get only the messages added to an idea since this server last returned
+    its thread (via idea_get or a previous idea_new_messages call).
+    
+    Use this instead of idea_get when resuming a waiting_agent idea to read
+    the user's new instruction without re-downloading the whole thread.
+    
+    Args:
+        idea_id: The ID of the idea
+        types: Optional message types to include
+               (user_input, agent_feedback, system_event)
+        limit: Maximum messages to return (1-500, default 100)
+    
+    Returns:
+        JSON object with a "messages" array (oldest first) and "has_more"
+        (call again to fetch the rest)
+    """
+    client = get_client()
+    params = {"after_id": _last_seen_message.get(idea_id, 0), "limit": limit}
+    if types:
+        params["types"] = types
+    response = await client.get(f"/api/ideas/{idea_id}/messages", params=params)
+    response.raise_for_status()
+    messages = response.json()
+    if messages:
+        remember_seen(idea_id, messages[-1]["id"])
+    return json.dumps({
+        "messages": messages,
+        "has_more": "X-Next-After-Id" in response.headers,
+    })
 
 
 @mcp.tool()
-def idea_update(idea_id: int, content: str) -> str:
+async def idea_update(idea_id: int, content: str) -> str:
     """
     Update an idea's content.
     
@@ -93,32 +263,34 @@ def idea_update(idea_id: int, content: str) -> str:
     Returns:
         JSON object with updated idea details
     """
-    with get_client() as client:
-        response = client.put(f"/api/ideas/{idea_id}", json={"content": content})
-        response.raise_for_status()
-        return response.text
+    client = get_client()
+    response = await client.put(f"/api/ideas/{idea_id}", json={"content": content})
+    response.raise_for_status()
+    return response.text
 
 
 @mcp.tool()
-def idea_execute(idea_id: int) -> str:
+async def idea_execute(idea_id: int, priority: Optional[int] = None) -> str:
     """
     Mark an idea for execution. Changes status from 'draft' to 'pending'.
     This makes the idea available for agents to claim and execute.
     
     Args:
         idea_id: The ID of the idea to execute
+        priority: Optional queue priority 0-4 to set, lower is claimed first
     
     Returns:
         JSON object with status change details
     """
-    with get_client() as client:
-        response = client.post(f"/api/ideas/{idea_id}/execute")
-        response.raise_for_status()
-        return response.text
+    client = get_client()
+    payload = {"priority": priority} if priority is not None else None
+    response = await client.post(f"/api/ideas/{idea_id}/execute", json=payload)
+    response.raise_for_status()
+    return response.text
 
 
 @mcp.tool()
-def idea_cancel(idea_id: int) -> str:
+async def idea_cancel(idea_id: int) -> str:
     """
     Cancel an idea's execution.
     Cannot cancel ideas that are already completed, failed, or cancelled.
@@ -129,14 +301,14 @@ def idea_cancel(idea_id: int) -> str:
     Returns:
         JSON object with status change details
     """
-    with get_client() as client:
-        response = client.post(f"/api/ideas/{idea_id}/cancel")
-        response.raise_for_status()
-        return response.text
+    client = get_client()
+    response = await client.post(f"/api/ideas/{idea_id}/cancel")
+    response.raise_for_status()
+    return response.text
 
 
 @mcp.tool()
-def idea_reply(idea_id: int, content: str) -> str:
+async def idea_reply(idea_id: int, content: str) -> str:
     """
     Add a user message/instruction to an idea's thread.
     If the idea is waiting for user input, this will transition it to waiting_agent.
@@ -148,32 +320,43 @@ def idea_reply(idea_id: int, content: str) -> str:
     Returns:
         JSON object with created message details
     """
-    with get_client() as client:
-        response = client.post(f"/api/ideas/{idea_id}/messages", json={"content": content})
-        response.raise_for_status()
-        return response.text
+    client = get_client()
+    response = await client.post(f"/api/ideas/{idea_id}/messages", json={"content": content})
+    response.raise_for_status()
+    return response.text
 
 
 # ============================================================================
 # Agent Execution Tools
 # ============================================================================
 
+def capability_params() -> dict:
+    return {"capabilities": AGENT_CAPABILITIES} if AGENT_CAPABILITIES is not None else {}
+
+
 @mcp.tool()
-def agent_poll() -> str:
+async def agent_poll(wait: int = 0) -> str:
     """
-    Poll for available tasks. Returns ideas with status 'pending' or 'waiting_agent'.
+    Poll for available tasks. Returns ideas with status 'pending' or 'waiting_agent'
+    that this agent's capabilities (IDEAS_AGENT_CAPABILITIES) cover.
+    
+    Args:
+        wait: Optional seconds (0-60) to long-poll when no task is available yet
     
     Returns:
         JSON array of ideas available for execution
     """
-    with get_client() as client:
-        response = client.get("/api/agent/poll")
-        response.raise_for_status()
-        return response.text
+    client = get_client()
+    params = capability_params()
+    if wait:
+        params["wait"] = wait
+    response = await client.get("/api/agent/poll", params=params, timeout=TIMEOUT + wait)
+    response.raise_for_status()
+    return response.text
 
 
 @mcp.tool()
-def agent_claim(idea_id: int) -> str:
+async def agent_claim(idea_id: int) -> str:
     """
     Claim an idea for execution. The idea must be in 'pending' status.
     Once claimed, other agents cannot work on this idea.
@@ -184,17 +367,38 @@ def agent_claim(idea_id: int) -> str:
     Returns:
         JSON object with status change details
     """
-    with get_client() as client:
-        response = client.post(
-            f"/api/agent/claim/{idea_id}",
-            json={"agent_id": AGENT_ID}
-        )
-        response.raise_for_status()
-        return response.text
+    client = get_client()
+    response = await client.post(
+        f"/api/agent/claim/{idea_id}",
+        json={"agent_id": AGENT_ID}
+    )
+    response.raise_for_status()
+    return response.text
+
+
+@mcp.tool()
+async def agent_claim_next() -> str:
+    """
+    Atomically claim the most urgent pending idea this agent can handle.
+    Unlike agent_poll + agent_claim, this never races other agents.
+    
+    Returns:
+        JSON object with the claimed idea, or a note that no task is available
+    """
+    client = get_client()
+    response = await client.post(
+        "/api/agent/claim-next",
+        params=capability_params(),
+        json={"agent_id": AGENT_ID}
+    )
+    response.raise_for_status()
+    if response.status_code == 204:
+        return '{"detail": "No pending task available"}'
+    return response.text
 
 
 @mcp.tool()
-def agent_start(idea_id: int) -> str:
+async def agent_start(idea_id: int) -> str:
     """
     Start or resume execution of a claimed idea.
     The idea must be in 'claimed' or 'waiting_agent' status.
@@ -205,17 +409,40 @@ def agent_start(idea_id: int) -> str:
     Returns:
         JSON object with status change details
     """
-    with get_client() as client:
-        response = client.post(
-            f"/api/agent/start/{idea_id}",
-            json={"agent_id": AGENT_ID}
-        )
-        response.raise_for_status()
-        return response.text
+    client = get_client()
+    response = await client.post(
+        f"/api/agent/start/{idea_id}",
+        json={"agent_id": AGENT_ID}
+    )
+    response.raise_for_status()
+    return response.text
 
 
 @mcp.tool()
-def agent_feedback(idea_id: int, content: str) -> str:
+async def agent_heartbeat(idea_id: int) -> str:
+    """
+    Renew the lease on a claimed or executing idea.
+    Claiming, starting and feedback already renew it; call this during long
+    stretches without feedback, or the idea is returned to the queue when
+    the lease expires.
+    
+    Args:
+        idea_id: The ID of the idea being worked on
+    
+    Returns:
+        JSON object with the idea's status and new lease_expires_at
+    """
+    client = get_client()
+    response = await client.post(
+        f"/api/agent/heartbeat/{idea_id}",
+        json={"agent_id": AGENT_ID}
+    )
+    response.raise_for_status()
+    return response.text
+
+
+@mcp.tool()
+async def agent_feedback(idea_id: int, content: str) -> str:
     """
     Submit progress feedback during execution.
     The idea must be in 'executing' status.
@@ -227,17 +454,17 @@ def agent_feedback(idea_id: int, content: str) -> str:
     Returns:
         JSON object confirming feedback was recorded
     """
-    with get_client() as client:
-        response = client.post(
-            f"/api/agent/feedback/{idea_id}",
-            json={"agent_id": AGENT_ID, "content": content}
-        )
-        response.raise_for_status()
-        return response.text
+    client = get_client()
+    response = await client.post(
+        f"/api/agent/feedback/{idea_id}",
+        json={"agent_id": AGENT_ID, "content": content}
+    )
+    response.raise_for_status()
+    return response.text
 
 
 @mcp.tool()
-def agent_ask(idea_id: int, question: str) -> str:
+async def agent_ask(idea_id: int, question: str) -> str:
     """
     Request user input/decision. Pauses execution and waits for user response.
     The idea must be in 'executing' status.
@@ -249,17 +476,17 @@ def agent_ask(idea_id: int, question: str) -> str:
     Returns:
         JSON object with status change to 'waiting_user'
     """
-    with get_client() as client:
-        response = client.post(
-            f"/api/agent/ask/{idea_id}",
-            json={"agent_id": AGENT_ID, "question": question}
-        )
-        response.raise_for_status()
-        return response.text
+    client = get_client()
+    response = await client.post(
+        f"/api/agent/ask/{idea_id}",
+        json={"agent_id": AGENT_ID, "question": question}
+    )
+    response.raise_for_status()
+    return response.text
 
 
 @mcp.tool()
-def agent_complete(idea_id: int, summary: Optional[str] = None) -> str:
+async def agent_complete(idea_id: int, summary: Optional[str] = None) -> str:
     """
     Mark an idea as completed.
     The idea must be in 'executing' status.
@@ -271,17 +498,17 @@ def agent_complete(idea_id: int, summary: Optional[str] = None) -> str:
     Returns:
         JSON object with status change to 'completed'
     """
-    with get_client() as client:
-        payload = {"agent_id": AGENT_ID}
-        if summary:
-            payload["summary"] = summary
-        response = client.post(f"/api/agent/complete/{idea_id}", json=payload)
-        response.raise_for_status()
-        return response.text
+    client = get_client()
+    payload = {"agent_id": AGENT_ID}
+    if summary:
+        payload["summary"] = summary
+    response = await client.post(f"/api/agent/complete/{idea_id}", json=payload)
+    response.raise_for_status()
+    return response.text
 
 
 @mcp.tool()
-def agent_fail(idea_id: int, reason: str) -> str:
+async def agent_fail(idea_id: int, reason: str) -> str:
     """
     Mark an idea as failed.
     The idea must be in 'executing' status.
@@ -293,13 +520,13 @@ def agent_fail(idea_id: int, reason: str) -> str:
     Returns:
         JSON object with status change to 'failed'
     """
-    with get_client() as client:
-        response = client.post(
-            f"/api/agent/fail/{idea_id}",
-            json={"agent_id": AGENT_ID, "reason": reason}
-        )
-        response.raise_for_status()
-        return response.text
+    client = get_client()
+    response = await client.post(
+        f"/api/agent/fail/{idea_id}",
+        json={"agent_id": AGENT_ID, "reason": reason}
+    )
+    response.raise_for_status()
+    return response.text
 
 
 # ============================================================================
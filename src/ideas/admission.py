@@ -0,0 +1,239 @@
+"""Admission control: per-client rate limits and adaptive load shedding.
+
+Each client gets a token bucket per route group: agent polls and writes
+(any POST/PUT/PATCH/DELETE under /api) have separate rates, so a hot poll
+loop can't use up a client's write budget. A request without a token gets
+429 with Retry-After. Clients are told apart by the agent their API key is
+bound to, else by the client address; nothing the client can freely choose
+(such as an agent id header) is used, or changing it would buy a fresh
+bucket.
+
+On top of that, API requests are shed with 503 and Retry-After while too
+many are in flight or the database time per request (an exponentially
+weighted average, decaying while nothing is measured) is over a threshold.
+Long-polls (``wait`` > 0) are not counted in flight: they spend most of
+their time parked without a connection, and counting them would let idle
+agents shed everyone else.
+
+Everything is in memory; deciding costs no database round trip.
+"""
+import math
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qsl
+from typing import Optional
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .auth import agent_key_index
+from .config import settings
+from .database import track_queries
+
+POLL_PATH = "/api/agent/poll"
+WRITE_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+
+
+def route_group(scope: Scope) -> Optional[str]:
+    """The rate-limited group a request belongs to, or None if it isn't limited."""
+    path = scope["path"]
+    if not path.startswith("/api/"):
+        return None
+    if path == POLL_PATH:
+        return "poll"
+    if scope["method"] in WRITE_METHODS:
+        return "write"
+    return None
+
+
+def is_long_poll(scope: Scope) -> bool:
+    if scope["path"] != POLL_PATH:
+        return False
+    for name, value in parse_qsl(scope["query_string"].decode("latin-1")):
+        if name == "wait":
+            return value.isdigit() and int(value) > 0
+    return False
+
+
+def client_identity(scope: Scope) -> str:
+    for name, value in scope["headers"]:
+        if name == b"x-api-key":
+            agent_id = agent_key_index.lookup(value.decode("latin-1"))
+            if agent_id is not None:
+                return f"agent:{agent_id}"
+            break
+    client = scope.get("client")
+    return f"client:{client[0]}" if client else "client:unknown"
+
+
+class TokenBucket:
+    """``rate`` tokens per second, holding at most ``burst``."""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: int, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        """Take a token; return 0, or the seconds until one is available."""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """Token buckets per client, bounded by an LRU of ``max_clients``."""
+
+    def __init__(self, rate: float, burst: int, max_clients: int = 10000):
+        self._rate = rate
+        self._burst = burst
+        self._max_clients = max_clients
+        self._buckets: OrderedDict[str, TokenBucket] = OrderedDict()
+
+    def acquire(self, client: str, now: Optional[float] = None) -> float:
+        """Take a token for ``client``; return 0, or the seconds to wait."""
+        now = time.monotonic() if now is None else now
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = TokenBucket(self._rate, self._burst, now)
+            if len(self._buckets) > self._max_clients:
+                # An evicted client simply starts again with a full bucket
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client)
+        return bucket.take(now)
+
+
+class LoadShedder:
+    """Tracks in-flight API requests and their database time."""
+
+    def __init__(
+        self,
+        max_in_flight: Optional[int] = None,
+        max_db_ms: Optional[float] = None,
+        half_life: float = 1.0,
+        weight: float = 0.2,
+    ):
+        self.max_in_flight = max_in_flight
+        self.max_db_ms = max_db_ms
+        self.half_life = half_life
+        self.weight = weight
+        self.in_flight = 0
+        self._db_ms = 0.0
+        self._measured = time.monotonic()
+
+    def db_ms(self, now: Optional[float] = None) -> float:
+        """Average database time per request, halving every ``half_life``
+        seconds without a measurement so shedding can't lock itself in."""
+        now = time.monotonic() if now is None else now
+        return self._db_ms * 0.5 ** (max(now - self._measured, 0.0) / self.half_life)
+
+    def record(self, db_seconds: float, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        self._db_ms = self.weight * db_seconds * 1000 + (1 - self.weight) * self.db_ms(now)
+        self._measured = now
+
+    def overloaded(self) -> bool:
+        if self.max_in_flight is not None and self.in_flight >= self.max_in_flight:
+            return True
+        return self.max_db_ms is not None and self.db_ms() > self.max_db_ms
+
+
+class AdmissionMiddleware:
+    """Apply the rate limiters and load shedder to API requests."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        limiters: Optional[dict[str, RateLimiter]] = None,
+        shedder: Optional[LoadShedder] = None,
+        retry_after: int = 1,
+    ):
+        self.app = app
+        self.limiters = limiters or {}
+        self.shedder = shedder
+        self.retry_after = retry_after
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not scope["path"].startswith("/api/"):
+            await self.app(scope, receive, send)
+            return
+
+        limiter = self.limiters.get(route_group(scope))
+        if limiter is not None:
+            wait = limiter.acquire(client_identity(scope))
+            if wait:
+                response = JSONResponse(
+                    {"detail": "Rate limit exceeded"},
+                    status_code=429,
+                    headers={"Retry-After": str(math.ceil(wait))},
+                )
+                await response(scope, receive, send)
+                return
+
+        shedder = self.shedder
+        if shedder is None:
+            await self.app(scope, receive, send)
+            return
+        if shedder.overloaded():
+            response = JSONResponse(
+                {"detail": "Server busy, retry later"},
+                status_code=503,
+                headers={"Retry-After": str(self.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+
+        # Counted until the response starts, so open SSE streams don't
+        # hold a slot
+        counted = not is_long_poll(scope)
+        if counted:
+            shedder.in_flight += 1
+        admitted = True
+
+        with track_queries() as stats:
+            def release():
+                nonlocal admitted
+                if admitted:
+                    admitted = False
+                    if counted:
+                        shedder.in_flight -= 1
+                    if stats.count:
+                        shedder.record(stats.seconds)
+
+            async def send_wrapper(message: Message):
+                if message["type"] == "http.response.start":
+                    release()
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                release()
+
+
+def admission_options() -> dict:
+    """AdmissionMiddleware arguments from the settings."""
+    limiters = {}
+    if settings.rate_limit_enabled:
+        limiters = {
+            "poll": RateLimiter(settings.rate_limit_poll_per_second, settings.rate_limit_poll_burst),
+            "write": RateLimiter(settings.rate_limit_write_per_second, settings.rate_limit_write_burst),
+        }
+    shedder = None
+    if settings.load_shedding_enabled:
+        shedder = LoadShedder(
+            max_in_flight=settings.load_shedding_max_in_flight or None,
+            max_db_ms=settings.load_shedding_max_db_ms or None,
+        )
+    return {
+        "limiters": limiters,
+        "shedder": shedder,
+        "retry_after": settings.load_shedding_retry_after_seconds,
+    }
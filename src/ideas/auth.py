@@ -1,22 +1,98 @@
+import hashlib
+import hmac
+import secrets
 from typing import Optional
 from fastapi import Depends, HTTPException, Header, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
 from .config import settings
+from .models import AgentKey
+
+AGENT_KEY_PREFIX = "ik_"
+
+
+def hash_key(key: str) -> str:
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def generate_agent_key() -> str:
+    return AGENT_KEY_PREFIX + secrets.token_urlsafe(32)
+
+
+class AgentKeyIndex:
+    """Key hash -> agent id for every per-agent key, so authenticating a
+    request costs a hash and a dict lookup instead of a query.
+
+    Loaded at startup and reloaded after keys are created or revoked. Looking
+    up by hash means the presented key is never compared with a stored one.
+    """
+
+    def __init__(self):
+        self._agents: dict[str, str] = {}
+
+    def lookup(self, key: str) -> Optional[str]:
+        if not self._agents:
+            return None
+        return self._agents.get(hash_key(key))
+
+    async def reload(self, session: AsyncSession):
+        result = await session.execute(select(AgentKey.key_hash, AgentKey.agent_id))
+        self._agents = dict(result.all())
+
+    async def load(self, session_maker: async_sessionmaker):
+        async with session_maker() as session:
+            await self.reload(session)
+
+    def clear(self):
+        self._agents = {}
+
 
+agent_key_index = AgentKeyIndex()
 
-async def verify_api_key(x_api_key: Optional[str] = Header(None)):
+
+async def verify_api_key(x_api_key: Optional[str] = Header(None)) -> Optional[str]:
+    """Authenticate the request and return the agent its key is bound to.
+
+    None means the shared API_KEY was used (or keys are disabled), which may
+    act as any agent.
+    """
     if not settings.api_key_enabled:
-        return True
-    
+        return None
+
     if not x_api_key:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="API key required"
         )
-    
-    if x_api_key != settings.api_key:
+
+    if hmac.compare_digest(x_api_key.encode(), settings.api_key.encode()):
+        return None
+
+    agent_id = agent_key_index.lookup(x_api_key)
+    if agent_id is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid API key"
         )
-    
-    return True
+
+    return agent_id
+
+
+async def require_admin_key(key_agent: Optional[str] = Depends(verify_api_key)):
+    """Only the shared key may manage keys; an agent key can't mint more."""
+    if key_agent is not None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Agent keys cannot manage API keys"
+        )
+
+
+def authorize_agent(agent_id: str, key_agent: Optional[str]) -> str:
+    """Return the agent a request acts as; a bound key may only act as its agent."""
+    if key_agent is not None and agent_id != key_agent:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"API key is bound to agent '{key_agent}'"
+        )
+    return agent_id
@@ -0,0 +1,131 @@
+"""In-process read-through cache for hot, parameterised read endpoints.
+
+Dashboards and agents fire the same ``GET /api/ideas?status_filter=...`` and
+``GET /api/agent/poll`` requests over and over. Their responses are cached
+by route and query parameters and tagged with the global write version: a
+counter bumped after every committed session transaction, so any write
+makes every entry stale at once. Entries are stored under the version read
+*before* their query ran, so a load that races a commit is stale on
+arrival instead of outliving the write.
+
+Concurrent misses for the same key and version share one load
+(single-flight), and the cache is bounded by an LRU. Every hit gets the
+same value, so values are snapshots that callers only read: plain rows
+(lists of dicts ready to encode) or response models, never ORM objects
+bound to the loading session, and never modified after they are cached.
+"""
+import asyncio
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .config import settings
+
+T = TypeVar("T")
+
+
+class WriteVersion:
+    """Monotonic counter of committed write transactions in this process."""
+
+    def __init__(self):
+        self.value = 0
+
+    def bump(self, *_):
+        self.value += 1
+
+
+write_version = WriteVersion()
+
+# Every commit path (request sessions, the group-commit writer, the lease
+# reaper, imports) goes through a Session, so this sees them all
+event.listen(Session, "after_commit", write_version.bump)
+
+
+class ReadCache:
+    """LRU of (write version, value) with single-flight loading."""
+
+    def __init__(self, max_entries: int = 256, version: WriteVersion = write_version):
+        self._max_entries = max_entries
+        self._version = version
+        self._entries: OrderedDict[Hashable, tuple[int, Any]] = OrderedDict()
+        self._inflight: dict[tuple[Hashable, int], asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._max_entries > 0
+
+    async def get_or_load(self, key: Hashable, load: Callable[[], Awaitable[T]]) -> T:
+        """Return the cached value for ``key`` or run ``load`` to produce it."""
+        if not self.enabled:
+            return await load()
+
+        while True:
+            version = self._version.value
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+            flight = self._inflight.get((key, version))
+            if flight is None:
+                break
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(flight)
+            except asyncio.CancelledError:
+                # The leading request was cancelled; load ourselves unless
+                # it is this request that is being cancelled
+                if not flight.cancelled() or asyncio.current_task().cancelling():
+                    raise
+
+        self.misses += 1
+        flight = asyncio.get_running_loop().create_future()
+        self._inflight[(key, version)] = flight
+        try:
+            value = await load()
+        except asyncio.CancelledError:
+            flight.cancel()
+            raise
+        except BaseException as exc:
+            flight.set_exception(exc)
+            flight.exception()  # waiters re-raise it; don't log it as unretrieved
+            raise
+        finally:
+            del self._inflight[(key, version)]
+
+        flight.set_result(value)
+        self._store(key, version, value)
+        return value
+
+    def _store(self, key: Hashable, version: int, value: Any):
+        self._entries[key] = (version, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "max_entries": self._max_entries,
+            "write_version": self._version.value,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "hit_ratio": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+        }
+
+
+read_cache = ReadCache(settings.read_cache_size)
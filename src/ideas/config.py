@@ -11,11 +11,70 @@ class Settings(BaseSettings):
     api_key: str = secrets.token_urlsafe(32)
     api_key_enabled: bool = False
     
+    # Database engines: one writer connection, a pool of read-only readers
+    read_database_url: str | None = None  # defaults to database_url
+    db_write_pool_size: int = 1
+    db_read_pool_size: int = 8
+    db_pool_timeout: float = 30.0
+    
+    # Group commit for agent feedback and status events
+    group_commit_enabled: bool = False
+    group_commit_max_batch: int = 100
+    group_commit_max_delay_ms: float = 2.0
+    
+    # Read-through cache for idea lists and agent polls, invalidated by any
+    # committed write (0 disables it)
+    read_cache_size: int = 256
+    
+    # Claim leases: agents heartbeat to keep an idea, the reaper requeues
+    # ideas whose lease ran out
+    lease_ttl_seconds: int = 300
+    lease_reaper_enabled: bool = True
+    lease_reaper_interval_seconds: float = 30.0
+    
+    # Fair share: most ideas one agent may hold claimed/executing at once
+    # (None disables the cap)
+    agent_max_active_claims: int | None = None
+    
+    # Admission control (both off by default). Token buckets per client for
+    # agent polls and for writes; over the limit returns 429
+    rate_limit_enabled: bool = False
+    rate_limit_poll_per_second: float = 2.0
+    rate_limit_poll_burst: int = 10
+    rate_limit_write_per_second: float = 20.0
+    rate_limit_write_burst: int = 40
+    # Shed API requests with 503 while this many are in flight or the
+    # average database time per request exceeds the threshold (0 disables
+    # either check)
+    load_shedding_enabled: bool = False
+    load_shedding_max_in_flight: int = 256
+    load_shedding_max_db_ms: float = 250.0
+    load_shedding_retry_after_seconds: int = 1
+    
+    # Prometheus /metrics: request and database timings, plus per-status
+    # gauges recomputed in the background every refresh interval
+    metrics_enabled: bool = True
+    metrics_refresh_interval_seconds: float = 15.0
+    
+    # Statements slower than this go to the ideas.slow_query log with their
+    # parameters and query plan (0 disables it)
+    slow_query_ms: float = 250.0
+    
+    # SQLite connection profile
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    sqlite_cache_size: int = -64000  # negative values are KiB
+    
     # Web Auth
     web_username: str = "admin"
     web_password: str = "ideas2026"
     jwt_secret: str = secrets.token_urlsafe(32)
     jwt_expire_days: int = 30
+    # Verified tokens kept until they expire, so repeat requests skip the
+    # signature check (0 disables it)
+    jwt_cache_size: int = 1024
 
 
 settings = Settings()
@@ -1,19 +1,141 @@
 """Database configuration and session management."""
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
 
 from .config import settings
 
+slow_query_logger = logging.getLogger("ideas.slow_query")
+
 
 class Base(DeclarativeBase):
     """Base class for all SQLAlchemy models."""
     pass
 
 
+def configure_sqlite(engine: AsyncEngine, read_only: bool = False):
+    """Apply the SQLite connection profile to every new connection of an engine."""
+    if engine.dialect.name != "sqlite":
+        return
+    
+    @event.listens_for(engine.sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA journal_mode={settings.sqlite_journal_mode}")
+        cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+        cursor.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}")
+        cursor.execute(f"PRAGMA cache_size={int(settings.sqlite_cache_size)}")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+
+@dataclass
+class QueryStats:
+    """Statements executed while tracking was on, and their total time."""
+    count: int = 0
+    seconds: float = 0.0
+    statements: list[str] = field(default_factory=list)
+    parent: Optional["QueryStats"] = None
+    
+    def record(self, statement: str, elapsed: float):
+        stats = self
+        while stats is not None:
+            stats.count += 1
+            stats.seconds += elapsed
+            stats.statements.append(statement)
+            stats = stats.parent
+
+
+_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Count and time the statements run in this context (and tasks it starts).
+    
+    Trackers nest: a statement counts towards every enclosing tracker. Writes
+    handed to the group-commit queue run in its worker task and aren't counted.
+    """
+    stats = QueryStats(parent=_query_stats.get())
+    token = _query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _query_stats.reset(token)
+
+
+def explain_query_plan(connection, statement: str, parameters) -> Optional[str]:
+    """EXPLAIN QUERY PLAN for a statement, on its own connection (SQLite only)."""
+    if connection.dialect.name != "sqlite":
+        return None
+    # A raw DBAPI cursor, so the EXPLAIN doesn't re-enter the execute hooks
+    cursor = connection.connection.cursor()
+    try:
+        cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        return "\n".join(f"  {row[3]}" for row in cursor.fetchall())
+    finally:
+        cursor.close()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    stats = _query_stats.get()
+    if stats is not None:
+        stats.record(statement, elapsed)
+    
+    threshold = settings.slow_query_ms
+    if not threshold or elapsed * 1000 < threshold:
+        return
+    plan = None
+    if not executemany:
+        try:
+            plan = explain_query_plan(conn, statement, parameters)
+        except Exception:
+            slow_query_logger.debug("EXPLAIN QUERY PLAN failed", exc_info=True)
+    slow_query_logger.warning(
+        "Slow query (%.1f ms): %s\nParameters: %.500r%s",
+        elapsed * 1000,
+        statement,
+        parameters,
+        f"\nQuery plan:\n{plan}" if plan else "",
+    )
+
+
+# Writes are serialized by SQLite anyway; queueing them on a small pool
+# avoids "database is locked" errors under concurrent agent traffic.
 engine = create_async_engine(
     settings.database_url,
     echo=settings.debug,
+    pool_size=settings.db_write_pool_size,
+    max_overflow=0,
+    pool_timeout=settings.db_pool_timeout,
+)
+configure_sqlite(engine)
+
+# With WAL, readers don't block the writer (or each other)
+read_engine = create_async_engine(
+    settings.read_database_url or settings.database_url,
+    echo=settings.debug,
+    pool_size=settings.db_read_pool_size,
+    pool_timeout=settings.db_pool_timeout,
 )
+configure_sqlite(read_engine, read_only=True)
 
 async_session_maker = async_sessionmaker(
     engine,
@@ -21,6 +143,12 @@ async_session_maker = async_sessionmaker(
     expire_on_commit=False,
 )
 
+read_session_maker = async_sessionmaker(
+    read_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+)
+
 
 async def get_db():
     """Dependency to get database session."""
@@ -31,7 +159,19 @@ async def get_db():
             await session.close()
 
 
+async def get_read_db():
+    """Dependency to get a read-only database session for GET routes."""
+    async with read_session_maker() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
+
 async def init_db():
-    """Initialize database tables."""
+    """Initialize database tables and apply pending migrations."""
+    from .migrations import run_migrations
+    
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(run_migrations)
@@ -0,0 +1,148 @@
+"""In-process event broker backing the Server-Sent Events streams."""
+import asyncio
+import json
+from collections import deque
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional
+
+from fastapi import Request
+
+from .models import Idea, IdeaStatus, Message
+from .schemas import MessageResponse
+
+
+@dataclass(frozen=True)
+class Event:
+    """A published change, encoded as one SSE frame."""
+    id: int
+    event: str
+    idea_id: int
+    data: dict
+
+    def encode(self) -> str:
+        return f"id: {self.id}\nevent: {self.event}\ndata: {json.dumps(self.data)}\n\n"
+
+
+class Subscription:
+    """A bounded per-client queue of live events."""
+
+    def __init__(self, maxsize: int):
+        self.queue: asyncio.Queue[Event] = asyncio.Queue(maxsize)
+        self.overflowed = False
+
+
+class EventBroker:
+    """Fan out committed changes to subscribers and keep a replay buffer.
+
+    Event ids are monotonically increasing, so a reconnecting client can
+    resume from its Last-Event-ID as long as the id is still in the buffer.
+    """
+
+    def __init__(self, history_size: int = 1000, queue_size: int = 1000):
+        self._next_id = 1
+        self._history: deque[Event] = deque(maxlen=history_size)
+        self._subscribers: set[Subscription] = set()
+        self._queue_size = queue_size
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(self._queue_size)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscribers.discard(subscription)
+
+    def publish(self, event: str, idea_id: int, data: dict) -> Event:
+        published = Event(id=self._next_id, event=event, idea_id=idea_id, data=data)
+        self._next_id += 1
+        self._history.append(published)
+        for subscription in list(self._subscribers):
+            try:
+                subscription.queue.put_nowait(published)
+            except asyncio.QueueFull:
+                # Slow consumer: drop it and let the client resync
+                subscription.overflowed = True
+                self._subscribers.discard(subscription)
+        return published
+
+    def since(self, last_event_id: int) -> Optional[list[Event]]:
+        """Return events after last_event_id, or None if they are no longer buffered."""
+        oldest = self._history[0].id if self._history else self._next_id
+        if last_event_id < oldest - 1 or last_event_id >= self._next_id:
+            return None
+        return [event for event in self._history if event.id > last_event_id]
+
+    def publish_status(
+        self,
+        idea: Idea,
+        old_status: Optional[IdeaStatus],
+        new_status: Optional[IdeaStatus] = None,
+    ) -> Event:
+        new_status = new_status or idea.status
+        return self.publish("status", idea.id, {
+            "id": idea.id,
+            "old_status": old_status.value if old_status else None,
+            "new_status": new_status.value,
+            "agent_id": idea.agent_id,
+            "updated_at": idea.updated_at.isoformat(),
+        })
+
+    def publish_messages(self, *messages: Message):
+        for message in messages:
+            self.publish(
+                "message",
+                message.idea_id,
+                MessageResponse.model_validate(message).model_dump(mode="json"),
+            )
+
+
+broker = EventBroker()
+
+
+def parse_last_event_id(value: Optional[str]) -> Optional[int]:
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+async def sse_stream(
+    request: Request,
+    idea_id: Optional[int] = None,
+    last_event_id: Optional[int] = None,
+    keepalive: float = 15.0,
+) -> AsyncIterator[str]:
+    """Yield SSE frames for all ideas, or for a single idea when idea_id is set."""
+    # Subscribe before replaying so nothing published in between is lost
+    subscription = broker.subscribe()
+    try:
+        yield "retry: 3000\n\n"
+
+        replayed_up_to = 0
+        if last_event_id is not None:
+            missed = broker.since(last_event_id)
+            if missed is None:
+                yield "event: reset\ndata: {}\n\n"
+            else:
+                for event in missed:
+                    if idea_id is None or event.idea_id == idea_id:
+                        yield event.encode()
+                replayed_up_to = missed[-1].id if missed else last_event_id
+
+        while not await request.is_disconnected():
+            if subscription.overflowed and subscription.queue.empty():
+                yield "event: reset\ndata: {}\n\n"
+                return
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), keepalive)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if event.id <= replayed_up_to:
+                continue
+            if idea_id is None or event.idea_id == idea_id:
+                yield event.encode()
+    finally:
+        broker.unsubscribe(subscription)
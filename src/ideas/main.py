@@ -1,18 +1,37 @@
 from contextlib import asynccontextmanager
 from pathlib import Path
-from fastapi import FastAPI, Depends, Request
+from fastapi import FastAPI, Depends, Request, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 
-from .database import init_db
-from .routers import ideas, agent, web_auth
-from .auth import verify_api_key
+from .admission import AdmissionMiddleware, admission_options
+from .config import settings
+from .database import init_db, read_session_maker
+from .routers import ideas, agent, agent_keys, transfer, web_auth
+from .auth import agent_key_index, require_admin_key, verify_api_key
+from .cache import read_cache
+from .metrics import (
+    MetricsMiddleware, QueryHeadersMiddleware, gauge_refresher, instrument_sessions, render_metrics
+)
+from .reaper import lease_reaper
+from .writer import write_queue
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await init_db()
+    await agent_key_index.load(read_session_maker)
+    if settings.group_commit_enabled:
+        await write_queue.start()
+    if settings.lease_reaper_enabled:
+        await lease_reaper.start()
+    if settings.metrics_enabled:
+        await gauge_refresher.start()
     yield
+    await gauge_refresher.stop()
+    await lease_reaper.stop()
+    # Drain queued writes before the process exits
+    await write_queue.stop()
 
 
 app = FastAPI(
@@ -22,6 +41,15 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+# Innermost, so metrics and debug headers also see rejected requests
+if settings.rate_limit_enabled or settings.load_shedding_enabled:
+    app.add_middleware(AdmissionMiddleware, **admission_options())
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+    instrument_sessions()
+if settings.debug:
+    app.add_middleware(QueryHeadersMiddleware)
+
 # Static files directory
 STATIC_DIR = Path(__file__).parent / "static"
 STATIC_DIR.mkdir(exist_ok=True)
@@ -35,6 +63,8 @@ app.include_router(web_auth.router, prefix="/auth", tags=["auth"])
 # API routes (with optional API key)
 app.include_router(ideas.router, prefix="/api/ideas", tags=["ideas"], dependencies=[Depends(verify_api_key)])
 app.include_router(agent.router, prefix="/api/agent", tags=["agent"], dependencies=[Depends(verify_api_key)])
+app.include_router(transfer.router, prefix="/api", tags=["transfer"], dependencies=[Depends(verify_api_key)])
+app.include_router(agent_keys.router, prefix="/api/agent-keys", tags=["agent keys"], dependencies=[Depends(require_admin_key)])
 
 
 @app.get("/health")
@@ -42,6 +72,21 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint; gauges are refreshed in the background."""
+    if not settings.metrics_enabled:
+        return Response(status_code=404)
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
+@app.get("/api/cache", dependencies=[Depends(verify_api_key)])
+async def cache_stats():
+    """Read cache hit/miss counters, for sizing READ_CACHE_SIZE."""
+    return read_cache.stats()
+
+
 @app.get("/")
 async def serve_index():
     """Serve the main web app."""
@@ -0,0 +1,264 @@
+"""Prometheus metrics: request latency, database timings and queue gauges.
+
+Request latency is recorded by a plain ASGI middleware (cheaper than
+BaseHTTPMiddleware, and it leaves SSE streams alone) as the time until the
+response headers are sent, labelled by route template, method and status
+code. Database transaction and commit times come from Session events. The
+per-status idea counts and queue ages are gauges refreshed by a background
+task, so a scrape only renders what is already in memory.
+
+In debug mode QueryHeadersMiddleware also reports each request's statement
+count and database time in X-DB-Queries / X-DB-Time response headers.
+"""
+import asyncio
+import logging
+import time
+from datetime import timezone
+from typing import Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, Gauge, Histogram, generate_latest
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import Session
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import settings
+from .database import read_engine, read_session_maker, track_queries
+from .models import Idea, IdeaStatus
+
+logger = logging.getLogger(__name__)
+
+REQUEST_LATENCY = Histogram(
+    "ideas_http_request_duration_seconds",
+    "Time until response headers are sent, by route template",
+    ["method", "route", "status"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+DB_TRANSACTION = Histogram(
+    "ideas_db_transaction_seconds",
+    "Time a session holds a database transaction, from begin to commit or rollback",
+    ["engine"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+DB_COMMIT = Histogram(
+    "ideas_db_commit_seconds",
+    "Time to flush and commit a session",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+IDEAS_BY_STATUS = Gauge(
+    "ideas_ideas",
+    "Ideas per status",
+    ["status"],
+)
+OLDEST_WAITING = Gauge(
+    "ideas_oldest_waiting_seconds",
+    "Age of the oldest idea waiting for an agent, since it entered the status",
+    ["status"],
+)
+GAUGES_REFRESHED = Gauge(
+    "ideas_gauges_refreshed_timestamp_seconds",
+    "Unix time of the last successful gauge refresh",
+)
+
+# Statuses whose queue age is exported
+QUEUE_STATUSES = (IdeaStatus.PENDING, IdeaStatus.WAITING_AGENT)
+
+
+def route_template(scope: Scope) -> str:
+    """The path template of the route that handles ``scope``, never the raw path.
+
+    Raw paths contain idea ids, which would give every idea its own series.
+    """
+    route = scope.get("route")
+    if route is not None:
+        template = route.path
+        # Routes of an included router may carry only their own path, without
+        # the include prefix; the prefix is whatever leading segments of the
+        # matched path the template doesn't account for
+        if ":path}" not in template:
+            segments = scope["path"].split("/")
+            depth = len(segments) - len(template.split("/"))
+            if depth > 0:
+                template = "/".join(segments[:depth + 1]) + template
+        return template
+    if "endpoint" in scope:
+        # A mounted app (static files): the router put the mount path in root_path
+        return scope.get("root_path", "") + "/{path}"
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """Observe REQUEST_LATENCY for every HTTP request."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                REQUEST_LATENCY.labels(
+                    scope["method"], route_template(scope), status_code
+                ).observe(time.perf_counter() - start)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            # No response was started; record the failure as a 500
+            REQUEST_LATENCY.labels(
+                scope["method"], route_template(scope), status_code
+            ).observe(time.perf_counter() - start)
+            raise
+
+
+class QueryHeadersMiddleware:
+    """Add X-DB-Queries and X-DB-Time (milliseconds) to every HTTP response.
+    
+    Counted up to the moment the response headers go out, which for
+    streaming responses is before the body is produced.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries() as stats:
+            async def send_wrapper(message: Message):
+                if message["type"] == "http.response.start":
+                    message["headers"] = [
+                        *message.get("headers", []),
+                        (b"x-db-queries", str(stats.count).encode()),
+                        (b"x-db-time", f"{stats.seconds * 1000:.2f}".encode()),
+                    ]
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+
+def _after_begin(session: Session, transaction, connection):
+    if transaction.parent is None:
+        engine = "read" if connection.engine is read_engine.sync_engine else "write"
+        session.info["metrics_transaction"] = (engine, time.perf_counter())
+
+
+def _after_transaction_end(session: Session, transaction):
+    if transaction.parent is None:
+        began = session.info.pop("metrics_transaction", None)
+        if began is not None:
+            engine, start = began
+            DB_TRANSACTION.labels(engine).observe(time.perf_counter() - start)
+
+
+def _before_commit(session: Session):
+    session.info["metrics_commit"] = time.perf_counter()
+
+
+def _after_commit(session: Session):
+    start = session.info.pop("metrics_commit", None)
+    if start is not None:
+        DB_COMMIT.observe(time.perf_counter() - start)
+
+
+SESSION_LISTENERS = (
+    ("after_begin", _after_begin),
+    ("after_transaction_end", _after_transaction_end),
+    ("before_commit", _before_commit),
+    ("after_commit", _after_commit),
+)
+
+
+def instrument_sessions():
+    """Time the transactions and commits of every Session."""
+    for name, listener in SESSION_LISTENERS:
+        if not event.contains(Session, name, listener):
+            event.listen(Session, name, listener)
+
+
+def uninstrument_sessions():
+    for name, listener in SESSION_LISTENERS:
+        if event.contains(Session, name, listener):
+            event.remove(Session, name, listener)
+
+
+async def refresh_gauges(session_maker: async_sessionmaker):
+    """Recompute the per-status counts and queue ages (two index-only queries)."""
+    async with session_maker() as session:
+        counts = dict((await session.execute(
+            select(Idea.status, func.count()).group_by(Idea.status)
+        )).all())
+        oldest = dict((await session.execute(
+            select(Idea.status, func.min(Idea.updated_at))
+            .where(Idea.status.in_(QUEUE_STATUSES))
+            .group_by(Idea.status)
+        )).all())
+
+    for status in IdeaStatus:
+        IDEAS_BY_STATUS.labels(status.value).set(counts.get(status, 0))
+    now = time.time()
+    for status in QUEUE_STATUSES:
+        age = 0.0
+        since = oldest.get(status)
+        if since is not None:
+            # SQLite hands back naive UTC datetimes
+            if since.tzinfo is None:
+                since = since.replace(tzinfo=timezone.utc)
+            age = max(now - since.timestamp(), 0.0)
+        OLDEST_WAITING.labels(status.value).set(age)
+    GAUGES_REFRESHED.set(now)
+
+
+class GaugeRefresher:
+    """Periodically runs refresh_gauges until stopped."""
+
+    def __init__(self, session_maker: async_sessionmaker, interval: float = 15.0):
+        self._session_maker = session_maker
+        self._interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def start(self):
+        if self.running:
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if not self.running:
+            return
+        task, self._task = self._task, None
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    async def _run(self):
+        while True:
+            try:
+                await refresh_gauges(self._session_maker)
+            except Exception:
+                logger.exception("Metrics gauge refresh failed")
+            await asyncio.sleep(self._interval)
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """Return (body, content type) of the Prometheus text exposition."""
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+gauge_refresher = GaugeRefresher(read_session_maker, interval=settings.metrics_refresh_interval_seconds)
@@ -0,0 +1,231 @@
+"""Versioned, forward-only schema migrations applied at startup.
+
+``Base.metadata.create_all`` only creates missing tables, so anything added to
+an existing table (indexes, columns, triggers, virtual tables) goes through a
+numbered migration here. Migrations run in order inside the startup
+transaction and are recorded in ``schema_migrations``; each one must be safe
+to run on a database that ``create_all`` has just built from the current
+models.
+"""
+from dataclasses import dataclass
+from typing import Callable
+
+from datetime import timedelta
+
+from sqlalchemy import Column, Connection, DateTime, Integer, String, Table, select, text, update
+
+from .config import settings
+from .database import Base
+from .models import Idea, IdeaStatus, utc_now
+
+
+schema_migrations = Table(
+    "schema_migrations",
+    Base.metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String(255), nullable=False),
+    Column("applied_at", DateTime(timezone=True), nullable=False, default=utc_now),
+)
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    upgrade: Callable[[Connection], None]
+
+
+MIGRATIONS: list[Migration] = []
+
+
+def migration(version: int, name: str):
+    """Register a migration function under a unique, increasing version."""
+    def register(upgrade: Callable[[Connection], None]):
+        if MIGRATIONS and version <= MIGRATIONS[-1].version:
+            raise ValueError(f"Migration {version} must be newer than {MIGRATIONS[-1].version}")
+        MIGRATIONS.append(Migration(version, name, upgrade))
+        return upgrade
+    return register
+
+
+def add_column(conn: Connection, table: str, column: str, ddl: str):
+    """ALTER TABLE ADD COLUMN, skipped when create_all already made the column."""
+    existing = {row.name for row in conn.execute(text(f"PRAGMA table_info({table})"))}
+    if column not in existing:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+
+# Recompute Idea's denormalized thread summary from the messages table
+BACKFILL_THREAD_SUMMARY = text("""
+    UPDATE ideas SET
+        message_count = (
+            SELECT count(*) FROM messages WHERE messages.idea_id = ideas.id
+        ),
+        last_message_at = (
+            SELECT max(created_at) FROM messages WHERE messages.idea_id = ideas.id
+        ),
+        last_message_type = (
+            SELECT type FROM messages WHERE messages.idea_id = ideas.id
+            ORDER BY created_at DESC, id DESC LIMIT 1
+        ),
+        open_question = CASE WHEN status = 'WAITING_USER' THEN (
+            SELECT substr(content, length('[Question] ') + 1) FROM messages
+            WHERE messages.idea_id = ideas.id
+              AND type = 'AGENT_FEEDBACK' AND content LIKE '[Question] %'
+            ORDER BY id DESC LIMIT 1
+        ) END
+""")
+
+
+def run_migrations(conn: Connection) -> list[int]:
+    """Apply pending migrations on a sync connection and return their versions."""
+    schema_migrations.create(conn, checkfirst=True)
+    applied = set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+    newly_applied = []
+    for pending in MIGRATIONS:
+        if pending.version in applied:
+            continue
+        pending.upgrade(conn)
+        conn.execute(schema_migrations.insert().values(version=pending.version, name=pending.name))
+        newly_applied.append(pending.version)
+    return newly_applied
+
+
+# ============================================================================
+# Migrations
+# ============================================================================
+
+@migration(1, "hot path indexes")
+def add_hot_path_indexes(conn: Connection):
+    # poll_tasks: status IN (...) ORDER BY updated_at
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_ideas_status_updated_at ON ideas (status, updated_at)"
+    ))
+    # list_ideas with status_filter: ORDER BY created_at DESC, id DESC
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_ideas_status_created_at ON ideas (status, created_at)"
+    ))
+    # list_ideas without a filter
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_ideas_created_at ON ideas (created_at)"
+    ))
+    # get_messages / get_idea: idea_id = ? ORDER BY created_at
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_messages_idea_id_created_at ON messages (idea_id, created_at)"
+    ))
+
+
+@migration(2, "full-text search")
+def add_full_text_search(conn: Connection):
+    # External-content FTS5 tables over ideas.content and messages.content.
+    # The trigram tokenizer matches substrings, which is what makes CJK text
+    # (no spaces between words) searchable.
+    for table in ("ideas", "messages"):
+        conn.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts USING fts5("
+            f"content, content='{table}', content_rowid='id', tokenize='trigram')"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_fts_insert AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {table}_fts (rowid, content) VALUES (new.id, new.content); END"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_fts_delete AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {table}_fts ({table}_fts, rowid, content) "
+            f"VALUES ('delete', old.id, old.content); END"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_fts_update AFTER UPDATE OF content ON {table} BEGIN "
+            f"INSERT INTO {table}_fts ({table}_fts, rowid, content) "
+            f"VALUES ('delete', old.id, old.content); "
+            f"INSERT INTO {table}_fts (rowid, content) VALUES (new.id, new.content); END"
+        ))
+        # Index rows that existed before the triggers
+        conn.execute(text(f"INSERT INTO {table}_fts ({table}_fts) VALUES ('rebuild')"))
+
+
+@migration(3, "thread summary columns")
+def add_thread_summary(conn: Connection):
+    add_column(conn, "ideas", "message_count", "INTEGER NOT NULL DEFAULT 0")
+    add_column(conn, "ideas", "last_message_at", "DATETIME")
+    add_column(conn, "ideas", "last_message_type", "VARCHAR(14)")
+    add_column(conn, "ideas", "open_question", "TEXT")
+    conn.execute(BACKFILL_THREAD_SUMMARY)
+
+
+@migration(4, "thread delta index")
+def add_thread_delta_index(conn: Connection):
+    # get_messages: idea_id = ? AND id > ? ORDER BY id
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_messages_idea_id_id ON messages (idea_id, id)"
+    ))
+
+
+@migration(5, "previous status")
+def add_previous_status(conn: Connection):
+    # Set by transitions.compare_and_set so UPDATE ... RETURNING can report
+    # the status it replaced
+    add_column(conn, "ideas", "previous_status", "VARCHAR(13)")
+
+
+@migration(6, "claim leases")
+def add_claim_leases(conn: Connection):
+    add_column(conn, "ideas", "lease_expires_at", "DATETIME")
+    # Reaper: lease_expires_at < now, only over ideas that hold a lease
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_ideas_lease_expires_at ON ideas (lease_expires_at) "
+        "WHERE lease_expires_at IS NOT NULL"
+    ))
+    # Give ideas already held by an agent a full lease, so their agents have
+    # time to start heartbeating before the reaper requeues them
+    conn.execute(
+        update(Idea.__table__)
+        .where(Idea.status.in_([IdeaStatus.CLAIMED, IdeaStatus.EXECUTING]))
+        .values(lease_expires_at=utc_now() + timedelta(seconds=settings.lease_ttl_seconds))
+    )
+
+
+@migration(7, "queue priority")
+def add_queue_priority(conn: Connection):
+    add_column(conn, "ideas", "priority", "INTEGER NOT NULL DEFAULT 2")
+    # poll_tasks / claim-next: status = ? ORDER BY priority, updated_at.
+    # Supersedes (status, updated_at) from migration 1.
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_ideas_status_priority_updated_at "
+        "ON ideas (status, priority, updated_at)"
+    ))
+    conn.execute(text("DROP INDEX IF EXISTS ix_ideas_status_updated_at"))
+    # Fair-share cap: count an agent's active claims
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_ideas_agent_id_status ON ideas (agent_id, status)"
+    ))
+
+
+@migration(8, "idea id in message search index")
+def add_idea_id_to_message_search(conn: Connection):
+    # Search ranks messages by idea; carrying idea_id in messages_fts (not
+    # tokenized) saves joining messages for every match
+    for trigger in ("insert", "delete", "update"):
+        conn.execute(text(f"DROP TRIGGER IF EXISTS messages_fts_{trigger}"))
+    conn.execute(text("DROP TABLE IF EXISTS messages_fts"))
+    conn.execute(text(
+        "CREATE VIRTUAL TABLE messages_fts USING fts5("
+        "content, idea_id UNINDEXED, content='messages', content_rowid='id', tokenize='trigram')"
+    ))
+    conn.execute(text(
+        "CREATE TRIGGER messages_fts_insert AFTER INSERT ON messages BEGIN "
+        "INSERT INTO messages_fts (rowid, content, idea_id) VALUES (new.id, new.content, new.idea_id); END"
+    ))
+    conn.execute(text(
+        "CREATE TRIGGER messages_fts_delete AFTER DELETE ON messages BEGIN "
+        "INSERT INTO messages_fts (messages_fts, rowid, content, idea_id) "
+        "VALUES ('delete', old.id, old.content, old.idea_id); END"
+    ))
+    conn.execute(text(
+        "CREATE TRIGGER messages_fts_update AFTER UPDATE OF content ON messages BEGIN "
+        "INSERT INTO messages_fts (messages_fts, rowid, content, idea_id) "
+        "VALUES ('delete', old.id, old.content, old.idea_id); "
+        "INSERT INTO messages_fts (rowid, content, idea_id) VALUES (new.id, new.content, new.idea_id); END"
+    ))
+    conn.execute(text("INSERT INTO messages_fts (messages_fts) VALUES ('rebuild')"))
@@ -2,7 +2,7 @@
 import enum
 from datetime import datetime, timezone
 from typing import Optional
-from sqlalchemy import String, Text, Enum, DateTime, ForeignKey
+from sqlalchemy import String, Text, Enum, DateTime, ForeignKey, Index, Integer, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .database import Base
@@ -28,6 +28,12 @@ class MessageType(str, enum.Enum):
     SYSTEM_EVENT = "system_event"   # 系统自动记录的状态变化
 
 
+# Queue priority: lower values are served first
+HIGHEST_PRIORITY = 0
+DEFAULT_PRIORITY = 2
+LOWEST_PRIORITY = 4
+
+
 def utc_now() -> datetime:
     """Return current UTC datetime."""
     return datetime.now(timezone.utc)
@@ -37,6 +43,16 @@ class Idea(Base):
     """Idea model - the core business object of the system."""
     
     __tablename__ = "ideas"
+    __table_args__ = (
+        Index("ix_ideas_status_priority_updated_at", "status", "priority", "updated_at"),
+        Index("ix_ideas_agent_id_status", "agent_id", "status"),
+        Index("ix_ideas_status_created_at", "status", "created_at"),
+        Index("ix_ideas_created_at", "created_at"),
+        Index(
+            "ix_ideas_lease_expires_at", "lease_expires_at",
+            sqlite_where=text("lease_expires_at IS NOT NULL"),
+        ),
+    )
     
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     content: Mapped[str] = mapped_column(Text, nullable=False)
@@ -45,7 +61,23 @@ class Idea(Base):
         default=IdeaStatus.DRAFT,
         nullable=False
     )
+    priority: Mapped[int] = mapped_column(
+        Integer,
+        default=DEFAULT_PRIORITY,
+        server_default=str(DEFAULT_PRIORITY),
+        nullable=False
+    )
+    # Status before the last state-machine transition
+    previous_status: Mapped[Optional[IdeaStatus]] = mapped_column(
+        Enum(IdeaStatus),
+        nullable=True
+    )
     agent_id: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    # Set while an agent holds the idea (claimed/executing); renewed by heartbeats
+    lease_expires_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True),
+        nullable=True
+    )
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
         default=utc_now,
@@ -58,6 +90,24 @@ class Idea(Base):
         nullable=False
     )
     
+    # Denormalized thread summary, kept in step by record_message() so list
+    # views never need to read the messages table
+    message_count: Mapped[int] = mapped_column(
+        Integer,
+        default=0,
+        server_default="0",
+        nullable=False
+    )
+    last_message_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True),
+        nullable=True
+    )
+    last_message_type: Mapped[Optional[MessageType]] = mapped_column(
+        Enum(MessageType),
+        nullable=True
+    )
+    open_question: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # set while waiting_user
+    
     # Relationship to messages (thread)
     messages: Mapped[list["Message"]] = relationship(
         "Message",
@@ -66,6 +116,33 @@ class Idea(Base):
         order_by="Message.created_at"
     )
     
+    # Capability tags; loaded with every idea (one IN query per result set)
+    # since they are part of every idea response
+    tag_links: Mapped[list["IdeaTag"]] = relationship(
+        "IdeaTag",
+        cascade="all, delete-orphan",
+        lazy="selectin",
+        order_by="IdeaTag.tag"
+    )
+    
+    @property
+    def tags(self) -> list[str]:
+        return [link.tag for link in self.tag_links]
+    
+    def record_message(self, message: "Message"):
+        """Update the thread summary for a message just added to this idea.
+        
+        Call after any status change made alongside the message: the open
+        question is cleared once the idea is no longer waiting on the user.
+        """
+        if message.created_at is None:
+            message.created_at = utc_now()
+        self.message_count = (self.message_count or 0) + 1
+        self.last_message_at = message.created_at
+        self.last_message_type = message.type
+        if self.status != IdeaStatus.WAITING_USER:
+            self.open_question = None
+    
     def __repr__(self) -> str:
         return f"<Idea(id={self.id}, status={self.status.value})>"
 
@@ -74,6 +151,10 @@ class Message(Base):
     """Message model - represents events in an idea's thread."""
     
     __tablename__ = "messages"
+    __table_args__ = (
+        Index("ix_messages_idea_id_created_at", "idea_id", "created_at"),
+        Index("ix_messages_idea_id_id", "idea_id", "id"),
+    )
     
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     idea_id: Mapped[int] = mapped_column(ForeignKey("ideas.id"), nullable=False)
@@ -93,3 +174,41 @@ class Message(Base):
     
     def __repr__(self) -> str:
         return f"<Message(id={self.id}, type={self.type.value}, idea_id={self.idea_id})>"
+
+
+class IdeaTag(Base):
+    """Capability an agent needs to work on an idea."""
+    
+    __tablename__ = "idea_tags"
+    __table_args__ = (
+        # Ideas carrying a given tag; the primary key covers tags per idea
+        Index("ix_idea_tags_tag_idea_id", "tag", "idea_id"),
+    )
+    
+    idea_id: Mapped[int] = mapped_column(ForeignKey("ideas.id"), primary_key=True)
+    tag: Mapped[str] = mapped_column(String(64), primary_key=True)
+    
+    def __repr__(self) -> str:
+        return f"<IdeaTag(idea_id={self.idea_id}, tag={self.tag})>"
+
+
+class AgentKey(Base):
+    """Per-agent API key; only a hash of the key is stored."""
+    
+    __tablename__ = "agent_keys"
+    
+    id: Mapped[int] = mapped_column(primary_key=True)
+    agent_id: Mapped[str] = mapped_column(String(255), nullable=False, index=True)
+    # SHA-256 hex digest; keys are long random tokens, so a fast hash is enough
+    key_hash: Mapped[str] = mapped_column(String(64), nullable=False, unique=True)
+    # First characters of the key, to tell keys apart in listings
+    key_prefix: Mapped[str] = mapped_column(String(16), nullable=False)
+    name: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=utc_now,
+        nullable=False
+    )
+    
+    def __repr__(self) -> str:
+        return f"<AgentKey(id={self.id}, agent_id={self.agent_id})>"
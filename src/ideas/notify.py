@@ -0,0 +1,36 @@
+"""In-process change notifications for waking parked requests."""
+import asyncio
+
+
+class Notifier:
+    """Wake every waiter when something changes.
+
+    Waiters grab the current generation before checking the database and then
+    wait on it, so a change that lands between the check and the wait is never
+    missed.
+    """
+
+    def __init__(self):
+        self._event = asyncio.Event()
+
+    def generation(self) -> asyncio.Event:
+        """Return the event that the next notify() call will set."""
+        return self._event
+
+    def notify(self):
+        """Wake all current waiters and start a new generation."""
+        event, self._event = self._event, asyncio.Event()
+        event.set()
+
+    @staticmethod
+    async def wait(generation: asyncio.Event, timeout: float) -> bool:
+        """Wait for a generation to be notified. Return False on timeout."""
+        try:
+            await asyncio.wait_for(generation.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+
+# Fired whenever an idea becomes pollable (PENDING or WAITING_AGENT)
+work_available = Notifier()
@@ -0,0 +1,89 @@
+"""Background task that requeues ideas whose agent stopped heartbeating.
+
+Claiming or starting an idea grants the agent a lease of
+``lease_ttl_seconds``; heartbeats and feedback renew it. An agent that
+crashes stops renewing, and once the lease has run out the reaper moves the
+idea back to pending, with a system event, so another agent can pick it up.
+"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from .config import settings
+from .database import async_session_maker
+from .models import Idea, utc_now
+from .transitions import compare_and_set, publish_transition
+
+logger = logging.getLogger(__name__)
+
+
+async def reap_expired_leases(
+    session_maker: async_sessionmaker,
+    now: Optional[datetime] = None,
+    limit: int = 100,
+) -> list[int]:
+    """Requeue up to ``limit`` ideas with an expired lease; return their ids."""
+    now = now or utc_now()
+    expired = Idea.lease_expires_at < now
+    async with session_maker() as session:
+        # Range scan over the partial lease index
+        result = await session.execute(
+            select(Idea.id).where(expired).order_by(Idea.lease_expires_at).limit(limit)
+        )
+        outcomes = []
+        for idea_id in result.scalars().all():
+            # The lease is checked again in the UPDATE, so a heartbeat that
+            # lands after the scan keeps the idea
+            outcome = await compare_and_set(session, "reap", idea_id, conditions=(expired,))
+            if outcome:
+                outcomes.append(outcome)
+        await session.commit()
+
+    for idea, old_status, _, messages in outcomes:
+        publish_transition(idea, old_status, idea.status, messages)
+    return [idea.id for idea, *_ in outcomes]
+
+
+class LeaseReaper:
+    """Periodically runs reap_expired_leases until stopped."""
+
+    def __init__(self, session_maker: async_sessionmaker, interval: float = 30.0):
+        self._session_maker = session_maker
+        self._interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def start(self):
+        if self.running:
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if not self.running:
+            return
+        task, self._task = self._task, None
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    async def _run(self):
+        while True:
+            try:
+                reaped = await reap_expired_leases(self._session_maker)
+                if reaped:
+                    logger.info("Requeued ideas with expired leases: %s", reaped)
+            except Exception:
+                logger.exception("Lease reaper failed")
+            await asyncio.sleep(self._interval)
+
+
+lease_reaper = LeaseReaper(async_session_maker, interval=settings.lease_reaper_interval_seconds)
@@ -1,105 +1,170 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import select
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from sqlalchemy import exists, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
 
-from ..database import get_db
-from ..models import Idea, Message, IdeaStatus, MessageType
+from ..auth import authorize_agent, verify_api_key
+from ..cache import read_cache
+from ..database import get_db, get_read_db
+from ..models import Idea, IdeaStatus, IdeaTag
+from ..notify import work_available
+from ..serialization import encoded_response, fetch_ideas, select_ideas
 from ..schemas import (
     IdeaResponse, AgentClaimRequest, AgentFeedbackRequest,
     AgentAskRequest, AgentCompleteRequest, AgentFailRequest,
-    StatusChangeResponse
+    AgentBatchOperation, AgentBatchRequest, AgentBatchResult, AgentBatchResponse,
+    AgentLeaseResponse, StatusChangeResponse
+)
+from ..transitions import (
+    POLLABLE_STATUSES, agent_at_capacity, agent_capacity_error,
+    apply_transition, compare_and_set, publish_transition, run_transition
 )
+from ..writer import run_write
 
 router = APIRouter()
 
+CAPABILITIES_QUERY = Query(
+    None,
+    description="Comma-separated tags this agent can handle; only ideas whose tags "
+                "are all among them are returned. Omit to see every idea."
+)
 
-def add_system_event(idea: Idea, content: str, session: AsyncSession):
-    message = Message(
-        idea_id=idea.id,
-        type=MessageType.SYSTEM_EVENT,
-        content=content
-    )
-    session.add(message)
+
+def capability_filter(capabilities: Optional[str]) -> tuple:
+    """WHERE clauses keeping ideas whose tags are all in ``capabilities``.
+
+    An idea matches when no tag row of it lies outside the agent's set, so
+    untagged ideas match every agent; the check is a NOT EXISTS probe of
+    the idea_tags primary key.
+    """
+    if capabilities is None:
+        return ()
+    tags = {tag.strip().lower() for tag in capabilities.split(",") if tag.strip()}
+    unmet = select(IdeaTag.idea_id).where(IdeaTag.idea_id == Idea.id, IdeaTag.tag.not_in(tags))
+    return (~exists(unmet),)
 
 
 @router.get("/poll", response_model=list[IdeaResponse])
-async def poll_tasks(db: AsyncSession = Depends(get_db)):
+async def poll_tasks(
+    wait: int = Query(0, ge=0, le=60, description="Seconds to long-poll when no work is available"),
+    capabilities: Optional[str] = CAPABILITIES_QUERY,
+    accept: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db)
+):
     # Return ideas that are pending or waiting for agent
-    pollable_statuses = [IdeaStatus.PENDING, IdeaStatus.WAITING_AGENT]
-    result = await db.execute(
-        select(Idea)
-        .where(Idea.status.in_(pollable_statuses))
-        .order_by(Idea.updated_at)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + wait
+    
+    async def load() -> list[dict]:
+        return await fetch_ideas(
+            db,
+            select_ideas()
+            .where(Idea.status.in_(POLLABLE_STATUSES), *capability_filter(capabilities))
+            .order_by(Idea.priority, Idea.updated_at)
+        )
+    
+    while True:
+        generation = work_available.generation()
+        ideas = await read_cache.get_or_load(("poll", capabilities), load)
+        
+        remaining = deadline - loop.time()
+        if ideas or remaining <= 0:
+            return encoded_response(ideas, accept)
+        
+        # Release the connection while parked so waiters don't hold the pool
+        await db.rollback()
+        if not await work_available.wait(generation, remaining):
+            return encoded_response([], accept)
+
+
+@router.post(
+    "/claim-next",
+    response_model=IdeaResponse,
+    responses={
+        204: {"description": "No pending idea available"},
+        429: {"description": "Agent is at its fair-share cap"},
+    },
+)
+async def claim_next_task(
+    claim_data: AgentClaimRequest,
+    capabilities: Optional[str] = CAPABILITIES_QUERY,
+    db: AsyncSession = Depends(get_db),
+    key_agent: Optional[str] = Depends(verify_api_key)
+):
+    agent_id = authorize_agent(claim_data.agent_id, key_agent)
+    # Pick the most urgent, then oldest, pending idea and claim it in the
+    # same compare-and-set UPDATE, so concurrent agents can never be handed
+    # the same row.
+    next_pending = (
+        select(Idea.id)
+        .where(Idea.status == IdeaStatus.PENDING, *capability_filter(capabilities))
+        .order_by(Idea.priority, Idea.updated_at, Idea.id)
+        .limit(1)
+        .scalar_subquery()
     )
-    return result.scalars().all()
+    async def apply(session: AsyncSession):
+        outcome = await compare_and_set(session, "claim", next_pending, agent_id)
+        if not outcome and await agent_at_capacity(session, agent_id):
+            raise agent_capacity_error()
+        if outcome:
+            # The full idea is returned, so load the tags the UPDATE skipped
+            idea = outcome[0]
+            tag_links = await session.scalars(
+                select(IdeaTag).where(IdeaTag.idea_id == idea.id).order_by(IdeaTag.tag)
+            )
+            set_committed_value(idea, "tag_links", tag_links.all())
+        return outcome
+    
+    outcome = await run_write(db, apply)
+    if not outcome:
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+    
+    idea, old_status, _, messages = outcome
+    publish_transition(idea, old_status, idea.status, messages)
+    return idea
 
 
 @router.post("/claim/{idea_id}", response_model=StatusChangeResponse)
 async def claim_task(
     idea_id: int,
     claim_data: AgentClaimRequest,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    key_agent: Optional[str] = Depends(verify_api_key)
 ):
-    result = await db.execute(select(Idea).where(Idea.id == idea_id))
-    idea = result.scalar_one_or_none()
-    
-    if not idea:
-        raise HTTPException(status_code=404, detail="Idea not found")
-    
-    if idea.status != IdeaStatus.PENDING:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Cannot claim idea in {idea.status.value} status"
-        )
-    
-    old_status = idea.status
-    idea.status = IdeaStatus.CLAIMED
-    idea.agent_id = claim_data.agent_id
-    add_system_event(idea, f"Claimed by agent: {claim_data.agent_id}", db)
-    
-    await db.commit()
-    
-    return StatusChangeResponse(
-        id=idea.id,
-        old_status=old_status,
-        new_status=idea.status,
-        message=f"Task claimed by agent {claim_data.agent_id}"
-    )
+    agent_id = authorize_agent(claim_data.agent_id, key_agent)
+    return await run_transition(db, idea_id, "claim", agent_id)
 
 
 @router.post("/start/{idea_id}", response_model=StatusChangeResponse)
 async def start_execution(
     idea_id: int,
     claim_data: AgentClaimRequest,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    key_agent: Optional[str] = Depends(verify_api_key)
 ):
-    result = await db.execute(select(Idea).where(Idea.id == idea_id))
-    idea = result.scalar_one_or_none()
-    
-    if not idea:
-        raise HTTPException(status_code=404, detail="Idea not found")
-    
-    valid_statuses = [IdeaStatus.CLAIMED, IdeaStatus.WAITING_AGENT]
-    if idea.status not in valid_statuses:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Cannot start execution for idea in {idea.status.value} status"
-        )
-    
-    if idea.agent_id != claim_data.agent_id:
-        raise HTTPException(status_code=403, detail="Not authorized agent")
-    
-    old_status = idea.status
-    idea.status = IdeaStatus.EXECUTING
-    add_system_event(idea, f"Execution started by agent: {claim_data.agent_id}", db)
-    
-    await db.commit()
-    
-    return StatusChangeResponse(
+    agent_id = authorize_agent(claim_data.agent_id, key_agent)
+    return await run_transition(db, idea_id, "start", agent_id)
+
+
+@router.post("/heartbeat/{idea_id}", response_model=AgentLeaseResponse)
+async def heartbeat(
+    idea_id: int,
+    claim_data: AgentClaimRequest,
+    db: AsyncSession = Depends(get_db),
+    key_agent: Optional[str] = Depends(verify_api_key)
+):
+    """Renew the lease on a claimed or executing idea held by this agent."""
+    agent_id = authorize_agent(claim_data.agent_id, key_agent)
+    idea, *_ = await run_write(
+        db, lambda session: apply_transition(session, idea_id, "heartbeat", agent_id)
+    )
+    return AgentLeaseResponse(
         id=idea.id,
-        old_status=old_status,
-        new_status=idea.status,
-        message="Execution started"
+        status=idea.status,
+        lease_expires_at=idea.lease_expires_at
     )
 
 
@@ -107,36 +172,12 @@ async def start_execution(
 async def submit_feedback(
     idea_id: int,
     feedback_data: AgentFeedbackRequest,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    key_agent: Optional[str] = Depends(verify_api_key)
 ):
-    result = await db.execute(select(Idea).where(Idea.id == idea_id))
-    idea = result.scalar_one_or_none()
-    
-    if not idea:
-        raise HTTPException(status_code=404, detail="Idea not found")
-    
-    if idea.status != IdeaStatus.EXECUTING:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Cannot submit feedback for idea in {idea.status.value} status"
-        )
-    
-    if idea.agent_id != feedback_data.agent_id:
-        raise HTTPException(status_code=403, detail="Not authorized agent")
-    
-    message = Message(
-        idea_id=idea.id,
-        type=MessageType.AGENT_FEEDBACK,
-        content=feedback_data.content
-    )
-    db.add(message)
-    await db.commit()
-    
-    return StatusChangeResponse(
-        id=idea.id,
-        old_status=idea.status,
-        new_status=idea.status,
-        message="Feedback recorded"
+    agent_id = authorize_agent(feedback_data.agent_id, key_agent)
+    return await run_transition(
+        db, idea_id, "feedback", agent_id, content=feedback_data.content
     )
 
 
@@ -144,41 +185,12 @@ async def submit_feedback(
 async def ask_user(
     idea_id: int,
     ask_data: AgentAskRequest,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    key_agent: Optional[str] = Depends(verify_api_key)
 ):
-    result = await db.execute(select(Idea).where(Idea.id == idea_id))
-    idea = result.scalar_one_or_none()
-    
-    if not idea:
-        raise HTTPException(status_code=404, detail="Idea not found")
-    
-    if idea.status != IdeaStatus.EXECUTING:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Cannot ask user for idea in {idea.status.value} status"
-        )
-    
-    if idea.agent_id != ask_data.agent_id:
-        raise HTTPException(status_code=403, detail="Not authorized agent")
-    
-    old_status = idea.status
-    idea.status = IdeaStatus.WAITING_USER
-    
-    message = Message(
-        idea_id=idea.id,
-        type=MessageType.AGENT_FEEDBACK,
-        content=f"[Question] {ask_data.question}"
-    )
-    db.add(message)
-    add_system_event(idea, "Agent requested user instruction", db)
-    
-    await db.commit()
-    
-    return StatusChangeResponse(
-        id=idea.id,
-        old_status=old_status,
-        new_status=idea.status,
-        message="Waiting for user instruction"
+    agent_id = authorize_agent(ask_data.agent_id, key_agent)
+    return await run_transition(
+        db, idea_id, "ask", agent_id, question=ask_data.question
     )
 
 
@@ -186,42 +198,12 @@ async def ask_user(
 async def complete_task(
     idea_id: int,
     complete_data: AgentCompleteRequest,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    key_agent: Optional[str] = Depends(verify_api_key)
 ):
-    result = await db.execute(select(Idea).where(Idea.id == idea_id))
-    idea = result.scalar_one_or_none()
-    
-    if not idea:
-        raise HTTPException(status_code=404, detail="Idea not found")
-    
-    if idea.status != IdeaStatus.EXECUTING:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Cannot complete idea in {idea.status.value} status"
-        )
-    
-    if idea.agent_id != complete_data.agent_id:
-        raise HTTPException(status_code=403, detail="Not authorized agent")
-    
-    old_status = idea.status
-    idea.status = IdeaStatus.COMPLETED
-    
-    summary = complete_data.summary or "Task completed successfully"
-    message = Message(
-        idea_id=idea.id,
-        type=MessageType.AGENT_FEEDBACK,
-        content=f"[Completed] {summary}"
-    )
-    db.add(message)
-    add_system_event(idea, "Task completed", db)
-    
-    await db.commit()
-    
-    return StatusChangeResponse(
-        id=idea.id,
-        old_status=old_status,
-        new_status=idea.status,
-        message="Task completed"
+    agent_id = authorize_agent(complete_data.agent_id, key_agent)
+    return await run_transition(
+        db, idea_id, "complete", agent_id, summary=complete_data.summary
     )
 
 
@@ -229,39 +211,85 @@ async def complete_task(
 async def fail_task(
     idea_id: int,
     fail_data: AgentFailRequest,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    key_agent: Optional[str] = Depends(verify_api_key)
 ):
-    result = await db.execute(select(Idea).where(Idea.id == idea_id))
-    idea = result.scalar_one_or_none()
-    
-    if not idea:
-        raise HTTPException(status_code=404, detail="Idea not found")
-    
-    if idea.status != IdeaStatus.EXECUTING:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Cannot fail idea in {idea.status.value} status"
-        )
-    
-    if idea.agent_id != fail_data.agent_id:
-        raise HTTPException(status_code=403, detail="Not authorized agent")
-    
-    old_status = idea.status
-    idea.status = IdeaStatus.FAILED
-    
-    message = Message(
-        idea_id=idea.id,
-        type=MessageType.AGENT_FEEDBACK,
-        content=f"[Failed] {fail_data.reason}"
-    )
-    db.add(message)
-    add_system_event(idea, f"Task failed: {fail_data.reason}", db)
-    
-    await db.commit()
-    
-    return StatusChangeResponse(
-        id=idea.id,
-        old_status=old_status,
-        new_status=idea.status,
-        message="Task failed"
+    agent_id = authorize_agent(fail_data.agent_id, key_agent)
+    return await run_transition(
+        db, idea_id, "fail", agent_id, reason=fail_data.reason
     )
+
+
+# Payload field each batch operation passes to its transition
+BATCH_PAYLOAD_FIELDS = {
+    "feedback": "content",
+    "ask": "question",
+    "complete": "summary",
+    "fail": "reason",
+}
+REQUIRED_PAYLOAD_FIELDS = {"feedback", "ask", "fail"}
+
+
+def batch_payload(operation: AgentBatchOperation) -> dict:
+    """Return the transition parameters for a batch operation."""
+    field = BATCH_PAYLOAD_FIELDS.get(operation.op)
+    if not field:
+        return {}
+    value = getattr(operation, field)
+    if value is None and operation.op in REQUIRED_PAYLOAD_FIELDS:
+        raise HTTPException(status_code=422, detail=f"'{field}' is required for {operation.op}")
+    return {field: value}
+
+
+@router.post("/batch", response_model=AgentBatchResponse)
+async def run_batch(
+    batch_data: AgentBatchRequest,
+    db: AsyncSession = Depends(get_db),
+    key_agent: Optional[str] = Depends(verify_api_key)
+):
+    agent_id = authorize_agent(batch_data.agent_id, key_agent)
+    # Apply operations in order, each as its own compare-and-set, then
+    # commit once. A failed operation is reported in its own result and
+    # leaves the rest of the batch untouched.
+    async def apply(session: AsyncSession):
+        outcomes = []
+        for operation in batch_data.operations:
+            try:
+                idea, old_status, detail, messages = await apply_transition(
+                    session, operation.idea_id, operation.op, agent_id,
+                    **batch_payload(operation)
+                )
+                outcomes.append((idea, old_status, idea.status, detail, messages))
+            except HTTPException as exc:
+                outcomes.append(exc)
+        return outcomes
+    
+    outcomes = await run_write(db, apply)
+    
+    results = []
+    for index, (operation, outcome) in enumerate(zip(batch_data.operations, outcomes)):
+        if isinstance(outcome, HTTPException):
+            results.append(AgentBatchResult(
+                index=index,
+                idea_id=operation.idea_id,
+                ok=False,
+                status_code=outcome.status_code,
+                detail=outcome.detail
+            ))
+            continue
+        
+        idea, old_status, new_status, detail, messages = outcome
+        publish_transition(idea, old_status, new_status, messages)
+        results.append(AgentBatchResult(
+            index=index,
+            idea_id=operation.idea_id,
+            ok=True,
+            status_code=200,
+            result=StatusChangeResponse(
+                id=idea.id,
+                old_status=old_status,
+                new_status=new_status,
+                message=detail
+            )
+        ))
+    return AgentBatchResponse(results=results)
@@ -0,0 +1,51 @@
+"""Per-agent API keys: each key authenticates as exactly one agent."""
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..auth import agent_key_index, generate_agent_key, hash_key
+from ..database import get_db
+from ..models import AgentKey
+from ..schemas import AgentKeyCreate, AgentKeyCreated, AgentKeyResponse
+
+router = APIRouter()
+
+# Characters of the key kept in clear for listings ("ik_" plus five)
+KEY_PREFIX_LENGTH = 8
+
+
+@router.post("", response_model=AgentKeyCreated, status_code=status.HTTP_201_CREATED)
+async def create_agent_key(key_data: AgentKeyCreate, db: AsyncSession = Depends(get_db)):
+    """Issue a key bound to an agent. The key is only ever returned here."""
+    key = generate_agent_key()
+    agent_key = AgentKey(
+        agent_id=key_data.agent_id,
+        key_hash=hash_key(key),
+        key_prefix=key[:KEY_PREFIX_LENGTH],
+        name=key_data.name
+    )
+    db.add(agent_key)
+    await db.commit()
+    await agent_key_index.reload(db)
+    return AgentKeyCreated(**AgentKeyResponse.model_validate(agent_key).model_dump(), key=key)
+
+
+@router.get("", response_model=list[AgentKeyResponse])
+async def list_agent_keys(agent_id: Optional[str] = None, db: AsyncSession = Depends(get_db)):
+    query = select(AgentKey).order_by(AgentKey.id)
+    if agent_id is not None:
+        query = query.where(AgentKey.agent_id == agent_id)
+    return (await db.execute(query)).scalars().all()
+
+
+@router.delete("/{key_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def revoke_agent_key(key_id: int, db: AsyncSession = Depends(get_db)):
+    agent_key = await db.get(AgentKey, key_id)
+    if agent_key is None:
+        raise HTTPException(status_code=404, detail="API key not found")
+    await db.delete(agent_key)
+    await db.commit()
+    await agent_key_index.reload(db)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
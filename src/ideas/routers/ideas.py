@@ -1,17 +1,81 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import select
+import base64
+import hashlib
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select, tuple_, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 
-from ..database import get_db
-from ..models import Idea, Message, IdeaStatus, MessageType
+from ..cache import read_cache
+from ..database import get_db, get_read_db
+from ..events import broker, parse_last_event_id, sse_stream
+from ..models import Idea, IdeaTag, Message, IdeaStatus, MessageType, utc_now
 from ..schemas import (
-    IdeaCreate, IdeaUpdate, IdeaResponse, IdeaWithMessages,
-    MessageCreate, MessageResponse, StatusChangeResponse
+    IdeaCreate, IdeaExecuteRequest, IdeaUpdate, IdeaResponse, IdeaWithMessages,
+    MessageCreate, MessageResponse, SearchResult, StatusChangeResponse
+)
+from ..search import search_ideas
+from ..serialization import (
+    encoded_response, fetch_ideas, fetch_messages, select_ideas, select_messages
 )
+from ..transitions import compare_and_set, publish_transition, run_transition
+from ..writer import run_write
 
 router = APIRouter()
 
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+MAX_PAGE_SIZE = 500
+MAX_SEARCH_PAGE_SIZE = 100
+
+
+def encode_cursor(created_at: datetime, idea_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{idea_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        created_at, idea_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(idea_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def make_etag(*parts) -> str:
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest[:20]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses weak comparison, so a W/ prefix still matches."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+
+async def thread_version(db: AsyncSession, idea_id: int) -> tuple[datetime, Optional[int]]:
+    """Return (updated_at, latest message id) for an idea without loading its thread."""
+    last_message_id = (
+        select(func.max(Message.id))
+        .where(Message.idea_id == Idea.id)
+        .scalar_subquery()
+    )
+    result = await db.execute(
+        select(Idea.updated_at, last_message_id).where(Idea.id == idea_id)
+    )
+    version = result.one_or_none()
+    if version is None:
+        raise HTTPException(status_code=404, detail="Idea not found")
+    return version.updated_at, version[1]
+
 
 def add_system_event(idea: Idea, content: str, session: AsyncSession):
     message = Message(
@@ -20,17 +84,26 @@ def add_system_event(idea: Idea, content: str, session: AsyncSession):
         content=content
     )
     session.add(message)
+    idea.record_message(message)
+    return message
 
 
 @router.post("", response_model=IdeaResponse, status_code=status.HTTP_201_CREATED)
 async def create_idea(idea_data: IdeaCreate, db: AsyncSession = Depends(get_db)):
-    idea = Idea(content=idea_data.content)
+    idea = Idea(
+        content=idea_data.content,
+        priority=idea_data.priority,
+        tag_links=[IdeaTag(tag=tag) for tag in sorted(set(idea_data.tags))]
+    )
+    # Attached through the relationship, so the idea, its tags and the
+    # creation event go out in one flush and one commit
+    event = Message(type=MessageType.SYSTEM_EVENT, content="Idea created")
+    idea.messages.append(event)
+    idea.record_message(event)
     db.add(idea)
     await db.commit()
-    await db.refresh(idea)
-    
-    add_system_event(idea, "Idea created", db)
-    await db.commit()
+    broker.publish_status(idea, None)
+    broker.publish_messages(event)
     
     return idea
 
@@ -38,30 +111,127 @@ async def create_idea(idea_data: IdeaCreate, db: AsyncSession = Depends(get_db))
 @router.get("", response_model=list[IdeaResponse])
 async def list_ideas(
     status_filter: IdeaStatus | None = None,
-    db: AsyncSession = Depends(get_db)
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    if_none_match: Optional[str] = Header(None),
+    accept: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    query = select(Idea)
+    # The ETag comes from a single aggregate, so a matching conditional GET
+    # is answered before the page is loaded or even looked up
+    count, last_updated_at = await read_cache.get_or_load(
+        ("list_version", status_filter), lambda: list_version(db, status_filter)
+    )
+    etag = make_etag("ideas", count, last_updated_at, status_filter, limit, cursor)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    ideas, next_cursor = await read_cache.get_or_load(
+        ("list_ideas", status_filter, limit, cursor),
+        lambda: load_idea_page(db, status_filter, limit, cursor)
+    )
+    headers = {"ETag": etag}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    return encoded_response(ideas, accept, headers)
+
+
+async def list_version(db: AsyncSession, status_filter: IdeaStatus | None) -> tuple[int, Optional[datetime]]:
+    """Return (count, max(updated_at)) of the filtered ideas.
+
+    Every write bumps updated_at and creating an idea bumps the count, so
+    the pair identifies the contents of the list.
+    """
+    version_query = select(func.count(Idea.id), func.max(Idea.updated_at))
+    if status_filter:
+        version_query = version_query.where(Idea.status == status_filter)
+    count, last_updated_at = (await db.execute(version_query)).one()
+    return count, last_updated_at
+
+
+async def load_idea_page(
+    db: AsyncSession,
+    status_filter: IdeaStatus | None,
+    limit: int | None,
+    cursor: str | None,
+) -> tuple[list[dict], Optional[str]]:
+    """Return (ideas, next cursor) for one page of the idea list."""
+    # Keyset pagination on (created_at, id); the next page cursor is
+    # returned in the X-Next-Cursor header so the body stays a plain list.
+    query = select_ideas()
     if status_filter:
         query = query.where(Idea.status == status_filter)
-    query = query.order_by(Idea.created_at.desc())
+    if cursor:
+        created_at, idea_id = decode_cursor(cursor)
+        query = query.where(tuple_(Idea.created_at, Idea.id) < tuple_(created_at, idea_id))
+    query = query.order_by(Idea.created_at.desc(), Idea.id.desc())
+    if limit:
+        query = query.limit(limit + 1)
+    
+    ideas = await fetch_ideas(db, query)
     
-    result = await db.execute(query)
-    return result.scalars().all()
+    next_cursor = None
+    if limit and len(ideas) > limit:
+        ideas = ideas[:limit]
+        next_cursor = encode_cursor(ideas[-1]["created_at"], ideas[-1]["id"])
+    return ideas, next_cursor
 
 
-@router.get("/{idea_id}", response_model=IdeaWithMessages)
-async def get_idea(idea_id: int, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(
-        select(Idea)
-        .options(selectinload(Idea.messages))
-        .where(Idea.id == idea_id)
+@router.get("/search", response_model=list[SearchResult])
+async def search(
+    response: Response,
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=MAX_SEARCH_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Full-text search over ideas and messages, best match first.
+
+    Each idea appears once, with a snippet from its best-matching content.
+    When more results exist, X-Next-Offset gives the offset of the next page.
+    """
+    hits = await search_ideas(db, q, limit + 1, offset)
+    if len(hits) > limit:
+        hits = hits[:limit]
+        response.headers["X-Next-Offset"] = str(offset + limit)
+    return hits
+
+
+@router.get("/stream")
+async def stream_ideas(request: Request, last_event_id: Optional[str] = Header(None)):
+    """Server-Sent Events stream of status changes and new messages for all ideas."""
+    return StreamingResponse(
+        sse_stream(request, last_event_id=parse_last_event_id(last_event_id)),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
     )
-    idea = result.scalar_one_or_none()
-    
-    if not idea:
+
+
+@router.get("/{idea_id}", response_model=IdeaWithMessages)
+async def get_idea(
+    idea_id: int,
+    if_none_match: Optional[str] = Header(None),
+    accept: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db)
+):
+    # The version is read before the thread, so a change racing with this
+    # request can only make the ETag older than the body, never newer.
+    etag = make_etag("idea", idea_id, *await thread_version(db, idea_id))
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    ideas = await fetch_ideas(db, select_ideas().where(Idea.id == idea_id))
+    if not ideas:
         raise HTTPException(status_code=404, detail="Idea not found")
     
-    return idea
+    idea = ideas[0]
+    idea["messages"] = await fetch_messages(
+        db,
+        select_messages()
+        .where(Message.idea_id == idea_id)
+        .order_by(Message.created_at, Message.id)
+    )
+    return encoded_response(idea, accept, {"ETag": etag})
 
 
 @router.put("/{idea_id}", response_model=IdeaResponse)
@@ -76,71 +246,31 @@ async def update_idea(
     if not idea:
         raise HTTPException(status_code=404, detail="Idea not found")
     
+    event = None
     if idea_data.content is not None:
         old_content = idea.content[:50] + "..." if len(idea.content) > 50 else idea.content
         idea.content = idea_data.content
-        add_system_event(idea, f"Content updated from: {old_content}", db)
+        event = add_system_event(idea, f"Content updated from: {old_content}", db)
     
     await db.commit()
-    await db.refresh(idea)
+    if event:
+        broker.publish_messages(event)
     return idea
 
 
 @router.post("/{idea_id}/execute", response_model=StatusChangeResponse)
-async def execute_idea(idea_id: int, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Idea).where(Idea.id == idea_id))
-    idea = result.scalar_one_or_none()
-    
-    if not idea:
-        raise HTTPException(status_code=404, detail="Idea not found")
-    
-    if idea.status != IdeaStatus.DRAFT:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Cannot execute idea in {idea.status.value} status"
-        )
-    
-    old_status = idea.status
-    idea.status = IdeaStatus.PENDING
-    add_system_event(idea, f"Execution requested: {old_status.value} -> {idea.status.value}", db)
-    
-    await db.commit()
-    
-    return StatusChangeResponse(
-        id=idea.id,
-        old_status=old_status,
-        new_status=idea.status,
-        message="Idea marked for execution"
-    )
+async def execute_idea(
+    idea_id: int,
+    execute_data: IdeaExecuteRequest | None = None,
+    db: AsyncSession = Depends(get_db)
+):
+    priority = execute_data.priority if execute_data else None
+    return await run_transition(db, idea_id, "execute", priority=priority)
 
 
 @router.post("/{idea_id}/cancel", response_model=StatusChangeResponse)
 async def cancel_idea(idea_id: int, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Idea).where(Idea.id == idea_id))
-    idea = result.scalar_one_or_none()
-    
-    if not idea:
-        raise HTTPException(status_code=404, detail="Idea not found")
-    
-    terminal_statuses = [IdeaStatus.COMPLETED, IdeaStatus.FAILED, IdeaStatus.CANCELLED]
-    if idea.status in terminal_statuses:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Cannot cancel idea in {idea.status.value} status"
-        )
-    
-    old_status = idea.status
-    idea.status = IdeaStatus.CANCELLED
-    add_system_event(idea, f"Execution cancelled: {old_status.value} -> {idea.status.value}", db)
-    
-    await db.commit()
-    
-    return StatusChangeResponse(
-        id=idea.id,
-        old_status=old_status,
-        new_status=idea.status,
-        message="Idea cancelled"
-    )
+    return await run_transition(db, idea_id, "cancel")
 
 
 @router.post("/{idea_id}/messages", response_model=MessageResponse, status_code=status.HTTP_201_CREATED)
@@ -149,41 +279,93 @@ async def add_message(
     message_data: MessageCreate,
     db: AsyncSession = Depends(get_db)
 ):
-    result = await db.execute(select(Idea).where(Idea.id == idea_id))
-    idea = result.scalar_one_or_none()
-    
-    if not idea:
-        raise HTTPException(status_code=404, detail="Idea not found")
-    
-    message = Message(
-        idea_id=idea.id,
-        type=MessageType.USER_INPUT,
-        content=message_data.content
+    async def apply(session: AsyncSession):
+        # An idea waiting on the user moves back to the agent with the reply
+        outcome = await compare_and_set(session, "reply", idea_id, content=message_data.content)
+        if outcome is not None:
+            idea, old_status, _, messages = outcome
+            return idea, old_status, messages
+
+        now = utc_now()
+        result = await session.execute(
+            update(Idea)
+            .where(Idea.id == idea_id)
+            .values(
+                message_count=Idea.message_count + 1,
+                last_message_at=now,
+                last_message_type=MessageType.USER_INPUT,
+            )
+            .returning(Idea.id)
+        )
+        if result.scalar_one_or_none() is None:
+            raise HTTPException(status_code=404, detail="Idea not found")
+        message = Message(idea_id=idea_id, type=MessageType.USER_INPUT, content=message_data.content, created_at=now)
+        session.add(message)
+        return None, None, [message]
+
+    idea, old_status, messages = await run_write(db, apply)
+    if idea is None:
+        broker.publish_messages(*messages)
+    else:
+        publish_transition(idea, old_status, idea.status, messages)
+
+    return messages[0]
+
+
+@router.get("/{idea_id}/messages", response_model=list[MessageResponse])
+async def get_messages(
+    idea_id: int,
+    after_id: int | None = Query(None, ge=0),
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    types: list[MessageType] | None = Query(None),
+    if_none_match: Optional[str] = Header(None),
+    accept: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db)
+):
+    # Messages come back in id order, so a client that remembers the last id
+    # it saw fetches only the delta with after_id. When a page is full,
+    # X-Next-After-Id gives the after_id for the next page.
+    etag = make_etag(
+        "messages", idea_id, *await thread_version(db, idea_id),
+        after_id, limit, ",".join(sorted(t.value for t in types or []))
     )
-    db.add(message)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    headers = {"ETag": etag}
     
-    # If waiting for user, transition to waiting for agent
-    if idea.status == IdeaStatus.WAITING_USER:
-        idea.status = IdeaStatus.WAITING_AGENT
-        add_system_event(idea, "User provided instruction, waiting for agent to continue", db)
+    query = select_messages().where(Message.idea_id == idea_id)
+    if after_id is not None:
+        query = query.where(Message.id > after_id)
+    if types:
+        query = query.where(Message.type.in_(types))
+    query = query.order_by(Message.id)
+    if limit:
+        query = query.limit(limit + 1)
     
-    await db.commit()
-    await db.refresh(message)
+    messages = await fetch_messages(db, query)
     
-    return message
+    if limit and len(messages) > limit:
+        messages = messages[:limit]
+        headers["X-Next-After-Id"] = str(messages[-1]["id"])
+    return encoded_response(messages, accept, headers)
 
 
-@router.get("/{idea_id}/messages", response_model=list[MessageResponse])
-async def get_messages(idea_id: int, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Idea).where(Idea.id == idea_id))
-    idea = result.scalar_one_or_none()
-    
-    if not idea:
+@router.get("/{idea_id}/stream")
+async def stream_idea(
+    idea_id: int,
+    request: Request,
+    last_event_id: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Server-Sent Events stream of status changes and new messages for one idea."""
+    result = await db.execute(select(Idea.id).where(Idea.id == idea_id))
+    if result.scalar_one_or_none() is None:
         raise HTTPException(status_code=404, detail="Idea not found")
     
-    result = await db.execute(
-        select(Message)
-        .where(Message.idea_id == idea_id)
-        .order_by(Message.created_at)
+    # The stream outlives the lookup; don't keep a pooled connection open for it
+    await db.rollback()
+    return StreamingResponse(
+        sse_stream(request, idea_id=idea_id, last_event_id=parse_last_event_id(last_event_id)),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
     )
-    return result.scalars().all()
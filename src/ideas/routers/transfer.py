@@ -0,0 +1,151 @@
+"""NDJSON export and import of ideas together with their threads."""
+import enum
+import json
+import tempfile
+from datetime import datetime
+from typing import Any, AsyncIterator
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import DateTime, Enum, Table, bindparam, insert, select, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database import get_db, get_read_db
+from ..migrations import BACKFILL_THREAD_SUMMARY
+from ..models import Idea, IdeaTag, Message
+from ..notify import work_available
+
+router = APIRouter()
+
+CHUNK_SIZE = 1000
+# Uploads are staged in memory up to this size, then on disk
+SPOOL_MAX_MEMORY = 8 * 1024 * 1024
+
+# Thread summaries of the given ideas only
+BACKFILL_IMPORTED_SUMMARIES = text(
+    BACKFILL_THREAD_SUMMARY.text + "    WHERE ideas.id IN :idea_ids\n"
+).bindparams(bindparam("idea_ids", expanding=True))
+
+# Record type -> table, in dependency order (ideas before their tags and messages)
+TABLES: dict[str, Table] = {
+    "idea": Idea.__table__,
+    "tag": IdeaTag.__table__,
+    "message": Message.__table__,
+}
+
+
+def encode_row(record_type: str, row) -> str:
+    """Encode a row as one line: {"<record type>": {column: value, ...}}."""
+    values: dict[str, Any] = {}
+    for key, value in row._mapping.items():
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        elif isinstance(value, enum.Enum):
+            value = value.value
+        values[key] = value
+    return json.dumps({record_type: values}, ensure_ascii=False) + "\n"
+
+
+def decode_record(table: Table, record: dict) -> dict:
+    row = {}
+    for column in table.columns:
+        if column.name not in record:
+            continue
+        value = record[column.name]
+        if value is not None:
+            if isinstance(column.type, DateTime):
+                value = datetime.fromisoformat(value)
+            elif isinstance(column.type, Enum) and column.type.enum_class:
+                value = column.type.enum_class(value)
+        row[column.name] = value
+    return row
+
+
+@router.get("/export")
+async def export_ideas(db: AsyncSession = Depends(get_read_db)):
+    """Stream every idea, then every tag, then every message as NDJSON."""
+    async def lines() -> AsyncIterator[str]:
+        for record_type, table in TABLES.items():
+            result = await db.stream(
+                select(table)
+                .order_by(*table.primary_key.columns)
+                .execution_options(yield_per=CHUNK_SIZE)
+            )
+            async for rows in result.partitions():
+                yield "".join(encode_row(record_type, row) for row in rows)
+
+    return StreamingResponse(
+        lines(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="ideas-export.ndjson"'},
+    )
+
+
+@router.post("/import")
+async def import_ideas(request: Request, db: AsyncSession = Depends(get_db)):
+    """Bulk-load an NDJSON export, keeping original ids and timestamps.
+
+    The body is staged to a spooled temp file before the session touches
+    the database, so a slow upload never holds the (single) write
+    connection. It is then inserted in chunks with executemany as one
+    transaction. Thread summaries of the affected ideas are recomputed
+    afterwards, so exports from before they existed load too.
+    """
+    pending: dict[str, list[dict]] = {record_type: [] for record_type in TABLES}
+    counts = {record_type: 0 for record_type in TABLES}
+    # Ideas whose thread summary may have changed
+    touched: set[int] = set()
+
+    async def flush(up_to: str):
+        # Flush parents first so tags and messages never land before their idea
+        for record_type, table in TABLES.items():
+            if pending[record_type]:
+                await db.execute(insert(table), pending[record_type])
+                counts[record_type] += len(pending[record_type])
+                pending[record_type] = []
+            if record_type == up_to:
+                break
+
+    async def handle_line(line: bytes, line_number: int):
+        if not line.strip():
+            return
+        try:
+            [(record_type, record)] = json.loads(line).items()
+            row = decode_record(TABLES[record_type], record)
+            if record_type == "idea":
+                touched.add(row["id"])
+            elif record_type == "message":
+                touched.add(row["idea_id"])
+        except (ValueError, KeyError, TypeError, AttributeError) as exc:
+            raise HTTPException(status_code=400, detail=f"Invalid record on line {line_number}: {exc}")
+        pending[record_type].append(row)
+        if len(pending[record_type]) >= CHUNK_SIZE:
+            await flush(record_type)
+
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY) as spool:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.seek(0)
+
+        try:
+            for line_number, line in enumerate(spool, start=1):
+                await handle_line(line, line_number)
+            await flush("message")
+            # Imported messages may belong to ideas whose summary predates them
+            touched_ids = sorted(touched)
+            for start in range(0, len(touched_ids), CHUNK_SIZE):
+                await db.execute(
+                    BACKFILL_IMPORTED_SUMMARIES,
+                    {"idea_ids": touched_ids[start:start + CHUNK_SIZE]},
+                )
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            raise HTTPException(status_code=409, detail="Import conflicts with existing ideas or messages")
+        except HTTPException:
+            await db.rollback()
+            raise
+
+    work_available.notify()
+    return {"ideas": counts["idea"], "tags": counts["tag"], "messages": counts["message"]}
@@ -1,7 +1,10 @@
 """Web authentication router with JWT tokens."""
-import jwt
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 from typing import Optional
+
+import jwt
 from fastapi import APIRouter, HTTPException, status, Depends, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
@@ -42,15 +45,55 @@ def create_token(username: str) -> tuple[str, int]:
     return token, int(expires_delta.total_seconds())
 
 
+class TokenCache:
+    """Usernames of verified tokens, each kept until its token expires (LRU)."""
+    
+    def __init__(self, max_entries: int):
+        self._max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[str, float]] = OrderedDict()
+    
+    def get(self, token: str) -> Optional[str]:
+        entry = self._entries.get(token)
+        if entry is None:
+            return None
+        username, expires_at = entry
+        if expires_at <= time.time():
+            del self._entries[token]
+            return None
+        self._entries.move_to_end(token)
+        return username
+    
+    def put(self, token: str, username: str, expires_at: float):
+        if self._max_entries <= 0:
+            return
+        self._entries[token] = (username, expires_at)
+        self._entries.move_to_end(token)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+    
+    def clear(self):
+        self._entries.clear()
+
+
+token_cache = TokenCache(settings.jwt_cache_size)
+
+
 def verify_token(token: str) -> Optional[str]:
     """Verify JWT token and return username if valid."""
+    username = token_cache.get(token)
+    if username is not None:
+        return username
     try:
         payload = jwt.decode(token, settings.jwt_secret, algorithms=["HS256"])
-        return payload.get("sub")
     except jwt.ExpiredSignatureError:
         return None
     except jwt.InvalidTokenError:
         return None
+    username = payload.get("sub")
+    # Tokens without an expiry are verified every time
+    if username is not None and "exp" in payload:
+        token_cache.put(token, username, payload["exp"])
+    return username
 
 
 async def get_current_user(
@@ -1,9 +1,17 @@
 """Pydantic schemas for API request/response validation."""
 from datetime import datetime
-from typing import Optional
-from pydantic import BaseModel, ConfigDict
+from typing import Annotated, Literal, Optional
+from pydantic import BaseModel, ConfigDict, Field, StringConstraints
 
-from .models import IdeaStatus, MessageType
+from .models import DEFAULT_PRIORITY, HIGHEST_PRIORITY, LOWEST_PRIORITY, IdeaStatus, MessageType
+
+
+# Capability tag: lower-cased, no commas or spaces (agents pass theirs as
+# a comma-separated query parameter)
+Tag = Annotated[str, StringConstraints(
+    strip_whitespace=True, to_lower=True, min_length=1, max_length=64, pattern=r"^[^,\s]+$"
+)]
+MAX_TAGS = 16
 
 
 class MessageBase(BaseModel):
@@ -28,7 +36,12 @@ class IdeaBase(BaseModel):
 
 
 class IdeaCreate(IdeaBase):
-    pass
+    priority: int = Field(DEFAULT_PRIORITY, ge=HIGHEST_PRIORITY, le=LOWEST_PRIORITY)
+    tags: list[Tag] = Field(default_factory=list, max_length=MAX_TAGS)
+
+
+class IdeaExecuteRequest(BaseModel):
+    priority: Optional[int] = Field(None, ge=HIGHEST_PRIORITY, le=LOWEST_PRIORITY)
 
 
 class IdeaUpdate(BaseModel):
@@ -40,15 +53,31 @@ class IdeaResponse(IdeaBase):
     
     id: int
     status: IdeaStatus
+    priority: int = DEFAULT_PRIORITY
+    tags: list[str] = []
     agent_id: Optional[str] = None
+    lease_expires_at: Optional[datetime] = None
     created_at: datetime
     updated_at: datetime
+    message_count: int = 0
+    last_message_at: Optional[datetime] = None
+    last_message_type: Optional[MessageType] = None
+    open_question: Optional[str] = None
 
 
 class IdeaWithMessages(IdeaResponse):
     messages: list[MessageResponse] = []
 
 
+class SearchResult(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    
+    idea: IdeaResponse
+    snippet: str
+    message_id: Optional[int] = None  # None when the idea's own content matched
+    score: float
+
+
 class AgentClaimRequest(BaseModel):
     agent_id: str
 
@@ -78,3 +107,55 @@ class StatusChangeResponse(BaseModel):
     old_status: IdeaStatus
     new_status: IdeaStatus
     message: str
+
+
+class AgentLeaseResponse(BaseModel):
+    id: int
+    status: IdeaStatus
+    lease_expires_at: datetime
+
+
+class AgentBatchOperation(BaseModel):
+    op: Literal["claim", "start", "heartbeat", "feedback", "ask", "complete", "fail"]
+    idea_id: int
+    content: Optional[str] = None   # feedback
+    question: Optional[str] = None  # ask
+    summary: Optional[str] = None   # complete
+    reason: Optional[str] = None    # fail
+
+
+class AgentBatchRequest(BaseModel):
+    agent_id: str
+    operations: list[AgentBatchOperation] = Field(min_length=1, max_length=100)
+
+
+class AgentBatchResult(BaseModel):
+    index: int
+    idea_id: int
+    ok: bool
+    status_code: int
+    detail: Optional[str] = None
+    result: Optional[StatusChangeResponse] = None
+
+
+class AgentBatchResponse(BaseModel):
+    results: list[AgentBatchResult]
+
+
+class AgentKeyCreate(BaseModel):
+    agent_id: str = Field(min_length=1, max_length=255)
+    name: Optional[str] = Field(None, max_length=255)
+
+
+class AgentKeyResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    
+    id: int
+    agent_id: str
+    key_prefix: str
+    name: Optional[str] = None
+    created_at: datetime
+
+
+class AgentKeyCreated(AgentKeyResponse):
+    key: str  # shown once; only its hash is stored
@@ -0,0 +1,132 @@
+"""Ranked full-text search over ideas and their threads (FTS5)."""
+from dataclasses import dataclass
+from typing import NamedTuple, Optional
+
+from sqlalchemy import bindparam, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import Idea
+
+# With the trigram tokenizer a snippet token is one character; 64 is the FTS5 maximum
+SNIPPET_TOKENS = 64
+
+# Every match is scored, but only the best :candidates rows per table are
+# kept and sorted, and messages_fts carries idea_id so messages is never
+# joined. (ORDER BY bm25() here is cheaper than FTS5's ORDER BY rank, which
+# scores the matches twice.)
+IDEA_HITS = text("""
+    SELECT rowid AS idea_id, bm25(ideas_fts) AS score FROM ideas_fts
+    WHERE ideas_fts MATCH :query ORDER BY score LIMIT :candidates
+""")
+MESSAGE_HITS = text("""
+    SELECT idea_id, rowid AS message_id, bm25(messages_fts) AS score FROM messages_fts
+    WHERE messages_fts MATCH :query ORDER BY score LIMIT :candidates
+""")
+
+
+def snippets_query(table: str):
+    # Snippets are only computed for the page being returned
+    return text(
+        f"SELECT rowid, snippet({table}_fts, 0, '**', '**', '…', {SNIPPET_TOKENS}) "
+        f"FROM {table}_fts WHERE {table}_fts MATCH :query AND rowid IN :ids"
+    ).bindparams(bindparam("ids", expanding=True))
+
+
+async def load_snippets(db: AsyncSession, table: str, query: str, ids: list[int]) -> dict[int, str]:
+    if not ids:
+        return {}
+    result = await db.execute(snippets_query(table), {"query": query, "ids": ids})
+    return dict(result.all())
+
+
+@dataclass
+class SearchHit:
+    idea: Idea
+    score: float
+    snippet: str
+    message_id: Optional[int]
+
+
+def build_match_query(q: str) -> str:
+    """Turn free text into an FTS5 query: every term must appear.
+
+    Terms are quoted so punctuation and FTS operators in user input can't
+    cause a syntax error. The trigram tokenizer needs at least three
+    characters, so shorter terms are dropped.
+    """
+    terms = [term.replace('"', '""') for term in q.split() if len(term) >= 3]
+    return " ".join(f'"{term}"' for term in terms)
+
+
+class RankedHit(NamedTuple):
+    score: float
+    idea_id: int
+    message_id: Optional[int]
+
+
+async def best_message_hits(db: AsyncSession, query: str, window: int) -> dict[int, RankedHit]:
+    """The best-scoring message of each of the ``window`` ideas whose messages
+    rank highest.
+
+    One busy thread can fill the top messages on its own, so the candidate
+    count grows until it covers ``window`` distinct ideas or every match.
+    """
+    candidates = window
+    while True:
+        result = await db.execute(MESSAGE_HITS, {"query": query, "candidates": candidates})
+        rows = result.all()
+        best: dict[int, RankedHit] = {}
+        for row in rows:
+            if row.idea_id not in best:
+                best[row.idea_id] = RankedHit(row.score, row.idea_id, row.message_id)
+        if len(best) >= window or len(rows) < candidates:
+            return best
+        candidates *= 4
+
+
+async def ranked_hits(db: AsyncSession, query: str, window: int) -> list[RankedHit]:
+    """The ``window`` best-matching ideas, best first, each with its best hit.
+
+    An idea among them either has its own content in the top ``window``
+    idea matches or a message among the best messages of the top ``window``
+    ideas, so nothing outside those candidates can rank higher.
+    """
+    best = await best_message_hits(db, query, window)
+    result = await db.execute(IDEA_HITS, {"query": query, "candidates": window})
+    for row in result:
+        hit = best.get(row.idea_id)
+        if hit is None or row.score <= hit.score:
+            best[row.idea_id] = RankedHit(row.score, row.idea_id, None)
+    return sorted(best.values())[:window]
+
+
+async def search_ideas(db: AsyncSession, q: str, limit: int, offset: int) -> list[SearchHit]:
+    query = build_match_query(q)
+    if not query:
+        return []
+
+    hits = (await ranked_hits(db, query, offset + limit))[offset:]
+    if not hits:
+        return []
+
+    idea_snippets = await load_snippets(
+        db, "ideas", query, [hit.idea_id for hit in hits if hit.message_id is None]
+    )
+    message_snippets = await load_snippets(
+        db, "messages", query, [hit.message_id for hit in hits if hit.message_id is not None]
+    )
+    result = await db.execute(select(Idea).where(Idea.id.in_([hit.idea_id for hit in hits])))
+    ideas = {idea.id: idea for idea in result.scalars()}
+
+    return [
+        SearchHit(
+            idea=ideas[hit.idea_id],
+            score=hit.score,
+            snippet=(
+                idea_snippets[hit.idea_id] if hit.message_id is None
+                else message_snippets[hit.message_id]
+            ),
+            message_id=hit.message_id,
+        )
+        for hit in hits
+    ]
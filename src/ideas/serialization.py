@@ -0,0 +1,140 @@
+"""Fast response path for large idea lists and threads.
+
+Validating every ORM object through ``IdeaResponse``/``MessageResponse``
+with ``from_attributes`` and then encoding with the stdlib json module
+dominates the cost of big list and thread responses. This path selects
+only the response columns as row tuples, builds plain dicts in the
+schemas' field order and encodes them with orjson, producing the same JSON
+bytes. Clients that accept ``application/msgpack`` with at least the
+quality they give JSON get MessagePack instead.
+
+The schemas stay the source of truth: the selected columns are derived
+from their fields, and routes keep them as ``response_model`` for the
+OpenAPI description.
+"""
+import enum
+from datetime import datetime
+from typing import Any, Optional
+
+import msgpack
+import orjson
+from fastapi import Response
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import Idea, IdeaTag, Message
+from .schemas import IdeaResponse, MessageResponse
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_MEDIA_TYPES = (MSGPACK_MEDIA_TYPE, "application/x-msgpack")
+
+# Match pydantic's JSON output: UTC datetimes end in "Z"
+ORJSON_OPTIONS = orjson.OPT_UTC_Z
+
+# Response fields, in schema order; tags come from idea_tags, not a column
+IDEA_FIELDS = tuple(IdeaResponse.model_fields)
+IDEA_COLUMNS = tuple(getattr(Idea, name) for name in IDEA_FIELDS if name != "tags")
+TAGS_POSITION = IDEA_FIELDS.index("tags")
+ID_POSITION = IDEA_FIELDS.index("id")  # same index in the row, as id precedes tags
+MESSAGE_FIELDS = tuple(MessageResponse.model_fields)
+MESSAGE_COLUMNS = tuple(getattr(Message, name) for name in MESSAGE_FIELDS)
+
+# Ideas per tag lookup, well under SQLite's bound-parameter limit
+TAG_BATCH_SIZE = 10_000
+
+
+def select_ideas() -> Select:
+    """SELECT of the IdeaResponse columns, to be filtered and ordered by the caller."""
+    return select(*IDEA_COLUMNS)
+
+
+def select_messages() -> Select:
+    return select(*MESSAGE_COLUMNS)
+
+
+async def load_tags(db: AsyncSession, idea_ids: list[int]) -> dict[int, list[str]]:
+    """Return each idea's tags, sorted, for the ideas that have any."""
+    tags: dict[int, list[str]] = {}
+    for start in range(0, len(idea_ids), TAG_BATCH_SIZE):
+        result = await db.execute(
+            select(IdeaTag.idea_id, IdeaTag.tag)
+            .where(IdeaTag.idea_id.in_(idea_ids[start:start + TAG_BATCH_SIZE]))
+            .order_by(IdeaTag.idea_id, IdeaTag.tag)
+        )
+        for idea_id, tag in result.all():
+            tags.setdefault(idea_id, []).append(tag)
+    return tags
+
+
+async def fetch_ideas(db: AsyncSession, statement: Select) -> list[dict[str, Any]]:
+    """Run a ``select_ideas()`` statement and return IdeaResponse-shaped dicts."""
+    rows = (await db.execute(statement)).all()
+    tags = await load_tags(db, [row[ID_POSITION] for row in rows])
+    ideas = []
+    for row in rows:
+        values = list(row)
+        values.insert(TAGS_POSITION, tags.get(row[ID_POSITION], []))
+        ideas.append(dict(zip(IDEA_FIELDS, values)))
+    return ideas
+
+
+async def fetch_messages(db: AsyncSession, statement: Select) -> list[dict[str, Any]]:
+    """Run a ``select_messages()`` statement and return MessageResponse-shaped dicts."""
+    return [dict(zip(MESSAGE_FIELDS, row)) for row in (await db.execute(statement)).all()]
+
+
+def accept_qualities(accept: str) -> dict[str, float]:
+    """Media type -> q-value for each entry of an Accept header."""
+    qualities: dict[str, float] = {}
+    for entry in accept.split(","):
+        media_type, *params = entry.split(";")
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        media_type = media_type.strip().lower()
+        qualities[media_type] = max(quality, qualities.get(media_type, 0.0))
+    return qualities
+
+
+def wants_msgpack(accept: Optional[str]) -> bool:
+    """MessagePack when it is named explicitly, with at least JSON's quality."""
+    if not accept or "msgpack" not in accept:
+        return False
+    qualities = accept_qualities(accept)
+    msgpack_quality = max(qualities.get(media_type, 0.0) for media_type in MSGPACK_MEDIA_TYPES)
+    json_quality = max(
+        qualities.get(media_type, 0.0) for media_type in (JSON_MEDIA_TYPE, "application/*", "*/*")
+    )
+    return msgpack_quality > 0 and msgpack_quality >= json_quality
+
+
+def _msgpack_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def encode(payload: Any, accept: Optional[str] = None) -> tuple[bytes, str]:
+    """Encode a payload for the client's Accept header; return (body, media type)."""
+    if wants_msgpack(accept):
+        return msgpack.packb(payload, default=_msgpack_default), MSGPACK_MEDIA_TYPE
+    return orjson.dumps(payload, option=ORJSON_OPTIONS), JSON_MEDIA_TYPE
+
+
+def encoded_response(
+    payload: Any,
+    accept: Optional[str] = None,
+    headers: Optional[dict[str, str]] = None,
+) -> Response:
+    body, media_type = encode(payload, accept)
+    response = Response(content=body, media_type=media_type, headers=headers)
+    response.headers["Vary"] = "Accept"
+    return response
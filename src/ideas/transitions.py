@@ -0,0 +1,342 @@
+"""Idea status transitions, applied as single compare-and-set statements.
+
+Every status change a user or agent can request is a row in TRANSITIONS.
+Applying one is a single ``UPDATE ideas ... WHERE id = ? AND status IN (...)
+[AND agent_id = ?] RETURNING *`` that also bumps the thread summary, followed
+by the insert of its thread messages. There is no read before the write, so
+two conflicting requests can't both pass the check. Only when the UPDATE
+matches no row is the idea read again, to report 404, 400, 403 or 429.
+"""
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Any, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import raiseload
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import settings
+from .events import broker
+from .models import Idea, IdeaStatus, Message, MessageType, utc_now
+from .notify import work_available
+from .schemas import StatusChangeResponse
+from .writer import run_write
+
+# Statuses agents poll for
+POLLABLE_STATUSES = (IdeaStatus.PENDING, IdeaStatus.WAITING_AGENT)
+
+# Statuses in which an agent holds the idea under a lease
+LEASED_STATUSES = (IdeaStatus.CLAIMED, IdeaStatus.EXECUTING)
+
+ACTIVE_STATUSES = (
+    IdeaStatus.DRAFT, IdeaStatus.PENDING, IdeaStatus.CLAIMED,
+    IdeaStatus.EXECUTING, IdeaStatus.WAITING_USER, IdeaStatus.WAITING_AGENT,
+)
+
+
+@dataclass(frozen=True)
+class Transition:
+    """One row of the state machine.
+
+    Text fields are format templates over the request parameters plus
+    ``agent_id``, ``old`` and ``new`` (status values); ``error`` gets the
+    idea's current ``status``.
+    """
+    from_statuses: tuple[IdeaStatus, ...]
+    to_status: Optional[IdeaStatus]  # None keeps the current status
+    error: str
+    detail: str
+    event: Optional[str] = None  # system event text
+    agent_message: Optional[str] = None  # agent feedback text, added before the event
+    user_message: Optional[str] = None  # user input text, added before the event
+    requires_agent: bool = False  # only the agent holding the idea may apply it
+    assigns_agent: bool = False  # the caller becomes the idea's agent
+    open_question: Optional[str] = None
+    lease: Optional[bool] = None  # True grants or renews the lease, False releases it
+    fair_share: bool = False  # subject to settings.agent_max_active_claims
+    columns: tuple[str, ...] = ()  # request parameters written to the idea when given
+    defaults: dict[str, Any] = field(default_factory=dict)
+
+
+TRANSITIONS: dict[str, Transition] = {
+    "execute": Transition(
+        from_statuses=(IdeaStatus.DRAFT,),
+        to_status=IdeaStatus.PENDING,
+        error="Cannot execute idea in {status} status",
+        detail="Idea marked for execution",
+        event="Execution requested: {old} -> {new}",
+        columns=("priority",),
+    ),
+    "reply": Transition(
+        from_statuses=(IdeaStatus.WAITING_USER,),
+        to_status=IdeaStatus.WAITING_AGENT,
+        error="Cannot reply to idea in {status} status",
+        detail="User replied",
+        event="User provided instruction, waiting for agent to continue",
+        user_message="{content}",
+    ),
+    "cancel": Transition(
+        from_statuses=ACTIVE_STATUSES,
+        to_status=IdeaStatus.CANCELLED,
+        error="Cannot cancel idea in {status} status",
+        detail="Idea cancelled",
+        event="Execution cancelled: {old} -> {new}",
+        lease=False,
+    ),
+    "claim": Transition(
+        from_statuses=(IdeaStatus.PENDING,),
+        to_status=IdeaStatus.CLAIMED,
+        error="Cannot claim idea in {status} status",
+        detail="Task claimed by agent {agent_id}",
+        event="Claimed by agent: {agent_id}",
+        assigns_agent=True,
+        fair_share=True,
+        lease=True,
+    ),
+    "start": Transition(
+        from_statuses=(IdeaStatus.CLAIMED, IdeaStatus.WAITING_AGENT),
+        to_status=IdeaStatus.EXECUTING,
+        error="Cannot start execution for idea in {status} status",
+        detail="Execution started",
+        event="Execution started by agent: {agent_id}",
+        requires_agent=True,
+        lease=True,
+    ),
+    "feedback": Transition(
+        from_statuses=(IdeaStatus.EXECUTING,),
+        to_status=None,
+        error="Cannot submit feedback for idea in {status} status",
+        detail="Feedback recorded",
+        agent_message="{content}",
+        requires_agent=True,
+        lease=True,
+    ),
+    "ask": Transition(
+        from_statuses=(IdeaStatus.EXECUTING,),
+        to_status=IdeaStatus.WAITING_USER,
+        error="Cannot ask user for idea in {status} status",
+        detail="Waiting for user instruction",
+        event="Agent requested user instruction",
+        agent_message="[Question] {question}",
+        requires_agent=True,
+        open_question="{question}",
+        lease=False,
+    ),
+    "complete": Transition(
+        from_statuses=(IdeaStatus.EXECUTING,),
+        to_status=IdeaStatus.COMPLETED,
+        error="Cannot complete idea in {status} status",
+        detail="Task completed",
+        event="Task completed",
+        agent_message="[Completed] {summary}",
+        requires_agent=True,
+        defaults={"summary": "Task completed successfully"},
+        lease=False,
+    ),
+    "fail": Transition(
+        from_statuses=(IdeaStatus.EXECUTING,),
+        to_status=IdeaStatus.FAILED,
+        error="Cannot fail idea in {status} status",
+        detail="Task failed",
+        event="Task failed: {reason}",
+        agent_message="[Failed] {reason}",
+        requires_agent=True,
+        lease=False,
+    ),
+    "heartbeat": Transition(
+        from_statuses=LEASED_STATUSES,
+        to_status=None,
+        error="Cannot renew lease for idea in {status} status",
+        detail="Lease renewed",
+        requires_agent=True,
+        lease=True,
+    ),
+    # Applied by the lease reaper; also clears the agent
+    "reap": Transition(
+        from_statuses=LEASED_STATUSES,
+        to_status=IdeaStatus.PENDING,
+        error="Cannot requeue idea in {status} status",
+        detail="Lease expired",
+        event="Lease expired, returned to queue: {old} -> {new}",
+        assigns_agent=True,
+        lease=False,
+    ),
+}
+
+
+def active_claims(agent_id: Optional[str]):
+    """Count the ideas an agent currently holds under a lease."""
+    return (
+        select(func.count())
+        .select_from(Idea)
+        .where(Idea.agent_id == agent_id, Idea.status.in_(LEASED_STATUSES))
+    )
+
+
+async def agent_at_capacity(session: AsyncSession, agent_id: Optional[str]) -> bool:
+    cap = settings.agent_max_active_claims
+    if cap is None:
+        return False
+    return (await session.execute(active_claims(agent_id))).scalar_one() >= cap
+
+
+def agent_capacity_error() -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail=f"Agent already holds {settings.agent_max_active_claims} active ideas"
+    )
+
+
+async def compare_and_set(
+    session: AsyncSession,
+    name: str,
+    idea_id,
+    agent_id: Optional[str] = None,
+    conditions: tuple = (),
+    **params,
+) -> Optional[tuple[Idea, IdeaStatus, str, list[Message]]]:
+    """Apply a transition if the idea is in an allowed state, else return None.
+
+    ``idea_id`` may also be a scalar subquery selecting the idea, and
+    ``conditions`` adds WHERE clauses to the compare-and-set.
+    Returns (idea, old_status, detail, messages); the idea is detached from
+    the session, holding the row as this statement left it.
+    """
+    transition = TRANSITIONS[name]
+    params = {**transition.defaults, **{k: v for k, v in params.items() if v is not None}}
+    now = utc_now()
+
+    templates = [
+        (message_type, template) for message_type, template in (
+            (MessageType.USER_INPUT, transition.user_message),
+            (MessageType.AGENT_FEEDBACK, transition.agent_message),
+            (MessageType.SYSTEM_EVENT, transition.event),
+        )
+        if template is not None
+    ]
+
+    # previous_status = status is evaluated against the old row, so RETURNING
+    # reports the status this statement moved the idea out of
+    values: dict[str, Any] = {
+        "previous_status": Idea.status,
+        "updated_at": now,
+    }
+    if templates:
+        values["message_count"] = Idea.message_count + len(templates)
+        values["last_message_at"] = now
+        values["last_message_type"] = templates[-1][0]
+    new_status = transition.to_status
+    if new_status is not None:
+        values["status"] = new_status
+        if new_status != IdeaStatus.WAITING_USER:
+            values["open_question"] = None
+    if transition.open_question is not None:
+        values["open_question"] = transition.open_question.format(**params)
+    if transition.assigns_agent:
+        values["agent_id"] = agent_id
+    if transition.lease is not None:
+        values["lease_expires_at"] = (
+            now + timedelta(seconds=settings.lease_ttl_seconds) if transition.lease else None
+        )
+    for column in transition.columns:
+        if column in params:
+            values[column] = params[column]
+
+    statement = update(Idea).where(
+        Idea.id == idea_id,
+        Idea.status.in_(transition.from_statuses),
+        *conditions,
+    )
+    if transition.requires_agent:
+        statement = statement.where(Idea.agent_id == agent_id)
+    if transition.fair_share and settings.agent_max_active_claims is not None:
+        statement = statement.where(
+            active_claims(agent_id).scalar_subquery() < settings.agent_max_active_claims
+        )
+    result = await session.execute(
+        statement
+        .values(**values)
+        .returning(Idea)
+        # Transition responses don't carry tags; skip their selectin load
+        .options(raiseload(Idea.tag_links))
+        .execution_options(synchronize_session=False, populate_existing=True)
+    )
+    idea = result.scalar_one_or_none()
+    if idea is None:
+        return None
+    # With group commit several units of work share this session, and a
+    # later transition of the same idea would overwrite this object through
+    # populate_existing; detached, it stays a snapshot of this transition.
+    session.expunge(idea)
+
+    old_status = idea.previous_status
+    text_params = {**params, "agent_id": agent_id, "old": old_status.value, "new": idea.status.value}
+    messages = [
+        Message(idea_id=idea.id, type=message_type, content=template.format(**text_params), created_at=now)
+        for message_type, template in templates
+    ]
+    session.add_all(messages)
+    return idea, old_status, transition.detail.format(**text_params), messages
+
+
+async def apply_transition(
+    session: AsyncSession,
+    idea_id: int,
+    name: str,
+    agent_id: Optional[str] = None,
+    **params,
+) -> tuple[Idea, IdeaStatus, str, list[Message]]:
+    """Apply a transition, raising the HTTPException that explains a refusal."""
+    outcome = await compare_and_set(session, name, idea_id, agent_id, **params)
+    if outcome is not None:
+        return outcome
+
+    transition = TRANSITIONS[name]
+    result = await session.execute(
+        select(Idea.status, Idea.agent_id).where(Idea.id == idea_id)
+    )
+    current = result.one_or_none()
+    if current is None:
+        raise HTTPException(status_code=404, detail="Idea not found")
+    if current.status not in transition.from_statuses:
+        raise HTTPException(
+            status_code=400,
+            detail=transition.error.format(status=current.status.value)
+        )
+    if transition.requires_agent and current.agent_id != agent_id:
+        raise HTTPException(status_code=403, detail="Not authorized agent")
+    if transition.fair_share and await agent_at_capacity(session, agent_id):
+        raise agent_capacity_error()
+    # The idea moved between the UPDATE and this read
+    raise HTTPException(status_code=409, detail="Idea changed concurrently, retry")
+
+
+def publish_transition(idea: Idea, old_status: IdeaStatus, new_status: IdeaStatus, messages: list[Message]):
+    """Announce a committed transition to SSE clients and parked pollers."""
+    if new_status != old_status:
+        broker.publish_status(idea, old_status, new_status)
+        if new_status in POLLABLE_STATUSES:
+            work_available.notify()
+    broker.publish_messages(*messages)
+
+
+async def run_transition(
+    db: AsyncSession,
+    idea_id: int,
+    name: str,
+    agent_id: Optional[str] = None,
+    **params,
+) -> StatusChangeResponse:
+    """Apply one transition in its own write, commit and publish it."""
+    idea, old_status, detail, messages = await run_write(
+        db, lambda session: apply_transition(session, idea_id, name, agent_id, **params)
+    )
+    publish_transition(idea, old_status, idea.status, messages)
+
+    return StatusChangeResponse(
+        id=idea.id,
+        old_status=old_status,
+        new_status=idea.status,
+        message=detail
+    )
@@ -0,0 +1,154 @@
+"""Optional group-commit queue for small, frequent writes.
+
+Each commit costs an fsync, so a burst of feedback messages from many agents
+is bound by disk latency rather than by SQLite. When enabled, write handlers
+hand their unit of work to a single writer task that runs everything queued
+within a few milliseconds in one transaction and commits once; every caller
+still gets its own result or exception.
+
+A unit of work is an ``async def work(session)`` that validates first and
+only then stages changes on the session. Validation errors (HTTPException)
+are reported to that caller alone. Any other error, or a failed commit, rolls
+the batch back and replays it one transaction per item, so one bad write
+can't sink its neighbours.
+"""
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from .config import settings
+from .database import async_session_maker
+
+T = TypeVar("T")
+Work = Callable[[AsyncSession], Awaitable[Any]]
+
+
+@dataclass
+class _Pending:
+    work: Work
+    future: asyncio.Future = field(default_factory=lambda: asyncio.get_running_loop().create_future())
+
+
+class WriteQueue:
+    """Single-writer queue that coalesces concurrent writes into group commits."""
+
+    def __init__(
+        self,
+        session_maker: async_sessionmaker,
+        max_batch: int = 100,
+        max_delay_ms: float = 2.0,
+    ):
+        self._session_maker = session_maker
+        self._max_batch = max_batch
+        self._max_delay = max_delay_ms / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.batches_committed = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def start(self):
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop accepting work and wait until everything queued is committed."""
+        if not self.running:
+            return
+        task, self._task = self._task, None
+        self._queue.put_nowait(None)
+        await task
+
+    async def submit(self, work: Callable[[AsyncSession], Awaitable[T]]) -> T:
+        if not self.running:
+            raise RuntimeError("Write queue is not running")
+        pending = _Pending(work)
+        self._queue.put_nowait(pending)
+        return await pending.future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            first = await self._queue.get()
+            if first is None:
+                break
+            batch = [first]
+            deadline = loop.time() + self._max_delay
+            while len(batch) < self._max_batch:
+                try:
+                    pending = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        pending = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if pending is None:
+                    stopping = True
+                    break
+                batch.append(pending)
+            await self._flush(batch)
+
+    async def _flush(self, batch: list[_Pending]):
+        outcomes = []
+        try:
+            async with self._session_maker() as session:
+                for pending in batch:
+                    try:
+                        outcomes.append((pending, await pending.work(session), None))
+                    except HTTPException as exc:
+                        outcomes.append((pending, None, exc))
+                await session.commit()
+        except Exception:
+            for pending in batch:
+                await self._run_single(pending)
+            return
+
+        self.batches_committed += 1
+        for pending, result, exc in outcomes:
+            _resolve(pending.future, result, exc)
+
+    async def _run_single(self, pending: _Pending):
+        try:
+            async with self._session_maker() as session:
+                result = await pending.work(session)
+                await session.commit()
+        except Exception as exc:
+            _resolve(pending.future, None, exc)
+        else:
+            _resolve(pending.future, result, None)
+
+
+def _resolve(future: asyncio.Future, result: Any, exc: Optional[BaseException]):
+    if future.done():
+        return
+    if exc is not None:
+        future.set_exception(exc)
+    else:
+        future.set_result(result)
+
+
+write_queue = WriteQueue(
+    async_session_maker,
+    max_batch=settings.group_commit_max_batch,
+    max_delay_ms=settings.group_commit_max_delay_ms,
+)
+
+
+async def run_write(db: AsyncSession, work: Callable[[AsyncSession], Awaitable[T]]) -> T:
+    """Run a unit of work through the group-commit queue, or commit it on db directly."""
+    if write_queue.running:
+        return await write_queue.submit(work)
+    result = await work(db)
+    await db.commit()
+    return result
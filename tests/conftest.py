@@ -1,10 +1,15 @@
+from contextlib import contextmanager
+
 import pytest
 import pytest_asyncio
 from httpx import AsyncClient, ASGITransport
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 
-from ideas.database import Base, get_db
+from ideas.auth import agent_key_index
+from ideas.cache import read_cache
+from ideas.database import Base, configure_sqlite, get_db, get_read_db, track_queries
 from ideas.main import app
+from ideas.migrations import run_migrations
 
 TEST_DATABASE_URL = "sqlite+aiosqlite:///./test.db"
 
@@ -12,6 +17,7 @@ test_engine = create_async_engine(
     TEST_DATABASE_URL,
     echo=False,
 )
+configure_sqlite(test_engine)
 
 TestSessionLocal = async_sessionmaker(
     test_engine,
@@ -32,8 +38,14 @@ async def override_get_db():
 async def test_db():
     async with test_engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(run_migrations)
+    # The schema was rebuilt outside any session, so no write bumped the
+    # cache version
+    read_cache.clear()
+    agent_key_index.clear()
     
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
     
     yield
     
@@ -54,3 +66,17 @@ async def client(test_db):
 async def db_session(test_db):
     async with TestSessionLocal() as session:
         yield session
+
+
+@contextmanager
+def max_queries(limit: int):
+    """Fail if the block runs more than ``limit`` SQL statements.
+    
+    Use around a single request to pin its query budget, so an N+1 pattern
+    or an extra commit shows up as a test failure.
+    """
+    with track_queries() as stats:
+        yield stats
+    assert stats.count <= limit, (
+        f"{stats.count} queries, expected at most {limit}:\n" + "\n".join(stats.statements)
+    )
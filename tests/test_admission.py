@@ -0,0 +1,133 @@
+import asyncio
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from ideas.admission import AdmissionMiddleware, LoadShedder, RateLimiter, TokenBucket
+from ideas.main import app
+
+
+def admission_client(**options) -> AsyncClient:
+    transport = ASGITransport(app=AdmissionMiddleware(app, **options))
+    return AsyncClient(transport=transport, base_url="http://test")
+
+
+class TestTokenBucket:
+    def test_burst_then_refill(self):
+        # given: a bucket of 2 refilling at 4 tokens a second
+        bucket = TokenBucket(rate=4, burst=2, now=0.0)
+
+        # when/then: the burst is spent, then the wait is until the next token
+        assert bucket.take(0.0) == 0
+        assert bucket.take(0.0) == 0
+        assert bucket.take(0.0) == pytest.approx(0.25)
+        assert bucket.take(0.25) == 0
+
+    def test_limiter_keeps_clients_apart(self):
+        limiter = RateLimiter(rate=1, burst=1)
+        assert limiter.acquire("agent:a", now=0.0) == 0
+        assert limiter.acquire("agent:a", now=0.0) > 0
+        assert limiter.acquire("agent:b", now=0.0) == 0
+
+
+class TestLoadShedder:
+    def test_db_latency_decays(self):
+        # given: slow database time measured at t=0
+        shedder = LoadShedder(max_db_ms=100, half_life=1.0, weight=1.0)
+        shedder.record(0.4, now=0.0)
+
+        # then: it sheds until the average has decayed under the threshold
+        assert shedder.db_ms(now=0.0) == pytest.approx(400)
+        assert shedder.db_ms(now=2.0) == pytest.approx(100)
+        assert shedder.db_ms(now=3.0) == pytest.approx(50)
+
+
+class TestAdmissionMiddleware:
+    @pytest.mark.asyncio
+    async def test_poll_rate_limited_per_agent(self, test_db):
+        # given: one poll per agent per burst, and a key for each of two agents
+        limiters = {"poll": RateLimiter(rate=0.1, burst=1)}
+        async with admission_client(limiters=limiters) as client:
+            keys = [
+                (await client.post("/api/agent-keys", json={"agent_id": agent_id})).json()["key"]
+                for agent_id in ("agent-1", "agent-2")
+            ]
+
+            # when: one agent polls twice and another once
+            first = await client.get("/api/agent/poll", headers={"X-API-Key": keys[0]})
+            second = await client.get("/api/agent/poll", headers={"X-API-Key": keys[0]})
+            other = await client.get("/api/agent/poll", headers={"X-API-Key": keys[1]})
+            # writes are a separate group
+            created = await client.post(
+                "/api/ideas", json={"content": "Test idea"}, headers={"X-API-Key": keys[0]}
+            )
+
+        # then: only the repeat poll is refused, with a retry hint
+        assert first.status_code == 200
+        assert second.status_code == 429
+        assert second.headers["Retry-After"] == "10"
+        assert other.status_code == 200
+        assert created.status_code == 201
+
+    @pytest.mark.asyncio
+    async def test_agent_header_does_not_reset_limit(self, test_db):
+        # given: one poll per client per burst
+        limiters = {"poll": RateLimiter(rate=0.1, burst=1)}
+        async with admission_client(limiters=limiters) as client:
+            # when: the same client polls again under a new X-Agent-ID
+            first = await client.get("/api/agent/poll", headers={"X-Agent-ID": "agent-1"})
+            rotated = await client.get("/api/agent/poll", headers={"X-Agent-ID": "agent-2"})
+
+        # then: it still shares one bucket
+        assert first.status_code == 200
+        assert rotated.status_code == 429
+
+    @pytest.mark.asyncio
+    async def test_sheds_when_database_slow(self, test_db):
+        # given: a shedder that has measured slow database time
+        shedder = LoadShedder(max_db_ms=100, half_life=60)
+        shedder.record(1.0)
+        async with admission_client(shedder=shedder, retry_after=2) as client:
+            # when: API and non-API requests arrive
+            shed = await client.get("/api/ideas")
+            health = await client.get("/health")
+
+        # then: API requests get 503 with Retry-After; the rest pass
+        assert shed.status_code == 503
+        assert shed.headers["Retry-After"] == "2"
+        assert health.status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_in_flight_released_and_db_time_recorded(self, test_db):
+        shedder = LoadShedder(max_in_flight=1, max_db_ms=10_000)
+        async with admission_client(shedder=shedder) as client:
+            # sequential requests never overlap, so none is shed
+            for _ in range(3):
+                response = await client.post("/api/ideas", json={"content": "Test idea"})
+                assert response.status_code == 201
+        assert shedder.in_flight == 0
+        assert shedder.db_ms() > 0
+
+    @pytest.mark.asyncio
+    async def test_parked_long_polls_do_not_hold_slots(self, test_db):
+        # given: room for two requests in flight and a draft idea
+        shedder = LoadShedder(max_in_flight=2)
+        async with admission_client(shedder=shedder) as client:
+            created = await client.post("/api/ideas", json={"content": "Test idea"})
+            idea_id = created.json()["id"]
+
+            # when: more long-polls than slots park waiting for work
+            polls = [
+                asyncio.create_task(client.get("/api/agent/poll", params={"wait": 5}))
+                for _ in range(3)
+            ]
+            await asyncio.sleep(0.1)
+            listed = await client.get("/api/ideas")
+            executed = await client.post(f"/api/ideas/{idea_id}/execute")
+            woken = await asyncio.gather(*polls)
+
+        # then: other requests still get through, and the polls get the work
+        assert listed.status_code == 200
+        assert executed.status_code == 200
+        assert [len(response.json()) for response in woken] == [1, 1, 1]
+        assert shedder.in_flight == 0
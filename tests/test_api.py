@@ -1,5 +1,10 @@
+import asyncio
+import time
+
 import pytest
 
+from ideas.config import settings
+
 
 class TestIdeasAPI:
     @pytest.mark.asyncio
@@ -17,6 +22,21 @@ class TestIdeasAPI:
         assert result["status"] == "draft"
         assert result["id"] is not None
 
+    @pytest.mark.asyncio
+    async def test_create_idea_with_tags(self, client):
+        # when: creating an idea with repeated, mixed-case tags
+        response = await client.post(
+            "/api/ideas", json={"content": "Tagged idea", "tags": ["Python", "gpu", "python"]}
+        )
+        
+        # then: tags are normalised, deduplicated and returned sorted
+        assert response.status_code == 201
+        assert response.json()["tags"] == ["gpu", "python"]
+        idea = (await client.get(f"/api/ideas/{response.json()['id']}")).json()
+        assert idea["tags"] == ["gpu", "python"]
+        bad = await client.post("/api/ideas", json={"content": "Bad", "tags": ["a,b"]})
+        assert bad.status_code == 422
+
     @pytest.mark.asyncio
     async def test_list_ideas(self, client):
         # given: multiple ideas exist
@@ -31,6 +51,39 @@ class TestIdeasAPI:
         ideas = response.json()
         assert len(ideas) == 2
 
+    @pytest.mark.asyncio
+    async def test_list_ideas_paginates_with_cursor(self, client):
+        # given: five ideas, two of them pending
+        ids = []
+        for n in range(5):
+            create_response = await client.post("/api/ideas", json={"content": f"Idea {n}"})
+            ids.append(create_response.json()["id"])
+        
+        # when: paging through with a limit of two
+        pages = []
+        cursor = None
+        while True:
+            params = {"limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+            response = await client.get("/api/ideas", params=params)
+            assert response.status_code == 200
+            pages.append([idea["id"] for idea in response.json()])
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+        
+        # then: every idea is returned once, newest first
+        assert pages == [ids[4:2:-1], ids[2:0:-1], ids[0:1]]
+
+    @pytest.mark.asyncio
+    async def test_list_ideas_rejects_invalid_cursor(self, client):
+        # when: listing with a malformed cursor
+        response = await client.get("/api/ideas", params={"cursor": "not-a-cursor"})
+        
+        # then: bad request
+        assert response.status_code == 400
+
     @pytest.mark.asyncio
     async def test_get_idea_with_messages(self, client):
         # given: an idea exists
@@ -107,6 +160,123 @@ class TestIdeasAPI:
         assert result["content"] == "User instruction"
         assert result["type"] == "user_input"
 
+    @pytest.mark.asyncio
+    async def test_get_messages_after_id(self, client):
+        # given: a thread the client has already read
+        create_response = await client.post("/api/ideas", json={"content": "Test idea"})
+        idea_id = create_response.json()["id"]
+        seen = (await client.get(f"/api/ideas/{idea_id}/messages")).json()
+        
+        # when: new messages arrive and the client asks for the delta
+        await client.post(f"/api/ideas/{idea_id}/messages", json={"content": "First"})
+        await client.post(f"/api/ideas/{idea_id}/messages", json={"content": "Second"})
+        response = await client.get(
+            f"/api/ideas/{idea_id}/messages", params={"after_id": seen[-1]["id"]}
+        )
+        
+        # then: only the new messages, oldest first
+        assert [m["content"] for m in response.json()] == ["First", "Second"]
+
+    @pytest.mark.asyncio
+    async def test_get_messages_filters_and_pages(self, client):
+        # given: a thread mixing system events and user input
+        create_response = await client.post("/api/ideas", json={"content": "Test idea"})
+        idea_id = create_response.json()["id"]
+        await client.post(f"/api/ideas/{idea_id}/execute")
+        for n in range(3):
+            await client.post(f"/api/ideas/{idea_id}/messages", json={"content": f"Note {n}"})
+        
+        # when: paging through user input only, two at a time
+        first = await client.get(
+            f"/api/ideas/{idea_id}/messages", params={"types": "user_input", "limit": 2}
+        )
+        second = await client.get(
+            f"/api/ideas/{idea_id}/messages",
+            params={"types": "user_input", "limit": 2, "after_id": first.headers["X-Next-After-Id"]}
+        )
+        
+        # then: the filtered thread is split across both pages
+        assert [m["content"] for m in first.json()] == ["Note 0", "Note 1"]
+        assert [m["content"] for m in second.json()] == ["Note 2"]
+        assert "X-Next-After-Id" not in second.headers
+
+    @pytest.mark.asyncio
+    async def test_get_idea_not_modified(self, client):
+        # given: an idea fetched once
+        create_response = await client.post("/api/ideas", json={"content": "Test idea"})
+        idea_id = create_response.json()["id"]
+        first = await client.get(f"/api/ideas/{idea_id}")
+        etag = first.headers["ETag"]
+        
+        # when: GET again with If-None-Match
+        response = await client.get(f"/api/ideas/{idea_id}", headers={"If-None-Match": etag})
+        
+        # then: 304 without a body
+        assert response.status_code == 304
+        assert response.headers["ETag"] == etag
+        assert response.content == b""
+
+    @pytest.mark.asyncio
+    async def test_etag_changes_with_thread(self, client):
+        # given: cached ETags for an idea and its messages
+        create_response = await client.post("/api/ideas", json={"content": "Test idea"})
+        idea_id = create_response.json()["id"]
+        idea_etag = (await client.get(f"/api/ideas/{idea_id}")).headers["ETag"]
+        messages_etag = (await client.get(f"/api/ideas/{idea_id}/messages")).headers["ETag"]
+        assert idea_etag != messages_etag
+        
+        # when: a message is added, then both are revalidated
+        await client.post(f"/api/ideas/{idea_id}/messages", json={"content": "More detail"})
+        idea_response = await client.get(
+            f"/api/ideas/{idea_id}", headers={"If-None-Match": idea_etag}
+        )
+        messages_response = await client.get(
+            f"/api/ideas/{idea_id}/messages", headers={"If-None-Match": messages_etag}
+        )
+        
+        # then: both return the new thread with a new ETag
+        assert idea_response.status_code == 200
+        assert idea_response.headers["ETag"] != idea_etag
+        assert idea_response.json()["messages"][-1]["content"] == "More detail"
+        assert messages_response.status_code == 200
+        assert messages_response.headers["ETag"] != messages_etag
+        
+        # and: revalidating with the new ETag is a 304
+        response = await client.get(
+            f"/api/ideas/{idea_id}/messages",
+            headers={"If-None-Match": messages_response.headers["ETag"]}
+        )
+        assert response.status_code == 304
+
+    @pytest.mark.asyncio
+    async def test_list_ideas_not_modified(self, client):
+        # given: a cached list ETag
+        create_response = await client.post("/api/ideas", json={"content": "Idea 1"})
+        idea_id = create_response.json()["id"]
+        etag = (await client.get("/api/ideas")).headers["ETag"]
+        
+        # when: revalidating before and after a status change
+        unchanged = await client.get("/api/ideas", headers={"If-None-Match": etag})
+        await client.post(f"/api/ideas/{idea_id}/execute")
+        changed = await client.get("/api/ideas", headers={"If-None-Match": etag})
+        
+        # then: 304 first, then the updated list
+        assert unchanged.status_code == 304
+        assert changed.status_code == 200
+        assert changed.json()[0]["status"] == "pending"
+        
+        # and: a different filter never shares the ETag
+        filtered = await client.get("/api/ideas?status_filter=pending", headers={"If-None-Match": etag})
+        assert filtered.status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_get_missing_idea_with_etag(self, client):
+        # when: revalidating an idea that does not exist
+        response = await client.get("/api/ideas/9999", headers={"If-None-Match": "*"})
+        
+        # then: 404 rather than 304
+        assert response.status_code == 404
+
 
 class TestAgentAPI:
     @pytest.mark.asyncio
@@ -125,6 +295,36 @@ class TestAgentAPI:
         assert len(ideas) == 1
         assert ideas[0]["status"] == "pending"
 
+    @pytest.mark.asyncio
+    async def test_long_poll_wakes_on_execute(self, client):
+        # given: a draft idea and an agent long-polling an empty queue
+        create_response = await client.post("/api/ideas", json={"content": "Test idea"})
+        idea_id = create_response.json()["id"]
+        poll = asyncio.create_task(client.get("/api/agent/poll", params={"wait": 10}))
+        await asyncio.sleep(0.1)
+        assert not poll.done()
+        
+        # when: the idea is marked for execution
+        started = time.monotonic()
+        await client.post(f"/api/ideas/{idea_id}/execute")
+        response = await poll
+        
+        # then: the parked poll returns the new work right away
+        assert time.monotonic() - started < 2
+        assert response.status_code == 200
+        assert [idea["id"] for idea in response.json()] == [idea_id]
+
+    @pytest.mark.asyncio
+    async def test_long_poll_times_out_empty(self, client):
+        # given: no pollable ideas
+        
+        # when: agent long-polls with a short wait
+        response = await client.get("/api/agent/poll", params={"wait": 1})
+        
+        # then: an empty list is returned after the timeout
+        assert response.status_code == 200
+        assert response.json() == []
+
     @pytest.mark.asyncio
     async def test_claim_task(self, client):
         # given: a pending idea exists
@@ -143,6 +343,134 @@ class TestAgentAPI:
         result = response.json()
         assert result["new_status"] == "claimed"
 
+    @pytest.mark.asyncio
+    async def test_claim_next_claims_oldest_pending(self, client):
+        # given: two pending ideas and one draft
+        ids = []
+        for content in ["First", "Second", "Draft only"]:
+            create_response = await client.post("/api/ideas", json={"content": content})
+            ids.append(create_response.json()["id"])
+        await client.post(f"/api/ideas/{ids[0]}/execute")
+        await client.post(f"/api/ideas/{ids[1]}/execute")
+        
+        # when: two agents claim the next task
+        first = await client.post("/api/agent/claim-next", json={"agent_id": "agent-001"})
+        second = await client.post("/api/agent/claim-next", json={"agent_id": "agent-002"})
+        
+        # then: each agent gets a different idea, oldest first
+        assert first.status_code == 200
+        assert first.json()["id"] == ids[0]
+        assert first.json()["status"] == "claimed"
+        assert first.json()["agent_id"] == "agent-001"
+        assert second.json()["id"] == ids[1]
+        assert second.json()["agent_id"] == "agent-002"
+
+    @pytest.mark.asyncio
+    async def test_claim_next_without_pending_returns_no_content(self, client):
+        # given: only a draft idea exists
+        await client.post("/api/ideas", json={"content": "Draft only"})
+        
+        # when: agent claims the next task
+        response = await client.post("/api/agent/claim-next", json={"agent_id": "agent-001"})
+        
+        # then: nothing is claimed
+        assert response.status_code == 204
+
+    @pytest.mark.asyncio
+    async def test_urgent_ideas_jump_the_queue(self, client):
+        # given: bulk ideas queued before an urgent one
+        for n in range(3):
+            create_response = await client.post(
+                "/api/ideas", json={"content": f"Bulk {n}", "priority": 4}
+            )
+            await client.post(f"/api/ideas/{create_response.json()['id']}/execute")
+        create_response = await client.post("/api/ideas", json={"content": "Urgent"})
+        urgent_id = create_response.json()["id"]
+        await client.post(f"/api/ideas/{urgent_id}/execute", json={"priority": 0})
+        
+        # when: an agent polls and claims
+        polled = (await client.get("/api/agent/poll")).json()
+        claimed = await client.post("/api/agent/claim-next", json={"agent_id": "agent-001"})
+        
+        # then: the urgent idea comes first
+        assert polled[0]["id"] == urgent_id
+        assert polled[0]["priority"] == 0
+        assert [idea["content"] for idea in polled[1:]] == ["Bulk 0", "Bulk 1", "Bulk 2"]
+        assert claimed.json()["id"] == urgent_id
+
+    @pytest.mark.asyncio
+    async def test_fair_share_cap(self, client, monkeypatch):
+        # given: agents may hold one idea at a time, and three are pending
+        monkeypatch.setattr(settings, "agent_max_active_claims", 1)
+        ids = []
+        for n in range(3):
+            create_response = await client.post("/api/ideas", json={"content": f"Idea {n}"})
+            ids.append(create_response.json()["id"])
+            await client.post(f"/api/ideas/{ids[-1]}/execute")
+        await client.post(f"/api/agent/claim/{ids[0]}", json={"agent_id": "agent-001"})
+        
+        # when: the same agent tries to take more work
+        claim = await client.post(f"/api/agent/claim/{ids[1]}", json={"agent_id": "agent-001"})
+        claim_next = await client.post("/api/agent/claim-next", json={"agent_id": "agent-001"})
+        other_agent = await client.post("/api/agent/claim-next", json={"agent_id": "agent-002"})
+        
+        # then: it is refused until it finishes, while other agents still get work
+        assert claim.status_code == 429
+        assert claim_next.status_code == 429
+        assert other_agent.json()["id"] == ids[1]
+        await client.post(f"/api/agent/start/{ids[0]}", json={"agent_id": "agent-001"})
+        await client.post(f"/api/agent/complete/{ids[0]}", json={"agent_id": "agent-001"})
+        retry = await client.post("/api/agent/claim-next", json={"agent_id": "agent-001"})
+        assert retry.json()["id"] == ids[2]
+
+    @pytest.mark.asyncio
+    async def test_poll_filters_by_capabilities(self, client):
+        # given: an untagged idea, a python idea and a python+gpu idea
+        ids = {}
+        for content, tags in (("Plain", []), ("Script", ["Python"]), ("Train", ["python", "gpu"])):
+            create_response = await client.post("/api/ideas", json={"content": content, "tags": tags})
+            ids[content] = create_response.json()["id"]
+            await client.post(f"/api/ideas/{ids[content]}/execute")
+        
+        # when: agents with different capabilities poll
+        everything = (await client.get("/api/agent/poll")).json()
+        python = (await client.get("/api/agent/poll", params={"capabilities": "python"})).json()
+        both = (await client.get("/api/agent/poll", params={"capabilities": "gpu, python"})).json()
+        none = (await client.get("/api/agent/poll", params={"capabilities": ""})).json()
+        
+        # then: each sees only ideas whose tags it covers; untagged ideas suit everyone
+        assert len(everything) == 3
+        assert everything[2]["tags"] == ["gpu", "python"]
+        assert [idea["content"] for idea in python] == ["Plain", "Script"]
+        assert [idea["content"] for idea in both] == ["Plain", "Script", "Train"]
+        assert [idea["content"] for idea in none] == ["Plain"]
+
+    @pytest.mark.asyncio
+    async def test_claim_next_skips_unmatched_ideas(self, client):
+        # given: a gpu idea queued ahead of a python one
+        gpu = await client.post("/api/ideas", json={"content": "Train", "tags": ["gpu"], "priority": 0})
+        await client.post(f"/api/ideas/{gpu.json()['id']}/execute")
+        script = await client.post("/api/ideas", json={"content": "Script", "tags": ["python"]})
+        await client.post(f"/api/ideas/{script.json()['id']}/execute")
+        
+        # when: a python-only agent claims the next idea
+        response = await client.post(
+            "/api/agent/claim-next",
+            params={"capabilities": "python"},
+            json={"agent_id": "agent-001"}
+        )
+        
+        # then: it gets the python idea, tags included
+        assert response.status_code == 200
+        assert response.json()["id"] == script.json()["id"]
+        assert response.json()["tags"] == ["python"]
+        retry = await client.post(
+            "/api/agent/claim-next",
+            params={"capabilities": "python"},
+            json={"agent_id": "agent-001"}
+        )
+        assert retry.status_code == 204
+
     @pytest.mark.asyncio
     async def test_start_execution(self, client):
         # given: a claimed idea exists
@@ -217,9 +545,46 @@ class TestAgentAPI:
         # when: user replies
         await client.post(f"/api/ideas/{idea_id}/messages", json={"content": "Option A"})
         
-        # then: status changes to waiting_agent
+        # then: status changes to waiting_agent and the question is closed
         idea_response = await client.get(f"/api/ideas/{idea_id}")
         assert idea_response.json()["status"] == "waiting_agent"
+        assert idea_response.json()["open_question"] is None
+        messages = idea_response.json()["messages"]
+        assert [m["type"] for m in messages[-2:]] == ["user_input", "system_event"]
+        assert idea_response.json()["message_count"] == len(messages)
+
+    @pytest.mark.asyncio
+    async def test_message_to_missing_idea(self, client):
+        response = await client.post("/api/ideas/999/messages", json={"content": "Hello"})
+        assert response.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_thread_summary_tracks_question(self, client):
+        # given: an executing idea
+        create_response = await client.post("/api/ideas", json={"content": "Test idea"})
+        idea_id = create_response.json()["id"]
+        await client.post(f"/api/ideas/{idea_id}/execute")
+        await client.post(f"/api/agent/claim/{idea_id}", json={"agent_id": "agent-001"})
+        await client.post(f"/api/agent/start/{idea_id}", json={"agent_id": "agent-001"})
+        
+        # when: the agent asks a question
+        await client.post(f"/api/agent/ask/{idea_id}", json={"agent_id": "agent-001", "question": "Which option?"})
+        waiting = (await client.get("/api/ideas")).json()[0]
+        
+        # then: the list shows the open question and thread summary
+        messages = (await client.get(f"/api/ideas/{idea_id}/messages")).json()
+        assert waiting["open_question"] == "Which option?"
+        assert waiting["message_count"] == len(messages)
+        assert waiting["last_message_type"] == "system_event"
+        assert waiting["last_message_at"] == messages[-1]["created_at"]
+        
+        # when: the user replies
+        await client.post(f"/api/ideas/{idea_id}/messages", json={"content": "Option A"})
+        replied = (await client.get("/api/ideas")).json()[0]
+        
+        # then: the question is closed and the count follows the thread
+        assert replied["open_question"] is None
+        assert replied["message_count"] == len(messages) + 2
 
     @pytest.mark.asyncio
     async def test_complete_task(self, client):
@@ -278,6 +643,74 @@ class TestAgentAPI:
         assert response.status_code == 403
 
 
+class TestAgentBatchAPI:
+    @pytest.mark.asyncio
+    async def test_batch_applies_operations_in_order(self, client):
+        # given: two pending ideas
+        ids = []
+        for content in ["First", "Second"]:
+            create_response = await client.post("/api/ideas", json={"content": content})
+            ids.append(create_response.json()["id"])
+            await client.post(f"/api/ideas/{ids[-1]}/execute")
+        
+        # when: an agent claims, starts and reports on both in one request
+        response = await client.post("/api/agent/batch", json={
+            "agent_id": "agent-001",
+            "operations": [
+                {"op": "claim", "idea_id": ids[0]},
+                {"op": "claim", "idea_id": ids[1]},
+                {"op": "start", "idea_id": ids[0]},
+                {"op": "start", "idea_id": ids[1]},
+                {"op": "feedback", "idea_id": ids[0], "content": "Halfway"},
+                {"op": "complete", "idea_id": ids[1], "summary": "Done"},
+            ]
+        })
+        
+        # then: every operation succeeds with its own status change
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert all(r["ok"] for r in results)
+        assert [r["result"]["new_status"] for r in results] == [
+            "claimed", "claimed", "executing", "executing", "executing", "completed"
+        ]
+        first = (await client.get(f"/api/ideas/{ids[0]}")).json()
+        assert first["status"] == "executing"
+        assert any(m["content"] == "Halfway" for m in first["messages"])
+        second = (await client.get(f"/api/ideas/{ids[1]}")).json()
+        assert second["status"] == "completed"
+
+    @pytest.mark.asyncio
+    async def test_batch_reports_partial_failures(self, client):
+        # given: one executing idea owned by agent-001 and one draft idea
+        create_response = await client.post("/api/ideas", json={"content": "Owned"})
+        owned_id = create_response.json()["id"]
+        await client.post(f"/api/ideas/{owned_id}/execute")
+        await client.post(f"/api/agent/claim/{owned_id}", json={"agent_id": "agent-001"})
+        await client.post(f"/api/agent/start/{owned_id}", json={"agent_id": "agent-001"})
+        create_response = await client.post("/api/ideas", json={"content": "Draft"})
+        draft_id = create_response.json()["id"]
+        
+        # when: another agent sends a batch with mixed operations
+        response = await client.post("/api/agent/batch", json={
+            "agent_id": "agent-002",
+            "operations": [
+                {"op": "feedback", "idea_id": owned_id, "content": "Not mine"},
+                {"op": "claim", "idea_id": draft_id},
+                {"op": "claim", "idea_id": 999},
+                {"op": "fail", "idea_id": owned_id},
+            ]
+        })
+        
+        # then: each failure is reported on its own operation
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert [r["status_code"] for r in results] == [403, 400, 404, 422]
+        assert not any(r["ok"] for r in results)
+        owned = (await client.get(f"/api/ideas/{owned_id}")).json()
+        assert owned["status"] == "executing"
+        assert not any(m["content"] == "Not mine" for m in owned["messages"])
+
+
 class TestFullWorkflow:
     @pytest.mark.asyncio
     async def test_complete_execution_workflow(self, client):
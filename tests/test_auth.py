@@ -0,0 +1,123 @@
+import time
+
+import jwt
+import pytest
+
+from ideas.config import settings
+from ideas.routers import web_auth
+from ideas.routers.web_auth import TokenCache, create_token, verify_token
+
+ADMIN_KEY = "shared-admin-key"
+
+
+@pytest.fixture
+def api_keys_enabled(monkeypatch):
+    monkeypatch.setattr(settings, "api_key_enabled", True)
+    monkeypatch.setattr(settings, "api_key", ADMIN_KEY)
+
+
+async def issue_key(client, agent_id: str) -> dict:
+    response = await client.post(
+        "/api/agent-keys", json={"agent_id": agent_id, "name": "ci"}, headers={"X-API-Key": ADMIN_KEY}
+    )
+    assert response.status_code == 201
+    return response.json()
+
+
+class TestTokenCache:
+    def test_verified_token_skips_decode(self, monkeypatch):
+        # given: a token verified once
+        web_auth.token_cache.clear()
+        token, _ = create_token("admin")
+        assert verify_token(token) == "admin"
+
+        # when: verifying it again with decoding broken
+        def fail(*args, **kwargs):
+            raise AssertionError("decoded again")
+        monkeypatch.setattr(jwt, "decode", fail)
+
+        # then: the cached result is used
+        assert verify_token(token) == "admin"
+
+    def test_expired_entries_are_dropped(self):
+        cache = TokenCache(max_entries=8)
+        cache.put("live", "admin", time.time() + 60)
+        cache.put("stale", "admin", time.time() - 1)
+
+        assert cache.get("live") == "admin"
+        assert cache.get("stale") is None
+
+    def test_bounded_lru(self):
+        # given: a full cache whose oldest entry was just used
+        cache = TokenCache(max_entries=2)
+        expires_at = time.time() + 60
+        cache.put("a", "alice", expires_at)
+        cache.put("b", "bob", expires_at)
+        cache.get("a")
+
+        # when: a third token is cached
+        cache.put("c", "carol", expires_at)
+
+        # then: the least recently used one is evicted
+        assert cache.get("b") is None
+        assert cache.get("a") == "alice"
+        assert cache.get("c") == "carol"
+
+    def test_invalid_token_rejected(self):
+        token = jwt.encode({"sub": "admin", "exp": int(time.time()) + 60}, "wrong-secret-" * 4, algorithm="HS256")
+        assert verify_token(token) is None
+
+
+class TestApiKeys:
+    @pytest.mark.asyncio
+    async def test_shared_key_required(self, client, api_keys_enabled):
+        assert (await client.get("/api/ideas")).status_code == 401
+        assert (await client.get("/api/ideas", headers={"X-API-Key": "nope"})).status_code == 401
+        assert (await client.get("/api/ideas", headers={"X-API-Key": ADMIN_KEY})).status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_agent_key_binds_agent_id(self, client, api_keys_enabled):
+        # given: a pending idea and a key issued to agent-001
+        issued = await issue_key(client, "agent-001")
+        assert issued["key"].startswith(issued["key_prefix"])
+        headers = {"X-API-Key": issued["key"]}
+        create_response = await client.post("/api/ideas", json={"content": "Test idea"}, headers=headers)
+        idea_id = create_response.json()["id"]
+        await client.post(f"/api/ideas/{idea_id}/execute", headers=headers)
+
+        # when: the key is used to claim as another agent, then as itself
+        spoofed = await client.post(
+            f"/api/agent/claim/{idea_id}", json={"agent_id": "agent-002"}, headers=headers
+        )
+        claimed = await client.post(
+            f"/api/agent/claim/{idea_id}", json={"agent_id": "agent-001"}, headers=headers
+        )
+
+        # then: only the bound agent id is accepted
+        assert spoofed.status_code == 403
+        assert claimed.status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_agent_key_cannot_manage_keys(self, client, api_keys_enabled):
+        issued = await issue_key(client, "agent-001")
+        response = await client.post(
+            "/api/agent-keys", json={"agent_id": "agent-002"}, headers={"X-API-Key": issued["key"]}
+        )
+        assert response.status_code == 403
+
+    @pytest.mark.asyncio
+    async def test_revoked_key_rejected(self, client, api_keys_enabled):
+        # given: an issued key that works
+        issued = await issue_key(client, "agent-001")
+        headers = {"X-API-Key": issued["key"]}
+        assert (await client.get("/api/agent/poll", headers=headers)).status_code == 200
+        [listed] = (await client.get("/api/agent-keys", headers={"X-API-Key": ADMIN_KEY})).json()
+        assert "key" not in listed
+
+        # when: it is revoked
+        response = await client.delete(f"/api/agent-keys/{issued['id']}", headers={"X-API-Key": ADMIN_KEY})
+
+        # then: it no longer authenticates
+        assert response.status_code == 204
+        assert (await client.get("/api/agent/poll", headers=headers)).status_code == 401
+        assert (await client.get("/api/agent-keys", headers={"X-API-Key": ADMIN_KEY})).json() == []
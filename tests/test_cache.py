@@ -0,0 +1,166 @@
+import asyncio
+
+import pytest
+
+from ideas.cache import ReadCache, WriteVersion, read_cache
+
+from .conftest import max_queries
+
+
+def counting_loader(value="value", delay: float = 0):
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return value
+
+    return load, calls
+
+
+class TestReadCache:
+    @pytest.mark.asyncio
+    async def test_hit_until_write_version_moves(self):
+        # given: a cache with one loaded entry
+        version = WriteVersion()
+        cache = ReadCache(max_entries=8, version=version)
+        load, calls = counting_loader()
+        await cache.get_or_load("key", load)
+
+        # when: reading it again, then after a write
+        await cache.get_or_load("key", load)
+        version.bump()
+        await cache.get_or_load("key", load)
+
+        # then: only the write forced a reload
+        assert len(calls) == 2
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 2
+
+    @pytest.mark.asyncio
+    async def test_load_racing_a_write_is_stale_on_arrival(self):
+        # given: a load that is still running when a write commits
+        version = WriteVersion()
+        cache = ReadCache(max_entries=8, version=version)
+
+        async def racing_load():
+            version.bump()
+            return "before write"
+
+        await cache.get_or_load("key", racing_load)
+
+        # when: reading again
+        load, calls = counting_loader("after write")
+        value = await cache.get_or_load("key", load)
+
+        # then: the racing result is not served
+        assert value == "after write"
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_share_one_load(self):
+        cache = ReadCache(max_entries=8, version=WriteVersion())
+        load, calls = counting_loader(delay=0.01)
+
+        values = await asyncio.gather(*(cache.get_or_load("key", load) for _ in range(10)))
+
+        assert values == ["value"] * 10
+        assert len(calls) == 1
+        assert cache.stats()["coalesced"] == 9
+
+    @pytest.mark.asyncio
+    async def test_failed_load_reaches_every_waiter_and_is_not_cached(self):
+        # given: a load that fails
+        cache = ReadCache(max_entries=8, version=WriteVersion())
+
+        async def failing_load():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        # when: two requests wait on it
+        results = await asyncio.gather(
+            cache.get_or_load("key", failing_load),
+            cache.get_or_load("key", failing_load),
+            return_exceptions=True,
+        )
+
+        # then: both see the error and the next read loads again
+        assert all(isinstance(result, ValueError) for result in results)
+        load, calls = counting_loader()
+        assert await cache.get_or_load("key", load) == "value"
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_least_recently_used_entry_is_evicted(self):
+        # given: a full two-entry cache where "a" was read most recently
+        cache = ReadCache(max_entries=2, version=WriteVersion())
+        for key in ("a", "b", "a"):
+            await cache.get_or_load(key, counting_loader(key)[0])
+
+        # when: a third key is loaded
+        await cache.get_or_load("c", counting_loader("c")[0])
+
+        # then: "b" made room
+        load, calls = counting_loader("b")
+        await cache.get_or_load("b", load)
+        assert len(calls) == 1
+        assert cache.stats()["evictions"] == 2
+
+    @pytest.mark.asyncio
+    async def test_disabled_cache_always_loads(self):
+        cache = ReadCache(max_entries=0, version=WriteVersion())
+        load, calls = counting_loader()
+        await cache.get_or_load("key", load)
+        await cache.get_or_load("key", load)
+        assert len(calls) == 2
+
+
+class TestCachedEndpoints:
+    @pytest.mark.asyncio
+    async def test_repeated_list_is_served_from_cache(self, client):
+        # given: an idea and a list request that has been answered once
+        await client.post("/api/ideas", json={"content": "Idea 1"})
+        first = await client.get("/api/ideas", params={"status_filter": "draft"})
+        hits = read_cache.hits
+
+        # when: the same list is requested again
+        second = await client.get("/api/ideas", params={"status_filter": "draft"})
+
+        # then: same body and ETag, without another load of either
+        assert second.json() == first.json()
+        assert second.headers["ETag"] == first.headers["ETag"]
+        assert read_cache.hits == hits + 2
+
+    @pytest.mark.asyncio
+    async def test_conditional_list_skips_the_page(self, client):
+        # given: a client holding the list's ETag, and nothing cached
+        await client.post("/api/ideas", json={"content": "Idea 1"})
+        etag = (await client.get("/api/ideas")).headers["ETag"]
+        read_cache.clear()
+
+        # when: revalidating on a cache miss
+        with max_queries(1):
+            response = await client.get("/api/ideas", headers={"If-None-Match": etag})
+
+        # then: only the version aggregate ran
+        assert response.status_code == 304
+
+    @pytest.mark.asyncio
+    async def test_writes_invalidate_cached_reads(self, client):
+        # given: a cached, empty poll
+        assert (await client.get("/api/agent/poll")).json() == []
+
+        # when: an idea is marked for execution
+        create_response = await client.post("/api/ideas", json={"content": "New work"})
+        await client.post(f"/api/ideas/{create_response.json()['id']}/execute")
+
+        # then: the next poll sees it
+        polled = (await client.get("/api/agent/poll")).json()
+        assert [idea["content"] for idea in polled] == ["New work"]
+
+    @pytest.mark.asyncio
+    async def test_stats_endpoint(self, client):
+        await client.get("/api/agent/poll")
+        response = await client.get("/api/cache")
+        assert response.status_code == 200
+        assert {"hits", "misses", "coalesced", "evictions", "hit_ratio"} <= response.json().keys()
@@ -0,0 +1,145 @@
+import logging
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from ideas.config import settings
+from ideas.database import configure_sqlite, track_queries
+from ideas.main import app
+from ideas.metrics import QueryHeadersMiddleware
+
+from .conftest import TEST_DATABASE_URL, max_queries
+
+
+class TestSqliteProfile:
+    @pytest.mark.asyncio
+    async def test_pragmas_applied_on_connect(self, db_session):
+        # given: a session from an engine configured with the SQLite profile
+        
+        # when: reading the connection pragmas
+        journal_mode = (await db_session.execute(text("PRAGMA journal_mode"))).scalar()
+        synchronous = (await db_session.execute(text("PRAGMA synchronous"))).scalar()
+        busy_timeout = (await db_session.execute(text("PRAGMA busy_timeout"))).scalar()
+        
+        # then: they match the settings
+        assert journal_mode == settings.sqlite_journal_mode.lower()
+        assert synchronous == 1  # NORMAL
+        assert busy_timeout == settings.sqlite_busy_timeout_ms
+
+    @pytest.mark.asyncio
+    async def test_read_only_engine_rejects_writes(self, test_db):
+        # given: a read-only engine on the same database
+        read_engine = create_async_engine(TEST_DATABASE_URL)
+        configure_sqlite(read_engine, read_only=True)
+        
+        try:
+            async with read_engine.connect() as conn:
+                # when/then: reads work but writes are refused
+                await conn.execute(text("SELECT count(*) FROM ideas"))
+                with pytest.raises(OperationalError):
+                    await conn.execute(text("INSERT INTO ideas (content, status, created_at, updated_at) VALUES ('x', 'DRAFT', '2026-01-01', '2026-01-01')"))
+        finally:
+            await read_engine.dispose()
+
+
+class TestQueryProfiling:
+    @pytest.mark.asyncio
+    async def test_trackers_nest(self, db_session):
+        # given: a tracker inside another
+        with track_queries() as outer:
+            await db_session.execute(text("SELECT 1"))
+            with track_queries() as inner:
+                await db_session.execute(text("SELECT 2"))
+        
+        # then: the inner statement counts towards both
+        assert inner.count == 1
+        assert outer.count == 2
+        assert outer.statements == ["SELECT 1", "SELECT 2"]
+        assert outer.seconds >= inner.seconds > 0
+
+    @pytest.mark.asyncio
+    async def test_debug_headers(self, test_db):
+        # given: the app wrapped in the debug query-headers middleware
+        transport = ASGITransport(app=QueryHeadersMiddleware(app))
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            # when: creating an idea
+            response = await client.post("/api/ideas", json={"content": "Test idea"})
+        
+        # then: the response reports its statements and their time
+        assert int(response.headers["X-DB-Queries"]) >= 1
+        assert float(response.headers["X-DB-Time"]) > 0
+
+    @pytest.mark.asyncio
+    async def test_slow_query_logged_with_plan(self, db_session, monkeypatch, caplog):
+        # given: every statement counts as slow
+        monkeypatch.setattr(settings, "slow_query_ms", 1e-9)
+        
+        # when: running a parameterised query
+        with caplog.at_level(logging.WARNING, logger="ideas.slow_query"):
+            await db_session.execute(text("SELECT id FROM ideas WHERE id = :id"), {"id": 42})
+        
+        # then: the log carries the statement, its parameters and its plan
+        [record] = caplog.records
+        message = record.getMessage()
+        assert "SELECT id FROM ideas WHERE id = ?" in message
+        assert "Parameters: (42,)" in message
+        assert "SEARCH ideas USING INTEGER PRIMARY KEY" in message
+
+
+class TestQueryBudgets:
+    """Statement counts per endpoint; raise a budget only for a deliberate change."""
+
+    @pytest.mark.asyncio
+    async def test_idea_endpoints(self, client):
+        # given: a handful of tagged ideas
+        with max_queries(3):
+            response = await client.post("/api/ideas", json={"content": "Test idea", "tags": ["python"]})
+        idea_id = response.json()["id"]
+        for n in range(5):
+            await client.post("/api/ideas", json={"content": f"Idea {n}", "tags": ["gpu"]})
+        
+        # when/then: reads stay flat however many ideas there are
+        with max_queries(3):
+            await client.get("/api/ideas")
+        with max_queries(4):
+            await client.get(f"/api/ideas/{idea_id}")
+        with max_queries(2):
+            await client.get(f"/api/ideas/{idea_id}/messages")
+        with max_queries(4):
+            await client.put(f"/api/ideas/{idea_id}", json={"content": "Updated"})
+        with max_queries(3):
+            await client.post(f"/api/ideas/{idea_id}/messages", json={"content": "More"})
+        with max_queries(2):
+            await client.post(f"/api/ideas/{idea_id}/execute")
+
+    @pytest.mark.asyncio
+    async def test_agent_lifecycle(self, client):
+        # given: pending ideas
+        for n in range(3):
+            response = await client.post("/api/ideas", json={"content": f"Idea {n}", "tags": ["python"]})
+            await client.post(f"/api/ideas/{response.json()['id']}/execute")
+        body = {"agent_id": "agent-1"}
+        
+        # when/then: each lifecycle step is one compare-and-set plus its messages
+        with max_queries(2):
+            await client.get("/api/agent/poll")
+        with max_queries(2):
+            await client.post(f"/api/agent/claim/{response.json()['id']}", json=body)
+        with max_queries(2):
+            await client.post(f"/api/agent/start/{response.json()['id']}", json=body)
+        with max_queries(2):
+            await client.post(f"/api/agent/feedback/{response.json()['id']}", json={**body, "content": "Step"})
+        with max_queries(3):
+            await client.post(f"/api/agent/ask/{response.json()['id']}", json={**body, "question": "Which?"})
+        with max_queries(3):
+            await client.post(f"/api/ideas/{response.json()['id']}/messages", json={"content": "This one"})
+        with max_queries(2):
+            await client.post(f"/api/agent/start/{response.json()['id']}", json=body)
+        with max_queries(3):
+            await client.post(f"/api/agent/complete/{response.json()['id']}", json={**body, "summary": "Done"})
+        with max_queries(3):
+            claimed = await client.post("/api/agent/claim-next", json=body)
+        assert claimed.json()["tags"] == ["python"]
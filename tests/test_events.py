@@ -0,0 +1,128 @@
+import asyncio
+
+import pytest
+
+from ideas.events import EventBroker, broker, sse_stream
+
+
+class FakeRequest:
+    """Minimal stand-in for a Starlette request that disconnects on demand."""
+
+    def __init__(self):
+        self.disconnected = False
+
+    async def is_disconnected(self):
+        return self.disconnected
+
+
+async def collect_frames(stream, count):
+    frames = []
+    async for frame in stream:
+        frames.append(frame)
+        if len(frames) == count:
+            break
+    await stream.aclose()
+    return frames
+
+
+class TestEventBroker:
+    def test_since_returns_missed_events(self):
+        # given: a broker with three published events
+        event_broker = EventBroker()
+        for idea_id in (1, 2, 3):
+            event_broker.publish("message", idea_id, {"idea_id": idea_id})
+        
+        # when: a client resumes after the first event
+        missed = event_broker.since(1)
+        
+        # then: only the later events are replayed
+        assert [event.id for event in missed] == [2, 3]
+        assert event_broker.since(3) == []
+
+    def test_since_unknown_id_requires_reset(self):
+        # given: a broker whose history only holds the last two events
+        event_broker = EventBroker(history_size=2)
+        for idea_id in (1, 2, 3, 4):
+            event_broker.publish("message", idea_id, {})
+        
+        # when/then: ids that fell out of the buffer or are from the future cannot resume
+        assert event_broker.since(1) is None
+        assert event_broker.since(99) is None
+        assert [event.id for event in event_broker.since(2)] == [3, 4]
+
+    def test_slow_subscriber_is_dropped(self):
+        # given: a subscriber with a tiny queue
+        event_broker = EventBroker(queue_size=1)
+        subscription = event_broker.subscribe()
+        
+        # when: more events are published than it can hold
+        event_broker.publish("message", 1, {})
+        event_broker.publish("message", 1, {})
+        
+        # then: it is marked overflowed and unsubscribed
+        assert subscription.overflowed
+        event_broker.publish("message", 1, {})
+        assert subscription.queue.qsize() == 1
+
+
+class TestEventStream:
+    @pytest.mark.asyncio
+    async def test_api_changes_are_published(self, client):
+        # given: a subscriber on the global broker
+        subscription = broker.subscribe()
+        try:
+            # when: an idea is created and executed
+            create_response = await client.post("/api/ideas", json={"content": "Test idea"})
+            idea_id = create_response.json()["id"]
+            await client.post(f"/api/ideas/{idea_id}/execute")
+            
+            # then: status transitions and thread messages are pushed
+            events = []
+            while not subscription.queue.empty():
+                events.append(subscription.queue.get_nowait())
+            statuses = [e.data["new_status"] for e in events if e.event == "status"]
+            messages = [e.data["content"] for e in events if e.event == "message"]
+            assert statuses == ["draft", "pending"]
+            assert messages == ["Idea created", "Execution requested: draft -> pending"]
+            assert all(e.idea_id == idea_id for e in events)
+        finally:
+            broker.unsubscribe(subscription)
+
+    @pytest.mark.asyncio
+    async def test_stream_resumes_from_last_event_id(self):
+        # given: events published before the client reconnects
+        first = broker.publish("message", 1, {"n": 1})
+        broker.publish("message", 2, {"n": 2})
+        broker.publish("message", 1, {"n": 3})
+        
+        # when: the client reconnects to idea 1 with Last-Event-ID
+        stream = sse_stream(FakeRequest(), idea_id=1, last_event_id=first.id, keepalive=0.05)
+        frames = await collect_frames(stream, 2)
+        
+        # then: only the missed events for that idea are replayed
+        assert frames[0].startswith("retry:")
+        assert '"n": 3' in frames[1]
+
+    @pytest.mark.asyncio
+    async def test_stream_delivers_live_events(self):
+        # given: a connected client
+        stream = sse_stream(FakeRequest(), keepalive=5)
+        assert (await stream.__anext__()).startswith("retry:")
+        
+        # when: an event is published after connecting
+        next_frame = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0)
+        published = broker.publish("status", 7, {"id": 7})
+        frame = await next_frame
+        await stream.aclose()
+        
+        # then: it is delivered with its id
+        assert frame.startswith(f"id: {published.id}\nevent: status\n")
+
+    @pytest.mark.asyncio
+    async def test_stream_unknown_idea_returns_404(self, client):
+        # when: streaming an idea that does not exist
+        response = await client.get("/api/ideas/999/stream")
+        
+        # then: not found
+        assert response.status_code == 404
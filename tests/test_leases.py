@@ -0,0 +1,111 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select
+
+from ideas.models import Idea, utc_now
+from ideas.reaper import reap_expired_leases
+from .conftest import TestSessionLocal
+
+
+async def claimed_idea(client, agent_id: str = "agent-001") -> int:
+    create_response = await client.post("/api/ideas", json={"content": "Test idea"})
+    idea_id = create_response.json()["id"]
+    await client.post(f"/api/ideas/{idea_id}/execute")
+    await client.post(f"/api/agent/claim/{idea_id}", json={"agent_id": agent_id})
+    return idea_id
+
+
+class TestLeases:
+    @pytest.mark.asyncio
+    async def test_claim_grants_lease(self, client):
+        # when: an agent claims an idea
+        idea_id = await claimed_idea(client)
+
+        # then: the idea carries a lease in the future
+        idea = (await client.get(f"/api/ideas/{idea_id}")).json()
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        assert datetime.fromisoformat(idea["lease_expires_at"]) > now
+
+    @pytest.mark.asyncio
+    async def test_heartbeat_extends_lease(self, client):
+        # given: a claimed idea
+        idea_id = await claimed_idea(client)
+        before = (await client.get(f"/api/ideas/{idea_id}")).json()["lease_expires_at"]
+
+        # when: the agent heartbeats
+        response = await client.post(f"/api/agent/heartbeat/{idea_id}", json={"agent_id": "agent-001"})
+
+        # then: the lease moves forward
+        assert response.status_code == 200
+        assert response.json()["status"] == "claimed"
+        assert response.json()["lease_expires_at"] > before
+
+    @pytest.mark.asyncio
+    async def test_heartbeat_rejects_other_agent(self, client):
+        idea_id = await claimed_idea(client)
+        response = await client.post(f"/api/agent/heartbeat/{idea_id}", json={"agent_id": "agent-002"})
+        assert response.status_code == 403
+
+    @pytest.mark.asyncio
+    async def test_heartbeat_rejects_unleased_idea(self, client):
+        create_response = await client.post("/api/ideas", json={"content": "Test idea"})
+        idea_id = create_response.json()["id"]
+        response = await client.post(f"/api/agent/heartbeat/{idea_id}", json={"agent_id": "agent-001"})
+        assert response.status_code == 400
+
+    @pytest.mark.asyncio
+    async def test_finishing_releases_lease(self, client):
+        # given: an executing idea
+        idea_id = await claimed_idea(client)
+        await client.post(f"/api/agent/start/{idea_id}", json={"agent_id": "agent-001"})
+
+        # when: the agent completes it
+        await client.post(f"/api/agent/complete/{idea_id}", json={"agent_id": "agent-001"})
+
+        # then: no lease remains
+        idea = (await client.get(f"/api/ideas/{idea_id}")).json()
+        assert idea["lease_expires_at"] is None
+
+
+class TestReaper:
+    @pytest.mark.asyncio
+    async def test_reaper_requeues_expired_leases(self, client):
+        # given: an executing idea and a freshly claimed one
+        abandoned_id = await claimed_idea(client)
+        await client.post(f"/api/agent/start/{abandoned_id}", json={"agent_id": "agent-001"})
+        healthy_id = await claimed_idea(client, "agent-002")
+        async with TestSessionLocal() as session:
+            abandoned = await session.get(Idea, abandoned_id)
+            abandoned.lease_expires_at = utc_now() - timedelta(seconds=1)
+            await session.commit()
+
+        # when: the reaper runs
+        reaped = await reap_expired_leases(TestSessionLocal)
+
+        # then: only the abandoned idea is back in the queue, unassigned
+        assert reaped == [abandoned_id]
+        idea = (await client.get(f"/api/ideas/{abandoned_id}")).json()
+        assert idea["status"] == "pending"
+        assert idea["agent_id"] is None
+        assert idea["lease_expires_at"] is None
+        assert idea["messages"][-1]["content"] == "Lease expired, returned to queue: executing -> pending"
+        healthy = (await client.get(f"/api/ideas/{healthy_id}")).json()
+        assert healthy["status"] == "claimed"
+
+    @pytest.mark.asyncio
+    async def test_reaper_skips_live_leases(self, client):
+        # given: a claimed idea
+        idea_id = await claimed_idea(client)
+        async with TestSessionLocal() as session:
+            lease = (await session.execute(
+                select(Idea.lease_expires_at).where(Idea.id == idea_id)
+            )).scalar_one()
+
+        # when: the reaper runs just before and just after the expiry
+        before = await reap_expired_leases(TestSessionLocal, now=lease - timedelta(seconds=1))
+        after = await reap_expired_leases(TestSessionLocal, now=lease + timedelta(seconds=1))
+
+        # then: the idea is only requeued once the lease has run out
+        assert before == []
+        assert after == [idea_id]
@@ -0,0 +1,63 @@
+import pytest
+from prometheus_client import REGISTRY
+
+from ideas.metrics import refresh_gauges
+from .conftest import TestSessionLocal
+
+
+def sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+class TestMetricsEndpoint:
+    @pytest.mark.asyncio
+    async def test_exposition_format(self, client):
+        response = await client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert "# TYPE ideas_http_request_duration_seconds histogram" in response.text
+
+    @pytest.mark.asyncio
+    async def test_latency_labelled_by_route_template(self, client):
+        # given: an idea
+        create_response = await client.post("/api/ideas", json={"content": "Test idea"})
+        idea_id = create_response.json()["id"]
+        labels = {"method": "GET", "route": "/api/ideas/{idea_id}"}
+        before_ok = sample("ideas_http_request_duration_seconds_count", **labels, status="200")
+        before_missing = sample("ideas_http_request_duration_seconds_count", **labels, status="404")
+
+        # when: it and a missing idea are fetched
+        await client.get(f"/api/ideas/{idea_id}")
+        await client.get("/api/ideas/999")
+
+        # then: both land on the route template, split by status code
+        assert sample("ideas_http_request_duration_seconds_count", **labels, status="200") == before_ok + 1
+        assert sample("ideas_http_request_duration_seconds_count", **labels, status="404") == before_missing + 1
+        response = await client.get("/metrics")
+        assert f'/api/ideas/{idea_id}"' not in response.text
+
+    @pytest.mark.asyncio
+    async def test_commits_are_timed(self, client):
+        before = sample("ideas_db_commit_seconds_count")
+        await client.post("/api/ideas", json={"content": "Test idea"})
+        assert sample("ideas_db_commit_seconds_count") > before
+
+
+class TestGauges:
+    @pytest.mark.asyncio
+    async def test_refresh_counts_ideas_per_status(self, client):
+        # given: one draft and two pending ideas
+        await client.post("/api/ideas", json={"content": "Draft"})
+        for n in range(2):
+            create_response = await client.post("/api/ideas", json={"content": f"Queued {n}"})
+            await client.post(f"/api/ideas/{create_response.json()['id']}/execute")
+
+        # when: the gauges are refreshed
+        await refresh_gauges(TestSessionLocal)
+
+        # then: counts and queue ages reflect the table
+        assert sample("ideas_ideas", status="draft") == 1
+        assert sample("ideas_ideas", status="pending") == 2
+        assert sample("ideas_ideas", status="completed") == 0
+        assert 0 <= sample("ideas_oldest_waiting_seconds", status="pending") < 60
+        assert sample("ideas_oldest_waiting_seconds", status="waiting_agent") == 0
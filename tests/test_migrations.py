@@ -0,0 +1,191 @@
+import pytest
+from sqlalchemy import func, select, text
+
+from ideas.migrations import MIGRATIONS, add_full_text_search, run_migrations, schema_migrations
+from ideas.models import Idea, IdeaStatus, Message, MessageType, utc_now
+from ideas.routers.agent import capability_filter
+
+
+async def query_plan(session, statement) -> str:
+    compiled = statement.compile(
+        dialect=session.bind.dialect,
+        compile_kwargs={"literal_binds": True},
+    )
+    result = await session.execute(text(f"EXPLAIN QUERY PLAN {compiled}"))
+    return "\n".join(row.detail for row in result)
+
+
+class TestMigrations:
+    @pytest.mark.asyncio
+    async def test_all_migrations_recorded(self, db_session):
+        # given: a database initialised by the test fixture
+        
+        # when: reading the migration log
+        result = await db_session.execute(select(schema_migrations.c.version))
+        
+        # then: every migration is recorded exactly once
+        assert sorted(result.scalars()) == [m.version for m in MIGRATIONS]
+
+    @pytest.mark.asyncio
+    async def test_migrations_apply_to_existing_schema(self, db_session):
+        # given: a database from before the indexes existed
+        await db_session.execute(text("DROP INDEX ix_ideas_status_created_at"))
+        await db_session.execute(schema_migrations.delete())
+        
+        # when: migrations run at startup, twice
+        connection = await db_session.connection()
+        applied = await connection.run_sync(run_migrations)
+        applied_again = await connection.run_sync(run_migrations)
+        
+        # then: the index is restored and nothing is applied twice
+        assert applied == [m.version for m in MIGRATIONS]
+        assert applied_again == []
+        indexes = await db_session.execute(text("PRAGMA index_list('ideas')"))
+        assert "ix_ideas_status_created_at" in {row.name for row in indexes}
+
+    @pytest.mark.asyncio
+    async def test_thread_summary_backfilled(self, db_session):
+        # given: a thread written before the summary columns existed
+        idea = Idea(content="Old idea", status=IdeaStatus.WAITING_USER)
+        db_session.add(idea)
+        await db_session.flush()
+        db_session.add_all([
+            Message(idea_id=idea.id, type=MessageType.AGENT_FEEDBACK, content="[Question] Which one?"),
+            Message(idea_id=idea.id, type=MessageType.SYSTEM_EVENT, content="Agent requested user instruction"),
+        ])
+        await db_session.flush()
+        for column in ("message_count", "last_message_at", "last_message_type", "open_question"):
+            await db_session.execute(text(f"ALTER TABLE ideas DROP COLUMN {column}"))
+        await db_session.execute(schema_migrations.delete().where(schema_migrations.c.version == 3))
+        
+        # when: migrations run
+        connection = await db_session.connection()
+        await connection.run_sync(run_migrations)
+        
+        # then: the summary is rebuilt from the messages
+        row = (await db_session.execute(text(
+            "SELECT message_count, last_message_type, open_question FROM ideas"
+        ))).one()
+        assert tuple(row) == (2, "SYSTEM_EVENT", "Which one?")
+
+    @pytest.mark.asyncio
+    async def test_message_search_index_rebuilt_with_idea_id(self, db_session):
+        # given: a message indexed by the original messages_fts
+        idea = Idea(content="Old idea")
+        db_session.add(idea)
+        await db_session.flush()
+        for trigger in ("insert", "delete", "update"):
+            await db_session.execute(text(f"DROP TRIGGER messages_fts_{trigger}"))
+        await db_session.execute(text("DROP TABLE messages_fts"))
+        connection = await db_session.connection()
+        await connection.run_sync(add_full_text_search)
+        db_session.add(Message(idea_id=idea.id, type=MessageType.USER_INPUT, content="Profiling notes"))
+        await db_session.flush()
+        await db_session.execute(schema_migrations.delete().where(schema_migrations.c.version == 8))
+
+        # when: migrations run
+        await connection.run_sync(run_migrations)
+
+        # then: the message is searchable and carries its idea
+        row = (await db_session.execute(text(
+            "SELECT idea_id FROM messages_fts WHERE messages_fts MATCH 'profiling'"
+        ))).one()
+        assert row.idea_id == idea.id
+
+
+class TestHotPathIndexes:
+    @pytest.mark.asyncio
+    async def test_poll_searches_status_index(self, db_session):
+        statement = (
+            select(Idea)
+            .where(Idea.status.in_([IdeaStatus.PENDING, IdeaStatus.WAITING_AGENT]))
+            .order_by(Idea.priority, Idea.updated_at)
+        )
+        plan = await query_plan(db_session, statement)
+        assert "SEARCH ideas USING INDEX ix_ideas_status_" in plan
+        assert "SCAN ideas" not in plan
+
+    @pytest.mark.asyncio
+    async def test_claim_next_uses_status_priority_index(self, db_session):
+        statement = (
+            select(Idea.id)
+            .where(Idea.status == IdeaStatus.PENDING)
+            .order_by(Idea.priority, Idea.updated_at, Idea.id)
+            .limit(1)
+        )
+        plan = await query_plan(db_session, statement)
+        assert "ix_ideas_status_priority_updated_at" in plan
+        assert "TEMP B-TREE" not in plan
+
+    @pytest.mark.asyncio
+    async def test_filtered_list_uses_status_created_at_index(self, db_session):
+        statement = (
+            select(Idea)
+            .where(Idea.status == IdeaStatus.PENDING)
+            .order_by(Idea.created_at.desc(), Idea.id.desc())
+        )
+        plan = await query_plan(db_session, statement)
+        assert "ix_ideas_status_created_at" in plan
+        assert "TEMP B-TREE" not in plan
+
+    @pytest.mark.asyncio
+    async def test_thread_uses_idea_id_created_at_index(self, db_session):
+        statement = (
+            select(Message)
+            .where(Message.idea_id == 1)
+            .order_by(Message.created_at)
+        )
+        plan = await query_plan(db_session, statement)
+        assert "ix_messages_idea_id_created_at" in plan
+        assert "TEMP B-TREE" not in plan
+
+    @pytest.mark.asyncio
+    async def test_thread_delta_uses_idea_id_id_index(self, db_session):
+        statement = (
+            select(Message)
+            .where(
+                Message.idea_id == 1,
+                Message.id > 100,
+                Message.type.in_([MessageType.USER_INPUT]),
+            )
+            .order_by(Message.id)
+            .limit(50)
+        )
+        plan = await query_plan(db_session, statement)
+        assert "ix_messages_idea_id_id" in plan
+        assert "TEMP B-TREE" not in plan
+
+    @pytest.mark.asyncio
+    async def test_reaper_scans_lease_index(self, db_session):
+        statement = (
+            select(Idea.id)
+            .where(Idea.lease_expires_at < utc_now())
+            .order_by(Idea.lease_expires_at)
+            .limit(100)
+        )
+        plan = await query_plan(db_session, statement)
+        assert "SEARCH ideas USING COVERING INDEX ix_ideas_lease_expires_at" in plan
+
+    @pytest.mark.asyncio
+    async def test_fair_share_count_uses_agent_index(self, db_session):
+        statement = (
+            select(func.count())
+            .select_from(Idea)
+            .where(
+                Idea.agent_id == "agent-001",
+                Idea.status.in_([IdeaStatus.CLAIMED, IdeaStatus.EXECUTING]),
+            )
+        )
+        plan = await query_plan(db_session, statement)
+        assert "COVERING INDEX ix_ideas_agent_id_status" in plan
+
+    @pytest.mark.asyncio
+    async def test_capability_filter_probes_tag_primary_key(self, db_session):
+        statement = (
+            select(Idea.id)
+            .where(Idea.status == IdeaStatus.PENDING, *capability_filter("python,gpu"))
+            .order_by(Idea.priority, Idea.updated_at)
+        )
+        plan = await query_plan(db_session, statement)
+        assert "ix_ideas_status_priority_updated_at" in plan
+        assert "sqlite_autoindex_idea_tags_1" in plan
@@ -0,0 +1,163 @@
+import pytest
+from sqlalchemy import insert
+
+from ideas.models import Idea, IdeaStatus
+from ideas.search import build_match_query
+
+
+async def create_idea(client, content: str) -> int:
+    response = await client.post("/api/ideas", json={"content": content})
+    return response.json()["id"]
+
+
+class TestBuildMatchQuery:
+    def test_terms_are_quoted(self):
+        assert build_match_query('cache "OR" NEAR(x') == '"cache" """OR""" "NEAR(x"'
+
+    def test_short_terms_are_dropped(self):
+        assert build_match_query("db index") == '"index"'
+        assert build_match_query("a b") == ""
+
+
+class TestSearchAPI:
+    @pytest.mark.asyncio
+    async def test_search_idea_content(self, client):
+        # given: two ideas, one about caching
+        cache_id = await create_idea(client, "Add a read-through cache for threads")
+        await create_idea(client, "Rename the settings page")
+
+        # when: searching for a word in the idea
+        response = await client.get("/api/ideas/search", params={"q": "cache"})
+
+        # then: only the matching idea, with a highlighted snippet
+        assert response.status_code == 200
+        results = response.json()
+        assert [result["idea"]["id"] for result in results] == [cache_id]
+        assert results[0]["message_id"] is None
+        assert "**cache**" in results[0]["snippet"]
+
+    @pytest.mark.asyncio
+    async def test_search_messages(self, client):
+        # given: an idea whose thread mentions the term
+        idea_id = await create_idea(client, "Speed up the list view")
+        message = await client.post(
+            f"/api/ideas/{idea_id}/messages",
+            json={"content": "Profiling shows the serializer dominates"}
+        )
+
+        # when: searching for the term
+        response = await client.get("/api/ideas/search", params={"q": "serializer"})
+
+        # then: the idea is found through its message
+        results = response.json()
+        assert [result["idea"]["id"] for result in results] == [idea_id]
+        assert results[0]["message_id"] == message.json()["id"]
+        assert "**serializer**" in results[0]["snippet"]
+
+    @pytest.mark.asyncio
+    async def test_search_cjk_substring(self, client):
+        # given: Chinese content without spaces between words
+        idea_id = await create_idea(client, "给想法列表增加全文搜索功能")
+
+        # when: searching for a word inside the sentence
+        response = await client.get("/api/ideas/search", params={"q": "全文搜索"})
+
+        # then: the substring matches
+        assert [result["idea"]["id"] for result in response.json()] == [idea_id]
+
+    @pytest.mark.asyncio
+    async def test_search_follows_updates(self, client):
+        # given: an idea whose content is edited
+        idea_id = await create_idea(client, "Original wording")
+        await client.put(f"/api/ideas/{idea_id}", json={"content": "Revised wording"})
+
+        # when: searching for the old and new words
+        old = await client.get("/api/ideas/search", params={"q": "Original"})
+        new = await client.get("/api/ideas/search", params={"q": "Revised"})
+
+        # then: the idea's own entry reflects the update; the old wording is
+        # only found through the "Content updated" system event
+        assert [result["message_id"] for result in new.json()] == [None]
+        assert [result["idea"]["id"] for result in new.json()] == [idea_id]
+        assert old.json()[0]["message_id"] is not None
+        assert "Content updated from: **Original**" in old.json()[0]["snippet"]
+
+    @pytest.mark.asyncio
+    async def test_search_requires_all_terms(self, client):
+        # given: ideas sharing one of two terms
+        both_id = await create_idea(client, "Queue writes and batch commits")
+        await create_idea(client, "Queue reads only")
+
+        # when: searching for both terms
+        response = await client.get("/api/ideas/search", params={"q": "queue batch"})
+
+        # then: only the idea containing both matches
+        assert [result["idea"]["id"] for result in response.json()] == [both_id]
+
+    @pytest.mark.asyncio
+    async def test_search_pagination(self, client):
+        # given: five matching ideas
+        for n in range(5):
+            await create_idea(client, f"Benchmark run {n}")
+
+        # when: paging with limit 2
+        seen = []
+        offset = 0
+        while True:
+            response = await client.get(
+                "/api/ideas/search", params={"q": "benchmark", "limit": 2, "offset": offset}
+            )
+            seen.extend(result["idea"]["id"] for result in response.json())
+            if "X-Next-Offset" not in response.headers:
+                break
+            offset = int(response.headers["X-Next-Offset"])
+
+        # then: every idea is returned exactly once
+        assert len(seen) == 5
+        assert len(set(seen)) == 5
+
+    @pytest.mark.asyncio
+    async def test_old_match_ranked_among_many_newer(self, client, db_session):
+        # given: the best match is the oldest of more than a thousand matches
+        best_id = await create_idea(client, "Benchmark benchmark benchmark")
+        await db_session.execute(insert(Idea), [
+            {"content": f"Benchmark run {n} with a much longer description attached", "status": IdeaStatus.DRAFT}
+            for n in range(1200)
+        ])
+        await db_session.commit()
+
+        # when: searching for the common term
+        response = await client.get("/api/ideas/search", params={"q": "benchmark", "limit": 1})
+
+        # then: it still ranks first
+        assert [result["idea"]["id"] for result in response.json()] == [best_id]
+
+    @pytest.mark.asyncio
+    async def test_busy_thread_does_not_crowd_out_other_ideas(self, client):
+        # given: one thread full of strong matches and another with a weak one
+        busy_id = await create_idea(client, "Speed up the list view")
+        for _ in range(5):
+            await client.post(f"/api/ideas/{busy_id}/messages", json={"content": "cache cache"})
+        quiet_id = await create_idea(client, "Speed up the thread view")
+        await client.post(
+            f"/api/ideas/{quiet_id}/messages",
+            json={"content": "Maybe a cache in front of the serializer would help here"}
+        )
+
+        # when: asking for the top two ideas
+        response = await client.get("/api/ideas/search", params={"q": "cache", "limit": 2})
+
+        # then: both threads are ranked, best first
+        assert [result["idea"]["id"] for result in response.json()] == [busy_id, quiet_id]
+
+    @pytest.mark.asyncio
+    async def test_search_ignores_query_syntax(self, client):
+        # given: an idea
+        await create_idea(client, "Some idea")
+
+        # when: the query contains FTS operators and quotes
+        response = await client.get("/api/ideas/search", params={"q": 'idea" OR NEAR('})
+
+        # then: no syntax error, just no match
+        assert response.status_code == 200
+        assert response.json() == []
@@ -0,0 +1,99 @@
+import msgpack
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from ideas import serialization
+from ideas.models import Idea
+from ideas.schemas import IdeaResponse, IdeaWithMessages, MessageResponse
+
+
+async def tagged_thread(client) -> int:
+    create_response = await client.post(
+        "/api/ideas", json={"content": "Serialized idea 中文", "tags": ["python"]}
+    )
+    idea_id = create_response.json()["id"]
+    await client.post(f"/api/ideas/{idea_id}/execute")
+    await client.post(f"/api/agent/claim/{idea_id}", json={"agent_id": "agent-001"})
+    await client.post(f"/api/ideas/{idea_id}/messages", json={"content": "More context"})
+    return idea_id
+
+
+async def load_idea(db_session, idea_id: int) -> Idea:
+    result = await db_session.execute(
+        select(Idea).options(selectinload(Idea.messages)).where(Idea.id == idea_id)
+    )
+    return result.scalar_one()
+
+
+class TestFastPath:
+    @pytest.mark.asyncio
+    async def test_bodies_match_schema_serialization(self, client, db_session):
+        # given: a tagged, claimed idea with a thread
+        idea_id = await tagged_thread(client)
+
+        # when: reading it through the list, detail, messages and poll routes
+        listed = await client.get("/api/ideas")
+        detail = await client.get(f"/api/ideas/{idea_id}")
+        messages = await client.get(f"/api/ideas/{idea_id}/messages")
+
+        # then: the bytes are what the pydantic response models produce
+        idea = await load_idea(db_session, idea_id)
+        expected_idea = IdeaResponse.model_validate(idea).model_dump_json()
+        assert listed.content == f"[{expected_idea}]".encode()
+        assert detail.content == IdeaWithMessages.model_validate(idea).model_dump_json().encode()
+        expected_messages = ",".join(
+            MessageResponse.model_validate(message).model_dump_json() for message in idea.messages
+        )
+        assert messages.content == f"[{expected_messages}]".encode()
+        assert detail.headers["content-type"] == "application/json"
+        assert detail.headers["vary"] == "Accept"
+
+    @pytest.mark.asyncio
+    async def test_headers_survive_fast_path(self, client):
+        # given: three ideas
+        for n in range(3):
+            await client.post("/api/ideas", json={"content": f"Idea {n}"})
+
+        # when: paging
+        response = await client.get("/api/ideas", params={"limit": 2})
+
+        # then: ETag and cursor headers are still set
+        assert len(response.json()) == 2
+        assert response.headers["ETag"]
+        assert response.headers["X-Next-Cursor"]
+
+    @pytest.mark.asyncio
+    async def test_msgpack_refused_with_zero_quality(self, client):
+        await client.post("/api/ideas", json={"content": "Idea"})
+
+        response = await client.get(
+            "/api/ideas", headers={"Accept": "application/msgpack;q=0, application/json"}
+        )
+
+        assert response.headers["content-type"] == "application/json"
+        assert response.json()[0]["content"] == "Idea"
+
+    def test_accept_quality_negotiation(self):
+        assert serialization.wants_msgpack("application/msgpack")
+        assert serialization.wants_msgpack("application/x-msgpack, */*;q=0.1")
+        assert serialization.wants_msgpack("application/json, application/msgpack")
+        assert not serialization.wants_msgpack("application/msgpack;q=0")
+        assert not serialization.wants_msgpack("application/msgpack; q=0.5, application/json")
+        assert not serialization.wants_msgpack("*/*")
+        assert not serialization.wants_msgpack(None)
+
+    @pytest.mark.asyncio
+    async def test_msgpack_negotiation(self, client):
+        # given: a tagged thread
+        idea_id = await tagged_thread(client)
+        as_json = (await client.get(f"/api/ideas/{idea_id}")).json()
+
+        # when: an agent asks for MessagePack
+        response = await client.get(
+            f"/api/ideas/{idea_id}", headers={"Accept": "application/msgpack"}
+        )
+
+        # then: the same document, encoded as MessagePack
+        assert response.headers["content-type"] == "application/msgpack"
+        assert msgpack.unpackb(response.content) == as_json
@@ -0,0 +1,136 @@
+import json
+
+import pytest
+from sqlalchemy import delete, update
+
+from ideas.models import Idea, IdeaTag, Message
+
+from .conftest import test_engine
+
+
+async def build_thread(client) -> int:
+    create_response = await client.post(
+        "/api/ideas", json={"content": "Exported idea", "tags": ["python", "docs"]}
+    )
+    idea_id = create_response.json()["id"]
+    await client.post(f"/api/ideas/{idea_id}/execute")
+    await client.post(f"/api/ideas/{idea_id}/messages", json={"content": "Some context"})
+    return idea_id
+
+
+class TestExport:
+    @pytest.mark.asyncio
+    async def test_export_streams_ideas_then_messages(self, client):
+        # given: two ideas with threads
+        first_id = await build_thread(client)
+        second_id = await build_thread(client)
+        
+        # when: exporting
+        response = await client.get("/api/export")
+        
+        # then: one JSON record per line, ideas before tags before messages
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        types = [next(iter(line)) for line in lines]
+        assert types == ["idea", "idea"] + ["tag"] * 4 + ["message"] * (len(lines) - 6)
+        ideas = [line["idea"] for line in lines[:2]]
+        assert [idea["id"] for idea in ideas] == [first_id, second_id]
+        assert ideas[0]["status"] == "pending"
+        assert lines[2]["tag"] == {"idea_id": first_id, "tag": "docs"}
+        assert {line["message"]["idea_id"] for line in lines[6:]} == {first_id, second_id}
+
+
+class TestImport:
+    @pytest.mark.asyncio
+    async def test_round_trip_preserves_ids_and_timestamps(self, client, db_session):
+        # given: an export of the current data, after which the tables are emptied
+        idea_id = await build_thread(client)
+        before = (await client.get(f"/api/ideas/{idea_id}")).json()
+        export = (await client.get("/api/export")).content
+        await db_session.execute(delete(Message))
+        await db_session.execute(delete(IdeaTag))
+        await db_session.execute(delete(Idea))
+        await db_session.commit()
+        
+        # when: importing the export
+        response = await client.post(
+            "/api/import",
+            content=export,
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+        
+        # then: the idea, its tags and its thread are restored exactly
+        assert response.status_code == 200
+        assert response.json() == {"ideas": 1, "tags": 2, "messages": len(before["messages"])}
+        after = (await client.get(f"/api/ideas/{idea_id}")).json()
+        assert after == before
+
+    @pytest.mark.asyncio
+    async def test_import_conflict_is_rolled_back(self, client):
+        # given: data that already exists
+        await build_thread(client)
+        export = (await client.get("/api/export")).content
+        
+        # when: importing it again
+        response = await client.post("/api/import", content=export)
+        
+        # then: conflict, and nothing was duplicated
+        assert response.status_code == 409
+        assert len((await client.get("/api/ideas")).json()) == 1
+
+    @pytest.mark.asyncio
+    async def test_import_rejects_malformed_lines(self, client):
+        # when: importing a body with an invalid record
+        body = b'{"idea": {"id": 1, "content": "ok", "status": "draft"}}\nnot json\n'
+        response = await client.post("/api/import", content=body)
+        
+        # then: bad request naming the line
+        assert response.status_code == 400
+        assert "line 2" in response.json()["detail"]
+
+    @pytest.mark.asyncio
+    async def test_upload_is_staged_before_the_write_connection_is_taken(self, client):
+        # given: an upload of several insert chunks, sent slowly
+        checked_out = []
+        
+        async def body():
+            for idea_id in range(1, 2501):
+                checked_out.append(test_engine.pool.checkedout())
+                yield json.dumps({"idea": {
+                    "id": idea_id, "content": f"Idea {idea_id}", "status": "draft",
+                    "created_at": "2026-01-01T00:00:00+00:00", "updated_at": "2026-01-01T00:00:00+00:00",
+                }}).encode() + b"\n"
+        
+        # when: importing it
+        response = await client.post("/api/import", content=body())
+        
+        # then: no connection was held while the body was still arriving
+        assert response.status_code == 200
+        assert response.json()["ideas"] == 2500
+        assert set(checked_out) == {0}
+
+    @pytest.mark.asyncio
+    async def test_summaries_recomputed_for_imported_ideas_only(self, client, db_session):
+        # given: an existing idea with a summary the backfill would rewrite
+        existing_id = await build_thread(client)
+        await db_session.execute(update(Idea).where(Idea.id == existing_id).values(message_count=99))
+        await db_session.commit()
+        
+        # when: importing an unrelated idea with a message
+        body = (
+            json.dumps({"idea": {"id": 500, "content": "Imported", "status": "draft",
+                                 "created_at": "2026-01-01T00:00:00+00:00",
+                                 "updated_at": "2026-01-01T00:00:00+00:00"}}) + "\n"
+            + json.dumps({"message": {"id": 500, "idea_id": 500, "type": "system_event",
+                                      "content": "Idea created",
+                                      "created_at": "2026-01-01T00:00:00+00:00"}}) + "\n"
+        )
+        response = await client.post("/api/import", content=body)
+        
+        # then: the imported idea's summary is filled in, the other is untouched
+        assert response.status_code == 200
+        imported = (await client.get("/api/ideas/500")).json()
+        assert imported["message_count"] == 1
+        assert imported["last_message_type"] == "system_event"
+        assert (await client.get(f"/api/ideas/{existing_id}")).json()["message_count"] == 99
@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+
+from ideas.transitions import TRANSITIONS
+
+
+async def executing_idea(client, agent_id: str = "agent-001") -> int:
+    create_response = await client.post("/api/ideas", json={"content": "Test idea"})
+    idea_id = create_response.json()["id"]
+    await client.post(f"/api/ideas/{idea_id}/execute")
+    await client.post(f"/api/agent/claim/{idea_id}", json={"agent_id": agent_id})
+    await client.post(f"/api/agent/start/{idea_id}", json={"agent_id": agent_id})
+    return idea_id
+
+
+class TestTransitionTable:
+    def test_terminal_statuses_have_no_way_out(self):
+        terminal = {"completed", "failed", "cancelled"}
+        for transition in TRANSITIONS.values():
+            assert not terminal & {status.value for status in transition.from_statuses}
+
+    def test_agent_transitions_check_ownership(self):
+        for name in ("start", "feedback", "ask", "complete", "fail"):
+            assert TRANSITIONS[name].requires_agent
+
+
+class TestTransitionRefusals:
+    @pytest.mark.asyncio
+    async def test_missing_idea(self, client):
+        response = await client.post("/api/agent/start/999", json={"agent_id": "agent-001"})
+        assert response.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_wrong_status_reported_before_ownership(self, client):
+        # given: an executing idea owned by agent-001
+        idea_id = await executing_idea(client)
+
+        # when: another agent tries to start it again
+        response = await client.post(f"/api/agent/start/{idea_id}", json={"agent_id": "agent-002"})
+
+        # then: the status is what's wrong
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Cannot start execution for idea in executing status"
+
+    @pytest.mark.asyncio
+    async def test_wrong_agent(self, client):
+        idea_id = await executing_idea(client)
+        response = await client.post(
+            f"/api/agent/feedback/{idea_id}",
+            json={"agent_id": "agent-002", "content": "Not mine"}
+        )
+        assert response.status_code == 403
+
+
+class TestConcurrentTransitions:
+    @pytest.mark.asyncio
+    async def test_parallel_claims_have_one_winner(self, client):
+        # given: one pending idea
+        create_response = await client.post("/api/ideas", json={"content": "Contested idea"})
+        idea_id = create_response.json()["id"]
+        await client.post(f"/api/ideas/{idea_id}/execute")
+
+        # when: ten agents claim it at once
+        responses = await asyncio.gather(*(
+            client.post(f"/api/agent/claim/{idea_id}", json={"agent_id": f"agent-{n}"})
+            for n in range(10)
+        ))
+
+        # then: exactly one claim wins and the idea belongs to that agent
+        winners = [n for n, response in enumerate(responses) if response.status_code == 200]
+        assert len(winners) == 1
+        assert sorted(response.status_code for response in responses) == [200] + [400] * 9
+        idea = (await client.get(f"/api/ideas/{idea_id}")).json()
+        assert idea["agent_id"] == f"agent-{winners[0]}"
+        claims = [m for m in idea["messages"] if m["content"].startswith("Claimed by agent")]
+        assert len(claims) == 1
+
+    @pytest.mark.asyncio
+    async def test_parallel_conflicting_transitions(self, client):
+        # given: an executing idea
+        idea_id = await executing_idea(client)
+
+        # when: transitions that each leave executing race each other
+        agent = {"agent_id": "agent-001"}
+        responses = await asyncio.gather(
+            client.post(f"/api/agent/complete/{idea_id}", json=agent),
+            client.post(f"/api/agent/complete/{idea_id}", json=agent),
+            client.post(f"/api/agent/fail/{idea_id}", json={**agent, "reason": "Gave up"}),
+            client.post(f"/api/agent/ask/{idea_id}", json={**agent, "question": "Continue?"}),
+        )
+
+        # then: one transition wins, and the thread summary matches the thread
+        winners = [response.json() for response in responses if response.status_code == 200]
+        assert len(winners) == 1
+        assert all(response.status_code == 400 for response in responses if response.status_code != 200)
+        idea = (await client.get(f"/api/ideas/{idea_id}")).json()
+        assert idea["status"] == winners[0]["new_status"]
+        assert idea["message_count"] == len(idea["messages"])
@@ -0,0 +1,179 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+from sqlalchemy import func, select
+
+from ideas import writer
+from ideas.events import broker
+from ideas.models import Idea, Message, MessageType
+from ideas.writer import WriteQueue
+
+from .conftest import TestSessionLocal
+
+
+@pytest_asyncio.fixture
+async def write_queue(test_db):
+    queue = WriteQueue(TestSessionLocal, max_batch=50, max_delay_ms=20)
+    await queue.start()
+    yield queue
+    await queue.stop()
+
+
+async def create_idea(db_session) -> int:
+    idea = Idea(content="Test idea")
+    db_session.add(idea)
+    await db_session.commit()
+    return idea.id
+
+
+def add_feedback(idea_id: int, content: str):
+    async def work(session):
+        message = Message(idea_id=idea_id, type=MessageType.AGENT_FEEDBACK, content=content)
+        session.add(message)
+        return message
+    return work
+
+
+async def count_messages(db_session, idea_id: int) -> int:
+    result = await db_session.execute(
+        select(func.count()).select_from(Message).where(Message.idea_id == idea_id)
+    )
+    return result.scalar_one()
+
+
+class TestWriteQueue:
+    @pytest.mark.asyncio
+    async def test_concurrent_writes_share_a_commit(self, write_queue, db_session):
+        # given: an idea
+        idea_id = await create_idea(db_session)
+        
+        # when: many writers submit feedback at once
+        messages = await asyncio.gather(*[
+            write_queue.submit(add_feedback(idea_id, f"step {n}")) for n in range(20)
+        ])
+        
+        # then: each caller gets its own message, committed in fewer transactions
+        assert [m.content for m in messages] == [f"step {n}" for n in range(20)]
+        assert all(m.id is not None for m in messages)
+        assert write_queue.batches_committed < 20
+        assert await count_messages(db_session, idea_id) == 20
+
+    @pytest.mark.asyncio
+    async def test_validation_error_only_fails_its_caller(self, write_queue, db_session):
+        # given: an idea and a unit of work that rejects its input
+        idea_id = await create_idea(db_session)
+        
+        async def rejected(session):
+            raise HTTPException(status_code=404, detail="Idea not found")
+        
+        # when: it is batched with valid writes
+        results = await asyncio.gather(
+            write_queue.submit(add_feedback(idea_id, "before")),
+            write_queue.submit(rejected),
+            write_queue.submit(add_feedback(idea_id, "after")),
+            return_exceptions=True,
+        )
+        
+        # then: only that caller sees the error
+        assert isinstance(results[1], HTTPException)
+        assert results[0].content == "before"
+        assert results[2].content == "after"
+        assert await count_messages(db_session, idea_id) == 2
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_is_replayed_per_item(self, write_queue, db_session):
+        # given: an idea and a write that violates a NOT NULL constraint
+        idea_id = await create_idea(db_session)
+        
+        # when: it is batched with a valid write
+        results = await asyncio.gather(
+            write_queue.submit(add_feedback(idea_id, "ok")),
+            write_queue.submit(add_feedback(idea_id, None)),
+            return_exceptions=True,
+        )
+        
+        # then: the valid write still commits
+        assert results[0].content == "ok"
+        assert isinstance(results[1], Exception)
+        assert await count_messages(db_session, idea_id) == 1
+
+    @pytest.mark.asyncio
+    async def test_stop_drains_queued_writes(self, write_queue, db_session):
+        # given: writes queued but not yet committed
+        idea_id = await create_idea(db_session)
+        pending = [
+            asyncio.ensure_future(write_queue.submit(add_feedback(idea_id, f"step {n}")))
+            for n in range(5)
+        ]
+        await asyncio.sleep(0)
+        
+        # when: the queue is stopped
+        await write_queue.stop()
+        
+        # then: every queued write was committed
+        assert all(task.done() for task in pending)
+        assert await count_messages(db_session, idea_id) == 5
+
+
+class TestGroupCommitAPI:
+    @pytest.mark.asyncio
+    async def test_feedback_through_queue(self, client, write_queue, monkeypatch):
+        # given: group commit enabled and an executing idea
+        monkeypatch.setattr(writer, "write_queue", write_queue)
+        create_response = await client.post("/api/ideas", json={"content": "Test idea"})
+        idea_id = create_response.json()["id"]
+        await client.post(f"/api/ideas/{idea_id}/execute")
+        await client.post(f"/api/agent/claim/{idea_id}", json={"agent_id": "agent-001"})
+        await client.post(f"/api/agent/start/{idea_id}", json={"agent_id": "agent-001"})
+        
+        # when: the agent submits feedback concurrently, plus one from the wrong agent
+        responses = await asyncio.gather(*[
+            client.post(
+                f"/api/agent/feedback/{idea_id}",
+                json={"agent_id": "agent-001", "content": f"Progress {n}"}
+            )
+            for n in range(10)
+        ], client.post(
+            f"/api/agent/feedback/{idea_id}",
+            json={"agent_id": "agent-002", "content": "Intruder"}
+        ))
+        
+        # then: each request gets its own result
+        assert [r.status_code for r in responses] == [200] * 10 + [403]
+        messages = (await client.get(f"/api/ideas/{idea_id}/messages")).json()
+        feedback = [m["content"] for m in messages if m["type"] == "agent_feedback"]
+        assert sorted(feedback) == sorted(f"Progress {n}" for n in range(10))
+
+    @pytest.mark.asyncio
+    async def test_transitions_on_one_idea_in_one_batch(self, client, write_queue, monkeypatch):
+        # given: group commit enabled and an executing idea
+        monkeypatch.setattr(writer, "write_queue", write_queue)
+        create_response = await client.post("/api/ideas", json={"content": "Test idea"})
+        idea_id = create_response.json()["id"]
+        await client.post(f"/api/ideas/{idea_id}/execute")
+        await client.post(f"/api/agent/claim/{idea_id}", json={"agent_id": "agent-001"})
+        await client.post(f"/api/agent/start/{idea_id}", json={"agent_id": "agent-001"})
+        batches = write_queue.batches_committed
+        last_event_id = broker.publish("marker", idea_id, {}).id
+        
+        # when: the agent asks and the user replies in the same batch
+        asked, replied = await asyncio.gather(
+            client.post(f"/api/agent/ask/{idea_id}", json={"agent_id": "agent-001", "question": "Which?"}),
+            client.post(f"/api/ideas/{idea_id}/messages", json={"content": "This one"}),
+        )
+        
+        # then: the ask reports its own transition, not the reply's
+        assert write_queue.batches_committed == batches + 1
+        assert asked.json()["old_status"] == "executing"
+        assert asked.json()["new_status"] == "waiting_user"
+        assert replied.status_code == 201
+        idea = (await client.get(f"/api/ideas/{idea_id}")).json()
+        assert idea["status"] == "waiting_agent"
+        # and each status event carries its own transition
+        statuses = [
+            (event.data["old_status"], event.data["new_status"])
+            for event in broker.since(last_event_id) if event.event == "status"
+        ]
+        assert statuses == [("executing", "waiting_user"), ("waiting_user", "waiting_agent")]